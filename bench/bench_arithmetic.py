@@ -0,0 +1,87 @@
+"""
+    Benchmark : Arithmetic throughput
+
+    PYTHONPATH=. python bench/bench_arithmetic.py
+
+    Compares the native integer primitives with copies that convert every
+    argument with int() and every result with str(), as values used to be.
+"""
+
+import argparse
+import timeit
+import daytona
+from daytona import primitive, ScriptError
+
+
+@primitive('str++')
+def do_str_increment(args, context):
+    if not args or len(args) != 1:
+        raise ScriptError(context, '"str++" keyword is unary')
+    try:
+        val = int(args[0])
+    except ValueError as ex:
+        raise ScriptError(context, '"str++" keyword accepts numbers only') from ex
+    return context, str(val + 1)
+
+
+@primitive('str--')
+def do_str_decrement(args, context):
+    if not args or len(args) != 1:
+        raise ScriptError(context, '"str--" keyword is unary')
+    try:
+        val = int(args[0])
+    except ValueError as ex:
+        raise ScriptError(context, '"str--" keyword accepts numbers only') from ex
+    return context, str(val - 1)
+
+
+@primitive('str+')
+def do_str_add(args, context):
+    if not args or len(args) == 0:
+        raise ScriptError(context, '"str+" keyword requires arguments')
+    sum = 0
+    for arg in args:
+        try:
+            sum += int(arg)
+        except ValueError as ex:
+            raise ScriptError(context, '"str+" keyword accepts numbers only') from ex
+    return context, str(sum)
+
+
+@primitive('strset')
+def do_str_set(args, context):
+    if not args or len(args) != 2:
+        raise ScriptError(context, '"strset" keyword requires two arguments')
+    daytona.VARIABLES[args[0]] = str(args[1])
+    return context, None
+
+
+def body(prefix, lines):
+    return [f'{prefix}set X ( {prefix}++ $X )',
+            f'{prefix}set Y ( {prefix}-- $Y )',
+            f'{prefix}set Z ( {prefix}+ $X $Y 1 2 3 )'] * lines
+
+
+def measure(keyword, repeat, number):
+    daytona.register_variables({'X': '0', 'Y': '0'})
+    return min(timeit.repeat(lambda: daytona.execute_script(keyword), repeat=repeat, number=number))
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark native against stringly arithmetic')
+    parser.add_argument('--lines', default=100, type=int, help='repetitions of the three benchmarked lines')
+    parser.add_argument('--repeat', default=10, type=int, help='timing repetitions')
+    parser.add_argument('--number', default=20, type=int, help='keyword calls per repetition')
+    args = parser.parse_args()
+
+    daytona.register_keywords({'bench-native': body('', args.lines),
+                               'bench-stringly': body('str', args.lines)})
+    operations = 3 * args.lines * args.number
+    native = measure('bench-native', args.repeat, args.number)
+    stringly = measure('bench-stringly', args.repeat, args.number)
+    print(f'stringly: {operations / stringly:.0f} lines/s')
+    print(f'native:   {operations / native:.0f} lines/s')
+    print(f'=== native is {stringly / native:.2f}x the stringly throughput')
+
+# EOF
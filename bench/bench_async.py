@@ -0,0 +1,79 @@
+"""
+    Benchmark : Scripts waiting on I/O with execute_script_async
+
+    PYTHONPATH=. python bench/bench_async.py
+
+    Each script calls a primitive that waits a fixed latency, as a network
+    call would. Runs them one after another with a blocking primitive, then
+    all at once on one event loop with an async one.
+"""
+
+import argparse
+import asyncio
+import time
+import daytona
+from daytona import primitive
+
+
+LATENCY = 0.01
+
+
+@primitive('blocking-io')
+def do_blocking_io(args, context):
+    time.sleep(LATENCY)
+    return context, args[0]
+
+
+@primitive('async-io')
+async def do_async_io(args, context):
+    await asyncio.sleep(LATENCY)
+    return context, args[0]
+
+
+def setup(calls):
+    daytona.register_keywords({
+        'bench-blocking': ['blocking-io $0'] * calls,
+        'bench-async': ['async-io $0'] * calls,
+    })
+
+
+def blocking(scripts):
+    start = time.perf_counter()
+    for n in range(scripts):
+        daytona.execute_script('bench-blocking', n)
+    return time.perf_counter() - start
+
+
+def concurrent(scripts):
+    async def main():
+        return await asyncio.gather(*(daytona.execute_script_async('bench-async', n) for n in range(scripts)))
+
+    start = time.perf_counter()
+    results = asyncio.run(main())
+    assert results == list(range(scripts))
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark scripts waiting on a fake-latency primitive')
+    parser.add_argument('--scripts', default=100, type=int, help='scripts to run')
+    parser.add_argument('--calls', default=5, type=int, help='waiting calls per script')
+    parser.add_argument('--latency', default=LATENCY, type=float, help='seconds each call waits')
+    parser.add_argument('--concurrent-scripts', default=5000, type=int, help='scripts to run at once on the event loop')
+    args = parser.parse_args()
+
+    LATENCY = args.latency
+    setup(args.calls)
+    calls = args.scripts * args.calls
+    serial = blocking(args.scripts)
+    print(f'blocking:   {args.scripts} scripts in {serial:.2f}s ({calls / serial:.0f} calls/s)')
+    together = concurrent(args.scripts)
+    print(f'concurrent: {args.scripts} scripts in {together:.2f}s ({calls / together:.0f} calls/s)')
+    print(f'=== async is {serial / together:.1f}x faster')
+    many = concurrent(args.concurrent_scripts)
+    print(f'{args.concurrent_scripts} concurrent scripts in {many:.2f}s '
+          f'({args.concurrent_scripts * args.calls / many:.0f} calls/s, '
+          f'{args.calls * args.latency:.2f}s of waiting each)')
+
+# EOF
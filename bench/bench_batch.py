@@ -0,0 +1,63 @@
+"""
+    Benchmark : Batch execution on a process pool
+
+    PYTHONPATH=. python bench/bench_batch.py --workers 1 2 4
+
+    Runs one keyword over many argument tuples one at a time, then with
+    execute_batch for each worker count. Scaling needs as many cores.
+"""
+
+import argparse
+import os
+import time
+import daytona
+
+
+def setup(work):
+    daytona.register_keywords({
+        'bench-batch': [
+            'bench-work $0 ' + str(work),
+        ],
+        'bench-work': [
+            'if $1',
+            '    bench-work ( + $0 1 ) ( -- $1 )',
+            'else',
+            '    + $0 0',
+            'end',
+        ],
+    })
+
+
+def serial(items):
+    start = time.perf_counter()
+    for n in range(items):
+        daytona.execute_script('bench-batch', n)
+    return time.perf_counter() - start
+
+
+def batch(items, workers, chunksize):
+    start = time.perf_counter()
+    for result in daytona.execute_batch('bench-batch', ((n,) for n in range(items)),
+                                        max_workers=workers, chunksize=chunksize):
+        assert result.error is None
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark execute_batch scaling with worker count')
+    parser.add_argument('--items', default=20000, type=int, help='argument tuples to run')
+    parser.add_argument('--work', default=20, type=int, help='nested calls each item makes')
+    parser.add_argument('--chunksize', default=500, type=int, help='argument tuples sent to a worker at once')
+    parser.add_argument('--workers', default=[1, 2, 4], type=int, nargs='+', help='worker counts to try')
+    args = parser.parse_args()
+
+    setup(args.work)
+    print(f'{os.cpu_count()} cpus')
+    baseline = serial(args.items)
+    print(f'serial:    {args.items / baseline:.0f} items/s')
+    for workers in args.workers:
+        elapsed = batch(args.items, workers, args.chunksize)
+        print(f'{workers} workers: {args.items / elapsed:.0f} items/s ({baseline / elapsed:.2f}x serial)')
+
+# EOF
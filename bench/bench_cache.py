@@ -0,0 +1,58 @@
+"""
+    Benchmark : Loading a script library from YAML against from its cache
+
+    PYTHONPATH=. python bench/bench_cache.py
+
+    Writes a library of keywords to a temporary directory and loads it cold
+    (parsing and compiling) and warm (from the cache file), as run_script.py
+    would at startup.
+"""
+
+import argparse
+import os
+import tempfile
+import timeit
+import daytona
+from daytona import cache
+
+
+def write_library(path, keywords, lines):
+    with open(path, 'w') as f:
+        for n in range(keywords):
+            f.write(f'keyword-{n}:\n')
+            for line in range(lines):
+                if line % 5 == 0:
+                    f.write(f'  - if ( + $0 {line} )\n')
+                elif line % 5 == 4:
+                    f.write('  - end\n')
+                else:
+                    f.write(f'  -     set VALUE_{line} ( keyword-{(n + 1) % keywords} ( ++ $0 ) $VALUE_{line - 1} )\n')
+
+
+def measure(path, use_cache, repeat):
+    interpreter = daytona.Interpreter()
+    return min(timeit.repeat(lambda: cache.load_keywords(path, interpreter=interpreter, use_cache=use_cache),
+                             repeat=repeat, number=1))
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark loading a script library cold and warm')
+    parser.add_argument('--keywords', default=1000, type=int, help='keywords in the library')
+    parser.add_argument('--lines', default=20, type=int, help='lines per keyword')
+    parser.add_argument('--repeat', default=5, type=int, help='timing repetitions')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'library.yml')
+        write_library(path, args.keywords, args.lines)
+        print(f'{args.keywords} keywords of {args.lines} lines, {os.path.getsize(path)} bytes')
+        cold = measure(path, False, args.repeat)
+        print(cache.load(path, refresh=True))
+        print(cache.load(path))
+        warm = measure(path, True, args.repeat)
+        print(f'cold start: {cold * 1000:.1f} ms')
+        print(f'warm start: {warm * 1000:.1f} ms, cache {os.path.getsize(cache.cache_path(path))} bytes')
+        print(f'=== warm start is {cold / warm:.1f}x faster')
+
+# EOF
@@ -0,0 +1,50 @@
+"""
+    Benchmark : Keyword call overhead
+
+    PYTHONPATH=. python bench/bench_calls.py
+
+    Calls one- and two-line helper keywords with and without inlining.
+"""
+
+import argparse
+import timeit
+import daytona
+from daytona import primitive
+
+
+@primitive('nop')
+def do_nop(args, context):
+    return context, None
+
+
+def setup(lines):
+    daytona.register_keywords({
+        'helper1': ['nop $0'],
+        'helper2': ['nop $0', 'nop $1'],
+        'bench-calls': ['helper1 one', 'helper2 one two'] * lines,
+    })
+
+
+def measure(threshold, repeat, number):
+    daytona.set_inline_threshold(threshold)
+    return min(timeit.repeat(lambda: daytona.execute_script('bench-calls'), repeat=repeat, number=number))
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark helper keyword calls with and without inlining')
+    parser.add_argument('--lines', default=100, type=int, help='pairs of helper calls in the benchmarked keyword')
+    parser.add_argument('--threshold', default=daytona.INLINE_THRESHOLD, type=int, help='inline threshold')
+    parser.add_argument('--repeat', default=10, type=int, help='timing repetitions')
+    parser.add_argument('--number', default=20, type=int, help='keyword calls per repetition')
+    args = parser.parse_args()
+
+    setup(args.lines)
+    calls = 2 * args.lines * args.number
+    called = measure(0, args.repeat, args.number)
+    inlined = measure(args.threshold, args.repeat, args.number)
+    print(f'called:  {calls / called:.0f} helper calls/s ({called / calls * 1e6:.2f} us each)')
+    print(f'inlined: {calls / inlined:.0f} helper calls/s ({inlined / calls * 1e6:.2f} us each)')
+    print(f'=== inlining is {called / inlined:.2f}x faster')
+
+# EOF
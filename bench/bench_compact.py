@@ -0,0 +1,71 @@
+"""
+    Benchmark : Loading a script library from YAML against the compact format
+
+    PYTHONPATH=. python bench/bench_compact.py
+
+    Writes a YAML script file of many keywords, converts it with
+    daytona.compact, then times parsing each (YAML with the C loader too,
+    when PyYAML has it) and loading each with daytona.cache, without the
+    cache, as run_script.py would.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import yaml
+from daytona.cache import load
+from daytona.compact import convert, read_keywords
+
+
+def write_library(path, keywords, lines):
+    with open(path, 'w') as f:
+        for k in range(keywords):
+            f.write(f'keyword-{k}:\n')
+            f.write('  - if $0\n')
+            for line in range(lines):
+                f.write(f'  -     set VALUE_{line} ( + $0 {line} )\n')
+            f.write('  - end\n')
+
+
+def best(run, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark loading YAML and compact script files')
+    parser.add_argument('--keywords', default=10000, type=int, help='keywords in the library')
+    parser.add_argument('--lines', default=8, type=int, help='lines per keyword')
+    parser.add_argument('--repeat', default=3, type=int, help='runs of each, taking the best')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        yaml_path = os.path.join(directory, 'library.yml')
+        write_library(yaml_path, args.keywords, args.lines)
+        compact_path = convert(yaml_path)
+        assert read_keywords(compact_path) == read_keywords(yaml_path)
+
+        def parse_yaml(loader):
+            with open(yaml_path) as f:
+                yaml.load(f, Loader=loader)
+
+        results = {'parse yaml': best(lambda: parse_yaml(yaml.SafeLoader), args.repeat)}
+        if getattr(yaml, 'CSafeLoader', None):
+            results['parse yaml (C)'] = best(lambda: parse_yaml(yaml.CSafeLoader), args.repeat)
+        results['parse compact'] = best(lambda: read_keywords(compact_path), args.repeat)
+        results['load yaml'] = best(lambda: load(yaml_path, use_cache=False), args.repeat)
+        results['load compact'] = best(lambda: load(compact_path, use_cache=False), args.repeat)
+
+    print(f'{args.keywords} keywords of {args.lines + 2} lines, best of {args.repeat}')
+    for name, seconds in results.items():
+        print(f'{name:15} {seconds * 1000:9.1f} ms')
+    print(f"=== compact parses {results['parse yaml'] / results['parse compact']:.0f}x faster, "
+          f"loads {results['load yaml'] / results['load compact']:.1f}x faster")
+
+# EOF
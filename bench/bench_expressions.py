@@ -0,0 +1,43 @@
+"""
+    Benchmark : Nested expressions
+
+    PYTHONPATH=. python bench/bench_expressions.py
+"""
+
+import argparse
+import timeit
+import daytona
+
+
+def nested(depth):
+    '''( + ( ++ ( ++ $X ) ) ( -- ( -- $Y ) ) ) with depth levels on each side'''
+    left = '$X'
+    right = '$Y'
+    for _ in range(depth):
+        left = f'( ++ {left} )'
+        right = f'( -- {right} )'
+    return f'( + {left} {right} )'
+
+
+def setup(depth, lines):
+    daytona.register_variables({'X': '1', 'Y': '100'})
+    daytona.register_keywords({'bench-nested': [f'set R {nested(depth)}'] * lines})
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark nested expression evaluation')
+    parser.add_argument('--depth', default=4, type=int, help='nesting depth on each side')
+    parser.add_argument('--lines', default=100, type=int, help='lines in the benchmarked keyword')
+    parser.add_argument('--repeat', default=5, type=int, help='timing repetitions')
+    parser.add_argument('--number', default=20, type=int, help='keyword calls per repetition')
+    args = parser.parse_args()
+
+    setup(args.depth, args.lines)
+    best = min(timeit.repeat(lambda: daytona.execute_script('bench-nested'),
+                             repeat=args.repeat, number=args.number))
+    evaluations = args.lines * args.number
+    print(f'expression: {nested(args.depth)}')
+    print(f'=== {evaluations / best:.0f} evaluations/s ({best / evaluations * 1e6:.2f} us each)')
+
+# EOF
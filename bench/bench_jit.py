@@ -0,0 +1,55 @@
+"""
+    Benchmark : Interpreter against transpiled Python functions
+
+    PYTHONPATH=. python bench/bench_jit.py
+
+    Runs a keyword of arithmetic, variable, if/elif and call lines both ways.
+"""
+
+import argparse
+import timeit
+import daytona
+from daytona import primitive
+
+
+@primitive('nop')
+def do_nop(args, context):
+    return context, None
+
+
+def setup(lines):
+    daytona.register_keywords({
+        'helper': ['nop $0', 'nop $1', 'nop $0'],
+        'bench-jit': [
+            'set X ( + $0 ( ++ $1 ) )',
+            'if ( -- $X )',
+            '    nop ( + $X $X $X )',
+            'elif $X',
+            '    nop $X',
+            'end',
+            'helper $X ( -- $X )',
+        ] * lines,
+    })
+
+
+def measure(jit, repeat, number):
+    return min(timeit.repeat(lambda: daytona.execute_script('bench-jit', 1, 2, jit=jit), repeat=repeat, number=number))
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark the interpreter against the jit')
+    parser.add_argument('--lines', default=50, type=int, help='repeats of the benchmarked lines')
+    parser.add_argument('--repeat', default=10, type=int, help='timing repetitions')
+    parser.add_argument('--number', default=20, type=int, help='keyword calls per repetition')
+    args = parser.parse_args()
+
+    setup(args.lines)
+    calls = args.number
+    interpreted = measure(False, args.repeat, args.number)
+    transpiled = measure(True, args.repeat, args.number)
+    print(f'interpreter: {calls / interpreted:.0f} runs/s ({interpreted / calls * 1e6:.1f} us each)')
+    print(f'jit:         {calls / transpiled:.0f} runs/s ({transpiled / calls * 1e6:.1f} us each)')
+    print(f'=== jit is {interpreted / transpiled:.2f}x faster')
+
+# EOF
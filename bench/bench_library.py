@@ -0,0 +1,71 @@
+"""
+    Benchmark : Loading a whole script library against loading it when needed
+
+    PYTHONPATH=. python bench/bench_library.py
+
+    Writes a library of many files to a temporary directory, then runs a
+    'main' that calls a few of its keywords, either after registering every
+    file or with the library indexed and read as needed.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import yaml
+import daytona
+
+
+def write_library(directory, files, keywords, lines):
+    for n in range(files):
+        with open(os.path.join(directory, f'library-{n:04}.yml'), 'w') as f:
+            for k in range(keywords):
+                f.write(f'keyword-{n}-{k}:\n')
+                for line in range(lines):
+                    f.write(f'  - set VALUE_{line} ( + $0 {line} )\n')
+    with open(os.path.join(directory, 'main.yml'), 'w') as f:
+        f.write('main:\n')
+        for n in range(0, files, max(1, files // 3)):
+            f.write(f'  - keyword-{n}-0 1\n')
+
+
+def eager(directory):
+    interpreter = daytona.Interpreter()
+    for name in sorted(os.listdir(directory)):
+        with open(os.path.join(directory, name)) as f:
+            interpreter.register_keywords(yaml.safe_load(f))
+    interpreter.execute_script('main')
+    return interpreter
+
+
+def lazy(directory):
+    interpreter = daytona.Interpreter()
+    interpreter.add_library(directory)
+    interpreter.execute_script('main')
+    return interpreter
+
+
+def measure(run, directory):
+    started = time.perf_counter()
+    interpreter = run(directory)
+    return time.perf_counter() - started, interpreter.load_stats
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark loading a library eagerly and lazily')
+    parser.add_argument('--files', default=100, type=int, help='library files')
+    parser.add_argument('--keywords', default=20, type=int, help='keywords per file')
+    parser.add_argument('--lines', default=10, type=int, help='lines per keyword')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_library(directory, args.files, args.keywords, args.lines)
+        eager_time, eager_stats = measure(eager, directory)
+        lazy_time, lazy_stats = measure(lazy, directory)
+        print(f'{args.files} files of {args.keywords} keywords of {args.lines} lines')
+        print(f'eager: {eager_time * 1000:.1f} ms, {eager_stats}')
+        print(f'lazy:  {lazy_time * 1000:.1f} ms, {lazy_stats}')
+        print(f'=== lazy is {eager_time / lazy_time:.1f}x faster')
+
+# EOF
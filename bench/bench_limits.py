@@ -0,0 +1,51 @@
+"""
+    Benchmark : Cost of checking instruction budgets and deadlines
+
+    PYTHONPATH=. python bench/bench_limits.py
+
+    Runs a script of calls, arithmetic and branches, and deep recursion,
+    without limits, then with a budget, a timeout and both, each large enough
+    never to be reached. Limited scripts are interpreted even with --jit, so
+    both are timed interpreted.
+"""
+
+import argparse
+import timeit
+import daytona
+
+
+def setup(lines):
+    daytona.register_keywords({
+        'bench-limits': ['bench-helper ( + $0 1 )', 'set VALUE ( + $? 1 )', 'if $VALUE', '    + $VALUE 1', 'end'] * lines,
+        'bench-helper': ['set RESULT ( + $0 1 )', '++ $RESULT', '-- $?'],
+        'bench-recurse': ['if $0', '    bench-recurse ( -- $0 )', 'end'],
+    })
+    daytona.set_inline_threshold(0)  # Calls stay calls, counted when limited
+
+
+def measure(repeat, number, keyword, arg, **limits):
+    return min(timeit.repeat(lambda: daytona.execute_script(keyword, arg, jit=False, **limits),
+                             repeat=repeat, number=number))
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark instruction budgets and deadlines')
+    parser.add_argument('--lines', default=50, type=int, help='repeats of the benchmarked lines')
+    parser.add_argument('--depth', default=5000, type=int, help='depth of the recursive script')
+    parser.add_argument('--repeat', default=10, type=int, help='timing repetitions')
+    parser.add_argument('--number', default=50, type=int, help='script runs per repetition')
+    args = parser.parse_args()
+
+    setup(args.lines)
+    cases = [('none', {}), ('budget', {'budget': 10 ** 9}), ('timeout', {'timeout': 3600}),
+             ('both', {'budget': 10 ** 9, 'timeout': 3600})]
+    for keyword, arg, number in (('bench-limits', 1, args.number), ('bench-recurse', args.depth, max(args.number // 10, 1))):
+        print(keyword)
+        base = None
+        for name, limits in cases:
+            elapsed = measure(args.repeat, number, keyword, arg, **limits)
+            base = base or elapsed
+            print(f'  {name:8} {elapsed * 1000:8.2f} ms ({(elapsed / base - 1) * 100:+.1f}%)')
+
+# EOF
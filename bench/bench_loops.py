@@ -0,0 +1,46 @@
+"""
+    Benchmark : while loops against recursion
+
+    PYTHONPATH=. python bench/bench_loops.py
+
+    Counts down a million times in a 'while' loop, interpreted and through
+    the jit, and as far as max_depth allows by a keyword calling itself, as
+    scripts had to before there were loops.
+"""
+
+import argparse
+import time
+import daytona
+
+
+def setup():
+    daytona.register_keywords({
+        'bench-loop': ['set N $0', 'while $N', '    set N ( -- $N )', 'end'],
+        'bench-recurse': ['if $0', '    bench-recurse ( -- $0 )', 'end'],
+    })
+
+
+def measure(keyword, count, jit):
+    start = time.perf_counter()
+    daytona.execute_script(keyword, count, jit=jit)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark while loops')
+    parser.add_argument('--iterations', default=1000000, type=int, help='times round the loop')
+    parser.add_argument('--depth', default=90000, type=int, help='calls deep for the recursive version')
+    parser.add_argument('--repeat', default=3, type=int, help='timing repetitions')
+    args = parser.parse_args()
+
+    setup()
+    looped = min(measure('bench-loop', args.iterations, False) for _ in range(args.repeat))
+    jitted = min(measure('bench-loop', args.iterations, True) for _ in range(args.repeat))
+    recursed = min(measure('bench-recurse', args.depth, False) for _ in range(args.repeat))
+    print(f'while:     {args.iterations} iterations in {looped:.2f}s ({looped / args.iterations * 1e6:.2f} us each)')
+    print(f'while jit: {args.iterations} iterations in {jitted:.2f}s ({jitted / args.iterations * 1e6:.2f} us each)')
+    print(f'recursion: {args.depth} calls in {recursed:.2f}s ({recursed / args.depth * 1e6:.2f} us each)')
+    print(f'=== while is {recursed / args.depth / (looped / args.iterations):.1f}x faster per iteration than recursion')
+
+# EOF
@@ -0,0 +1,58 @@
+"""
+    Benchmark : Reloading one changed keyword against registering the library again
+
+    PYTHONPATH=. python bench/bench_reload.py
+
+    Registers and links a library of keywords that call each other in
+    chains, then changes one keyword and either reloads the library with
+    reload_keywords or registers it all again, timing that plus linking
+    what the next run needs.
+"""
+
+import argparse
+import time
+import daytona
+
+
+def library(keywords, lines, chain, edit=0):
+    '''keyword-N calls keyword-N+1 within chains of chain keywords'''
+    bodies = {}
+    for n in range(keywords):
+        body = [f'set VALUE_{line} ( + $0 {line} )' for line in range(lines)]
+        if (n + 1) % chain:
+            body.append(f'keyword-{n + 1} $VALUE_0')
+        bodies[f'keyword-{n}'] = body
+    bodies['keyword-0'] = bodies['keyword-0'] + [f'+ {edit} 0']
+    return bodies
+
+
+def measure(keywords, lines, chain, reload):
+    interpreter = daytona.Interpreter()
+    interpreter.register_keywords(library(keywords, lines, chain))
+    interpreter.link()
+    edited = library(keywords, lines, chain, edit=1)
+    started = time.perf_counter()
+    if reload:
+        report = interpreter.reload_keywords(edited)
+    else:
+        report = interpreter.register_keywords(edited)
+    interpreter.link()
+    return time.perf_counter() - started, report
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark reloading a changed keyword')
+    parser.add_argument('--keywords', default=2000, type=int, help='keywords in the library')
+    parser.add_argument('--lines', default=10, type=int, help='lines per keyword')
+    parser.add_argument('--chain', default=10, type=int, help='keywords in each chain of calls')
+    args = parser.parse_args()
+
+    registered, _ = measure(args.keywords, args.lines, args.chain, False)
+    reloaded, report = measure(args.keywords, args.lines, args.chain, True)
+    print(f'{args.keywords} keywords of {args.lines} lines, one changed')
+    print(f'register all: {registered * 1000:.1f} ms')
+    print(f'reload:       {reloaded * 1000:.1f} ms ({report})')
+    print(f'=== reload is {registered / reloaded:.1f}x faster')
+
+# EOF
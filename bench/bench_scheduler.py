@@ -0,0 +1,58 @@
+"""
+    Benchmark : Green thread scheduler switch overhead
+
+    PYTHONPATH=. python bench/bench_scheduler.py
+
+    Runs many copies of one script under the Scheduler with several quotas,
+    against running them one after another with execute_script.
+"""
+
+import argparse
+import time
+import daytona
+from daytona import primitive
+from daytona.scheduler import Scheduler
+
+
+@primitive('nop')
+def do_nop(args, context):
+    return context, None
+
+
+def setup(lines):
+    daytona.register_keywords({
+        'bench-sched': ['nop $0 ( + $0 1 )'] * lines,
+    })
+
+
+def serial(scripts):
+    start = time.perf_counter()
+    for n in range(scripts):
+        daytona.execute_script('bench-sched', n)
+    return time.perf_counter() - start
+
+
+def scheduled(scripts, quota):
+    scheduler = Scheduler(quota=quota)
+    for n in range(scripts):
+        scheduler.spawn('bench-sched', n)
+    return scheduler.run()
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark scheduler switch overhead')
+    parser.add_argument('--scripts', default=1000, type=int, help='scripts to interleave')
+    parser.add_argument('--lines', default=100, type=int, help='lines in each script')
+    parser.add_argument('--quotas', default=[1, 10, 100, 0], type=int, nargs='+', help='quotas to try, 0 for none')
+    args = parser.parse_args()
+
+    setup(args.lines)
+    lines = args.scripts * args.lines
+    baseline = serial(args.scripts)
+    print(f'execute_script: {lines / baseline:.0f} lines/s')
+    for quota in args.quotas:
+        stats = scheduled(args.scripts, quota)
+        print(f'quota {quota:>3}: {stats.lines / stats.total_time:.0f} lines/s, {stats}')
+
+# EOF
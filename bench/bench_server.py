@@ -0,0 +1,89 @@
+"""
+    Benchmark : Latency of running a script per process against asking a server
+
+    PYTHONPATH=. python bench/bench_server.py
+
+    Writes a script file of many keywords, then times running its 'main'
+    by starting run_script.py for each request, by starting run_client.py
+    for each request against a server that loaded the file once, and by
+    requests over one open connection to that server.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import daytona
+from daytona.cache import load
+from daytona.server import Server, Client
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def write_script(path, keywords, lines):
+    with open(path, 'w') as f:
+        f.write('main:\n  - keyword-0 1\n')
+        for k in range(keywords):
+            f.write(f'keyword-{k}:\n')
+            for line in range(lines):
+                f.write(f'  - set VALUE_{line} ( + $0 {line} )\n')
+
+
+def percentiles(times):
+    times = sorted(times)
+    return times[len(times) // 2] * 1000, times[int(len(times) * 0.95)] * 1000
+
+
+def per_process(command, requests):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    times = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        subprocess.run(command, check=True, env=env, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - started)
+    return times
+
+
+def connected(path, requests):
+    times = []
+    with Client(path) as client:
+        for _ in range(requests):
+            started = time.perf_counter()
+            client.execute_script('main')
+            times.append(time.perf_counter() - started)
+    return times
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark script latency per process and from a server')
+    parser.add_argument('--keywords', default=500, type=int, help='keywords in the script file')
+    parser.add_argument('--lines', default=10, type=int, help='lines per keyword')
+    parser.add_argument('--requests', default=20, type=int, help='requests run each way')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        script = os.path.join(directory, 'script.yml')
+        socket_path = os.path.join(directory, 'daytona.sock')
+        write_script(script, args.keywords, args.lines)
+
+        results = {'run_script.py': per_process([sys.executable, os.path.join(ROOT, 'run_script.py'), script],
+                                                args.requests)}
+        daytona.register_keywords(load(script).keywords)
+        with Server(socket_path, max_workers=2) as server:
+            server.start()
+            results['run_client.py'] = per_process([sys.executable, os.path.join(ROOT, 'run_client.py'), socket_path],
+                                                   args.requests)
+            results['connection'] = connected(socket_path, args.requests * 10)
+            server.stop()
+
+    print(f'{args.keywords} keywords of {args.lines} lines, median and 95th percentile')
+    for name, times in results.items():
+        median, p95 = percentiles(times)
+        print(f'{name:14} {median:8.2f} ms {p95:8.2f} ms')
+    print(f"=== the server answers {percentiles(results['run_script.py'])[0] / percentiles(results['connection'])[0]:.0f}x"
+          ' faster over a connection')
+
+# EOF
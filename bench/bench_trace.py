@@ -0,0 +1,65 @@
+"""
+    Benchmark : Cost of the tracing hooks, installed and not
+
+    PYTHONPATH=. python bench/bench_trace.py
+
+    Runs a script of calls, arithmetic and dynamic calls never traced, then
+    after a hook has been installed and removed (which should cost nothing,
+    as the code linked is the same), then with a hook doing nothing and
+    with a SamplingTracer.
+"""
+
+import argparse
+import timeit
+import daytona
+from daytona import Op
+from daytona.trace import SamplingTracer
+
+
+def setup(lines):
+    daytona.register_keywords({
+        'bench-trace': ['bench-helper ( + $0 1 )', 'set VALUE ( $1 $? )', 'if $VALUE', '    + $VALUE 1', 'end'] * lines,
+        'bench-helper': ['set RESULT ( + $0 1 )', '++ $RESULT', '-- $?'],
+    })
+    daytona.set_inline_threshold(0)  # Calls stay calls, traced or not
+
+
+def measure(repeat, number):
+    return min(timeit.repeat(lambda: daytona.execute_script('bench-trace', 1, '++'), repeat=repeat, number=number))
+
+
+def linked_code():
+    daytona.link('bench-trace')
+    return [list(daytona.KEYWORDS[keyword].code) for keyword in ('bench-trace', 'bench-helper')]
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark tracing hooks')
+    parser.add_argument('--lines', default=50, type=int, help='repeats of the benchmarked lines')
+    parser.add_argument('--repeat', default=10, type=int, help='timing repetitions')
+    parser.add_argument('--number', default=50, type=int, help='script runs per repetition')
+    args = parser.parse_args()
+
+    setup(args.lines)
+    before = linked_code()
+    untraced = measure(args.repeat, args.number)
+    tracer = SamplingTracer(every=100)
+    daytona.settrace(tracer)
+    assert any(op == Op.TRACE for code in linked_code() for op, _ in code)
+    daytona.settrace(lambda frame, event, arg: None)
+    hooked = measure(args.repeat, args.number)
+    daytona.settrace(tracer)
+    sampled = measure(args.repeat, args.number)
+    daytona.settrace(None)
+    assert linked_code() == before, 'code linked after settrace(None) differs'
+    removed = measure(args.repeat, args.number)
+
+    print(f'never traced: {untraced * 1000:8.2f} ms')
+    print(f'hook removed: {removed * 1000:8.2f} ms ({(removed / untraced - 1) * 100:+.1f}%)')
+    print(f'no-op hook:   {hooked * 1000:8.2f} ms ({hooked / untraced:.2f}x)')
+    print(f'sampling:     {sampled * 1000:8.2f} ms ({sampled / untraced:.2f}x, {len(tracer.samples)} samples of '
+          f'{tracer.seen} events)')
+    print('=== code linked without a hook is the same as before one was installed')
+
+# EOF
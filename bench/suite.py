@@ -0,0 +1,191 @@
+"""
+    Benchmark : Suite of interpreter hot paths, compared against a baseline
+
+    PYTHONPATH=. python bench/suite.py [--output results.json] [--baseline bench/baseline.json]
+
+    Times each workload (best of --repeat, each of enough runs to take 0.2
+    seconds unless --number is given) and gives
+    microseconds per operation, a line run or a keyword loaded. Results are
+    printed and, given --output, written as JSON. Given --baseline, they are
+    compared with the results stored there, failing (exit status 1) if any
+    workload is more than --threshold slower. A baseline that does not exist
+    yet, or --update, is written from these results instead, as timings are
+    only comparable on the machine that made them. 'make bench' does this.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import timeit
+import daytona
+from daytona import Interpreter
+from daytona.compact import dumps, read_keywords
+
+
+def dispatch(interpreter, size):
+    '''Primitive calls, resolved when linked and by name from a value'''
+    interpreter.register_keywords({'bench-dispatch': ['+ 1 2', '++ 3', '-- $?', '$0 4', 'set X 5'] * size})
+    return lambda: interpreter.execute_script('bench-dispatch', '++'), 5 * size
+
+
+def expressions(interpreter, size):
+    '''Lines of expressions nested four deep on each side'''
+    left, right = '$X', '$Y'
+    for _ in range(4):
+        left, right = f'( ++ {left} )', f'( -- {right} )'
+    interpreter.register_variables({'X': 1, 'Y': 100})
+    interpreter.register_keywords({'bench-expressions': [f'set R ( + {left} {right} )'] * size})
+    return lambda: interpreter.execute_script('bench-expressions'), size
+
+
+def branches(interpreter, size):
+    '''A long if/elif chain none of whose conditions hold, skipping its large arms for the else'''
+    arms = 20
+    body = ['if $0'] + ['    + 1 1'] * size
+    for _ in range(1, arms):
+        body += ['elif $0'] + ['    + 1 1'] * size
+    body += ['else', '    + 1 1', 'end']
+    interpreter.register_keywords({'bench-branches': body, 'bench-branches-loop': ['bench-branches $0'] * size})
+    return lambda: interpreter.execute_script('bench-branches-loop', 0), size * (arms + 3)
+
+
+def loops(interpreter, size):
+    '''Times round a while loop counting down'''
+    interpreter.register_keywords({'bench-loops': ['set N $0', 'while $N', '    set N ( -- $N )', 'end']})
+    return lambda: interpreter.execute_script('bench-loops', size), size
+
+
+def calls(interpreter, size):
+    '''A chain of distinct keywords each calling the next, then recursion as deep'''
+    chain = {f'bench-chain-{n}': [f'bench-chain-{n + 1} ( ++ $0 )', '-- $?'] for n in range(size)}
+    chain[f'bench-chain-{size}'] = ['bench-recurse $0']
+    chain['bench-recurse'] = ['if $0', '    bench-recurse ( -- $0 )', 'end', '+ $0 1']
+    interpreter.register_keywords(chain)
+    interpreter.set_inline_threshold(0)  # Calls stay calls
+    return lambda: interpreter.execute_script('bench-chain-0', size), 6 * size
+
+
+def variables(interpreter, size):
+    '''Lines reading and storing globals, locals and arguments'''
+    interpreter.register_variables({'A': 1, 'B': 2})
+    interpreter.register_keywords({
+        'bench-variables': ['local L 3'] + ['set A ( + $A $L )', 'local L ( + $B $0 )', 'set B $1', '+ $A $B'] * size,
+    })
+    return lambda: interpreter.execute_script('bench-variables', 4, 5), 4 * size + 1
+
+
+def keyword_dict(size):
+    return {f'bench-load-{n}': [f'set X{n} ( + $0 {n} )', 'if $X{n}', f'    bench-load-{n + 1} $X{n}', 'end']
+            for n in range(size)}
+
+
+def yaml_load(interpreter, size, directory):
+    '''Reading and compiling a YAML script file of size keywords'''
+    import yaml
+    path = os.path.join(directory, 'bench.yml')
+    with open(path, 'w') as f:
+        yaml.safe_dump(keyword_dict(size), f)
+    return lambda: interpreter.register_keywords(read_keywords(path)), size
+
+
+def compact_load(interpreter, size, directory):
+    '''Reading and compiling a compact script file of size keywords'''
+    path = os.path.join(directory, 'bench.day')
+    with open(path, 'w') as f:
+        f.write(dumps(keyword_dict(size)))
+    return lambda: interpreter.register_keywords(read_keywords(path)), size
+
+
+WORKLOADS = {  # name => (setup, size, whether it takes a directory for files)
+    'dispatch': (dispatch, 200, False),
+    'expressions': (expressions, 200, False),
+    'branches': (branches, 50, False),
+    'loops': (loops, 10000, False),
+    'calls': (calls, 200, False),  # Deep as the jit's use of Python recursion allows
+    'variables': (variables, 200, False),
+    'yaml_load': (yaml_load, 1000, True),
+    'compact_load': (compact_load, 1000, True),
+}
+
+
+def run(names, repeat, number, jit, directory):
+    '''Microseconds per operation of each workload named'''
+    results = {}
+    for name in names:
+        setup, size, needs_directory = WORKLOADS[name]
+        interpreter = Interpreter()
+        func, operations = setup(interpreter, size, directory) if needs_directory else setup(interpreter, size)
+        daytona.JIT_DEFAULT = jit
+        func()  # Links, and for jit generates, before timing
+        timer = timeit.Timer(func, timer=time.perf_counter)
+        runs = number or timer.autorange()[0]  # By default, enough to take 0.2 seconds
+        best = min(timer.repeat(repeat=repeat, number=runs))
+        results[name] = {'us_per_op': best / (runs * operations) * 1e6, 'operations': operations, 'number': runs,
+                         'repeat': repeat}
+    return results
+
+
+def compare(results, baseline, threshold):
+    '''Report lines for each workload against the baseline, and the names of those slower than threshold'''
+    lines = []
+    regressed = []
+    for name, result in results.items():
+        current = result['us_per_op']
+        before = baseline.get('results', {}).get(name)
+        if before is None:
+            lines.append(f'{name:14} {current:10.3f} us/op   (not in baseline)')
+            continue
+        ratio = current / before['us_per_op']
+        failed = ratio > 1 + threshold
+        if failed:
+            regressed.append(name)
+        lines.append(f'{name:14} {current:10.3f} us/op {ratio:6.2f}x baseline' + ('   REGRESSED' if failed else ''))
+    return lines, regressed
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark interpreter hot paths against a baseline')
+    parser.add_argument('workloads', nargs='*', help=f'workloads to run (default all: {", ".join(WORKLOADS)})')
+    parser.add_argument('--repeat', default=5, type=int, help='timing repetitions, the best of which counts')
+    parser.add_argument('--number', default=0, type=int, help='runs of each workload per repetition (default 0.2s worth)')
+    parser.add_argument('--jit', action='store_true', help='run scripts as generated Python functions')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--baseline', help='JSON results to compare with, written if it does not exist')
+    parser.add_argument('--update', action='store_true', help='write the baseline from these results')
+    parser.add_argument('--threshold', default=0.25, type=float, help='slowdown allowed, as a fraction of baseline')
+    args = parser.parse_args()
+
+    unknown = [name for name in args.workloads if name not in WORKLOADS]
+    if unknown:
+        parser.error(f'no such workloads: {", ".join(unknown)}')
+    with tempfile.TemporaryDirectory() as directory:
+        results = run(args.workloads or list(WORKLOADS), args.repeat, args.number, args.jit, directory)
+    document = {'python': platform.python_version(), 'machine': platform.machine(), 'jit': args.jit,
+                'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(document, f, indent=2)
+
+    if args.baseline and (args.update or not os.path.exists(args.baseline)):
+        with open(args.baseline, 'w') as f:
+            json.dump(document, f, indent=2)
+        print(f'wrote baseline {args.baseline}')
+        args.baseline = None
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        if baseline.get('jit') != args.jit:
+            print(f'warning: baseline was run with jit={baseline.get("jit")}')
+    lines, regressed = compare(results, baseline, args.threshold)
+    print('\n'.join(lines))
+    if regressed:
+        print(f'=== {len(regressed)} workloads more than {args.threshold:.0%} slower than baseline: {", ".join(regressed)}')
+        sys.exit(1)
+
+# EOF
@@ -1,11 +1,70 @@
-from dataclasses import dataclass, field
+import asyncio
+from collections import ChainMap
+from collections.abc import MutableMapping
+from dataclasses import dataclass, field, replace
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
-from typing import Dict, Any, List
+import importlib
+import inspect
+import sys
+import threading
+import time
+from typing import Dict, Any, List, Set, Tuple
 
 
-KEYWORDS: Dict[str, Any] = {}
-VARIABLES: Dict[str, Any] = {}
-CONTROL_KEYWORDS = ('if', 'else', 'elif', 'end')  # There must be a better way
+UNSET = object()  # Value of a variable slot that has not been set
+YIELDED = object()  # Execution.resume() stopped for something else to run
+CONTROL_KEYWORDS = ('if', 'else', 'elif', 'end', 'parallel', 'join', 'while', 'break')  # There must be a better way
+INLINE_THRESHOLD = 2  # Default for bodies of at most this many instructions to be inlined
+MAX_CALL_DEPTH = 100000  # Nested keyword calls allowed by default
+CHECK_LINES = 1000  # Instructions run between checks of a budget or deadline
+JIT_DEFAULT = False  # Whether execute_script runs through daytona.jit unless told
+
+
+# ===== Variables =====
+
+class VariableStore(MutableMapping):
+    '''Variables by slot, so compiled code can index them directly
+
+    Acts as a dict of the variables that are set.
+    '''
+    def __init__(self):
+        self.slots = {}  # name => index in values
+        self.names = []
+        self.values = []
+
+    def slot(self, name):
+        index = self.slots.get(name)
+        if index is None:
+            index = self.slots[name] = len(self.values)
+            self.names.append(name)
+            self.values.append(UNSET)
+        return index
+
+    def __getitem__(self, name):
+        index = self.slots.get(name)
+        if index is None or self.values[index] is UNSET:
+            raise KeyError(name)
+        return self.values[index]
+
+    def __setitem__(self, name, value):
+        self.values[self.slot(name)] = value
+
+    def __delitem__(self, name):
+        self[name]  # KeyError if not set
+        self.values[self.slots[name]] = UNSET
+
+    def __iter__(self):
+        return (name for name, value in zip(self.names, self.values) if value is not UNSET)
+
+    def __len__(self):
+        return sum(1 for value in self.values if value is not UNSET)
+
+    def clear(self):
+        self.values[:] = [UNSET] * len(self.values)
+
+    def __repr__(self):
+        return f'VariableStore({dict(self)})'
 
 
 # ===== ScriptError Exception =====
@@ -21,295 +80,1446 @@ class ScriptError(Exception):
             return f'{self.context.parent_keyword}@{self.context.line_no}: {self.msg}'
         return f'{self.msg}'
 
+    def __reduce__(self):
+        # A Frame holds the running code, so only its location goes
+        context = self.context and Context(parent_keyword=self.context.parent_keyword, line_no=self.context.line_no)
+        return ScriptError, (context, self.msg)
+
 
 # ===== Context =====
 
 class InterpreterState:
+    '''Block states, tracked when matching control keywords at compile time'''
     STATE_NONE = 0
-    STATE_IF_RUN = 1
-    STATE_IF_PASS = 2
-    STATE_IF_DONE = 3
-    STATE_ELSE = 4
-    STATE_IF_PASS_ALL = 5   # Nested inside IF/ELSE block that is not executing
+    STATE_IF = 1     # Within 'if' or 'elif' arm
+    STATE_ELSE = 2   # Within 'else' arm
+    STATE_PARALLEL = 3  # Within 'parallel' block
+    STATE_WHILE = 4  # Within 'while' loop
 
 
 @dataclass
 class Context:
-    skipping: bool = False
-    parent_context: Any = None
     parent_keyword: str = ''  # The keyword this is executing from
     line_no: int = 1
-    state = InterpreterState.STATE_NONE
     retval: str = 'None'
+    interpreter: Any = None  # Running the script, DEFAULT if not given
+
+
+class Frame:
+    '''One keyword call in progress; this is the context primitives are given
+
+    It keeps the code it started with, so the body can be linked again meanwhile.
+    '''
+    __slots__ = ('interpreter', 'body', 'code', 'locations', 'args', 'pc', 'retval', 'locals')
+
+    def __init__(self, interpreter, body, args):
+        self.interpreter = interpreter
+        self.body = body
+        self.code = body.code
+        self.locations = body.locations
+        self.args = args
+        self.pc = 0  # Saved when calling out, so the location is known
+        self.retval = 'None'
+        self.locals = [UNSET] * body.nlocals if body.nlocals else None
+
+    @property
+    def parent_keyword(self):
+        return self.locations[self.pc][0]
+
+    @property
+    def line_no(self):
+        return self.locations[self.pc][1]
+
+    def __repr__(self):
+        return f'Frame({self.parent_keyword}@{self.line_no})'
+
+
+# ===== Compiled Bodies =====
+
+class WordKind:
+    LITERAL = 0
+    VARIABLE = 1   # $name
+    ARGUMENT = 2   # $0, $1, ...
+    RETVAL = 3     # $?
+
+
+class Op:
+    '''Postfix operations; pushes share their numbering with WordKind'''
+    PUSH = WordKind.LITERAL
+    PUSH_VAR = WordKind.VARIABLE
+    PUSH_ARG = WordKind.ARGUMENT
+    PUSH_RETVAL = WordKind.RETVAL
+    CALL = 4   # Operand is how many stack entries, keyword first, make the call
+    FAIL = 5   # Line did not compile, operand is the message
+    CALL_KEYWORD = 6    # Operand is (keyword name, argument count)
+    CALL_PRIMITIVE = 7  # Linked CALL_KEYWORD, operand is (function, argument count)
+    CALL_BODY = 8       # Linked CALL_KEYWORD, operand is (CompiledBody, argument count)
+    END_LINE = 9   # The value left by a line becomes $?
+    BRANCH = 10    # Pop a condition, $? becomes 'None', jump to operand if false
+    JUMP = 11      # Jump to operand
+    RETURN = 12    # $? is returned to the caller
+    PUSH_GLOBAL = 13   # Linked PUSH_VAR, operand is the variable store slot
+    PUSH_LOCAL = 14    # Linked PUSH_VAR, operand is the frame's local slot
+    STORE_GLOBAL = 15  # Pop into a variable store slot and push 'None', as 'set' does
+    STORE_LOCAL = 16   # Pop into a local slot and push 'None'
+    CALL_ASYNC = 17    # Linked CALL_KEYWORD of an async primitive, operand is (function, argument count)
+    YIELD = 18         # Linked 'yield', push 'None' and let something else run
+    SPAWN = 19  # Start a 'parallel' line's call, pushing its future; operand is (keyword, argument count, target)
+    JOIN = 20   # Pop and wait for the futures of a 'parallel' block; operand is the store for each, or None
+    TRACE = 21  # Linked only while tracing, operand is (hook, event) to call hook(frame, event, arg) with
 
 
 @dataclass
-class Expression:
-    parent: Any = None
-    words: List = field(default_factory=list)
-    depth: int = 0
-
+class Instruction:
+    line_no: int
+    words: Tuple  # (WordKind, value) pairs, keyword included
+    control: bool = False
+    code: Tuple = ()  # (Op, operand) pairs, for control keywords only the argument
+    next_arm: int = None   # if/elif/while: where to go when condition is false
+    block_end: int = None  # elif/else: where to go when previous arm ran; break: the loop's 'end'
+    keyword: str = ''  # Where the line came from, which differs once inlined
+    assigns: str = None  # Variable named by a 'set' or 'local' line
+    spawn: bool = False  # Within a 'parallel' block, so its call runs alongside the others
+    loop_start: int = None  # 'end' of a 'while': the 'while' to go back to
+
+    def __reduce__(self):
+        # Field values without their names, as a script has many of these
+        return Instruction, tuple(self.__dict__.values())
+
+
+@dataclass(eq=False)
+class CompiledBody:
+    keyword: str
+    source: List
+    instructions: List[Instruction] = field(default_factory=list)
+    linked: List[Instruction] = None  # Resolved, with small calls inlined
+    code: List = None  # Linked instructions flattened into what runs
+    locations: List = None  # (keyword, line_no) for each op in code
+    generation: int = -1  # Interpreter.link_generation when last linked
+    unresolved: List = field(default_factory=list)  # ScriptErrors from linking
+    locals: Dict = field(default_factory=dict)  # 'local' variable name => slot
+    nlocals: int = 0
+    depends: Set[str] = field(default_factory=set)  # Keyword names resolved when linked, inlined bodies' too
+
+    def copy(self):
+        '''Unlinked copy sharing the compiled instructions, for another Interpreter'''
+        return CompiledBody(keyword=self.keyword, source=self.source, instructions=self.instructions)
 
-# ===== Service Routines =====
 
-def execute_keyword(context, keyword, *args):
-    kw_val = KEYWORDS.get(keyword)
-    if not kw_val:
-        raise ScriptError(context, f'No such keyword "{keyword}"')
-    # print(f'KW: "{keyword}" with {args} ({context.parent_keyword}@{context.line_no})')
-    if callable(kw_val):
-        context, ret = kw_val(args, context)  # TODO: reverse this
-    else:
-        ret = execute_statements(keyword, kw_val, args)
-    if ret:
-        return context, ret
-    return context, 'None'
-
-
-def evaluate_expression(context, words, args):
-    expr = Expression()
-    # print(f'EVAL: {words} {context.skipping}')
-    for index, word in enumerate(words):
-        if word == '(':  # Start expression
-            nexpr = Expression(parent=expr)
-            nexpr.parent = expr
-            nexpr.depth = expr.depth + 1
-            expr = nexpr
-        elif word == ')':  # End expression
-            context, context.retval = execute_keyword(context, *expr.words)
-            expr = expr.parent
-            expr.words.append(context.retval)
-        else:  # Something in the middle of the expression
-            expr.words.append(word)
-    context, context.retval = execute_keyword(context, *expr.words)
-    if expr.depth > 0:
-        raise ScriptError(context, 'Unclosed expression')
-    return context, context.retval
-
-
-def parse_line(context, line, args):
-    words = line.split()
-    if context.skipping and words[0] not in CONTROL_KEYWORDS:
+@dataclass
+class Block:
+    start: int  # Instruction opening the block
+    state: int = InterpreterState.STATE_IF  # STATE_PARALLEL for parallel/join, STATE_WHILE for while/end
+    arms: List[int] = field(default_factory=list)  # Instructions opening each arm
+    breaks: List[int] = field(default_factory=list)  # 'break' instructions of a loop
+
+
+def literal_value(word):
+    '''Integers stay integers, but only if printing gives back the same word'''
+    if word.lstrip('-').isdecimal():  # isdigit() also takes digits such as '²' that int() refuses
+        value = int(word)
+        if str(value) == word:
+            return value
+    return word
+
+
+def is_false(value):
+    return value == 0 or value == '0'
+
+
+def compile_word(word):
+    if word == '$?':
+        return WordKind.RETVAL, None
+    if word[0] == '$':
+        if word[1:].isdecimal():
+            return WordKind.ARGUMENT, int(word[1:])
+        return WordKind.VARIABLE, word[1:]
+    return WordKind.LITERAL, literal_value(word)
+
+
+def count_arguments(words):
+    '''Number of values the words evaluate to, counting expressions as one'''
+    count = 0
+    depth = 0
+    for word in words:
+        if word == '(':
+            if depth == 0:
+                count += 1
+            depth += 1
+        elif word == ')':
+            depth -= 1
+        elif depth == 0:
+            count += 1
+    return count
+
+
+def compile_call(code, head, nwords):
+    '''Call op for an expression, naming the keyword when it is a literal'''
+    if head is None:
+        return Op.CALL, nwords
+    return Op.CALL_KEYWORD, (code.pop(head)[1], nwords - 1)
+
+
+def compile_postfix(words, call=False):
+    '''Flatten nested expressions so each call follows its arguments'''
+    code = []
+    counts = [0]  # Values produced at each open expression depth
+    heads = [None]  # Where each depth pushes its keyword, if a literal
+    for kind, value in words:
+        if kind == WordKind.LITERAL and value == '(':
+            counts.append(0)
+            heads.append(None)
+        elif kind == WordKind.LITERAL and value == ')':
+            if len(counts) == 1:
+                return ((Op.FAIL, 'Unopened expression'),)
+            nwords = counts.pop()
+            if nwords == 0:
+                return ((Op.FAIL, 'Empty expression'),)
+            code.append(compile_call(code, heads.pop(), nwords))
+            counts[-1] += 1
+        else:
+            if counts[-1] == 0 and kind == WordKind.LITERAL:
+                heads[-1] = len(code)
+            code.append((kind, value))
+            counts[-1] += 1
+    if len(counts) > 1:
+        return ((Op.FAIL, 'Unclosed expression'),)
+    if call:  # The line itself is a call
+        code.append(compile_call(code, heads[0], counts[0]))
+    return tuple(code)
+
+
+def compile_instruction(instruction):
+    if instruction.control:
+        instruction.code = compile_postfix(instruction.words[1:])
         return
-    for index, word in enumerate(words):  # Note includes keyword
-        if word == '$?':   # Return value of last expression
-            words[index] = context.retval
-        elif word[0] == '$':
-            if word[1:].isdigit():
-                argno = int(word[1:])
-                if not args or argno >= len(args):
-                    raise ScriptError(context, f'No such arg {argno}')
-                # print(f'  {word} ==> argument {argno} {args[argno]}')
-                words[index] = args[argno]
-            elif VARIABLES.get(word[1:]):
-                # print(f'  {word} ==> {VARIABLES[word[1:]]}')
-                words[index] = VARIABLES[word[1:]]
-            else:
-                raise ScriptError(context, f'No variable {word}')
-    return words
-
-
-def execute_statements(keyword, body, args=None):
-    # Always are starting fresh with context and do not return it
-    context = Context(parent_keyword=keyword)
-    for line in body:
-        words = parse_line(context, line, args)
-        if words:
-            # print(f'EXEC {keyword}@{context.line_no} "{line}" args {args} - {context.state}')
-            context, context.retval = evaluate_expression(context, words, args)
-        context.line_no += 1
-    if context.state != InterpreterState.STATE_NONE:
-        context.line_no = len(body)  # more intuitive to point to last line
+    instruction.code = compile_postfix(instruction.words, call=True)
+    words = instruction.words
+    if words[0] in ((WordKind.LITERAL, 'set'), (WordKind.LITERAL, 'local')) and len(words) > 1 and \
+            words[1][0] == WordKind.LITERAL and isinstance(words[1][1], str) and words[1][1] not in '()':
+        instruction.assigns = words[1][1]
+
+
+def spawned_call(instruction):
+    '''Whether a 'parallel' line has a call to spawn: the line's own, or the value of a 'set' or 'local'''''
+    code = instruction.code
+    if code and code[-1][0] in (Op.SPAWN, Op.FAIL):  # Linked already, or fails for a better reason
+        return True
+    index = len(code) - (2 if instruction.assigns is not None else 1)
+    return index >= 0 and code[index][0] in (Op.CALL_KEYWORD, Op.CALL)
+
+
+def match_blocks(compiled, instructions=None):
+    '''Pair up if/elif/else/end and while/break/end and record where each one jumps; mark lines within parallel/join'''
+    if instructions is None:
+        instructions = compiled.instructions
+    context = Context(parent_keyword=compiled.keyword)
+    blocks = []
+    for index, instruction in enumerate(instructions):
+        context.line_no = instruction.line_no
+        parallel = bool(blocks) and blocks[-1].state == InterpreterState.STATE_PARALLEL
+        if not instruction.control:
+            if parallel and instruction.words and not spawned_call(instruction):
+                raise ScriptError(context, '"parallel" block lines must call keywords')
+            instruction.spawn = parallel and bool(instruction.words)
+            continue
+        keyword = instruction.words[0][1]
+        nargs = count_arguments([value for _, value in instruction.words[1:]])
+        if keyword in ('if', 'elif', 'while') and nargs != 1:
+            raise ScriptError(context, f'"{keyword}" keyword requires one argument')
+        if keyword in ('else', 'end', 'parallel', 'join', 'break') and nargs > 0:
+            raise ScriptError(context, f'"{keyword}" keyword has arguments')
+        if parallel and keyword != 'join':
+            raise ScriptError(context, f'"{keyword}" keyword within "parallel" block')
+
+        if keyword == 'parallel':
+            blocks.append(Block(start=index, state=InterpreterState.STATE_PARALLEL))
+            continue
+        if keyword == 'join':
+            if not parallel:
+                raise ScriptError(context, '"join" keyword not within "parallel" block')
+            blocks.pop()
+            continue
+        if keyword == 'if':
+            blocks.append(Block(start=index, arms=[index]))
+            continue
+        if keyword == 'while':
+            blocks.append(Block(start=index, state=InterpreterState.STATE_WHILE))
+            continue
+        if keyword == 'break':
+            loops = [block for block in blocks if block.state == InterpreterState.STATE_WHILE]
+            if not loops:
+                raise ScriptError(context, '"break" keyword not within "while" loop')
+            loops[-1].breaks.append(index)
+            continue
+        if blocks and blocks[-1].state == InterpreterState.STATE_WHILE:
+            if keyword != 'end':
+                raise ScriptError(context, f'"{keyword}" keyword not within "if" statement')
+            block = blocks.pop()
+            instructions[block.start].next_arm = index
+            instruction.loop_start = block.start
+            for brk in block.breaks:
+                instructions[brk].block_end = index
+            continue
+        if not blocks:
+            if keyword == 'elif':
+                raise ScriptError(context, '"elif" keyword in wrong state')
+            raise ScriptError(context, f'"{keyword}" keyword not within "if" statement')
+        block = blocks[-1]
+        if keyword == 'elif' and block.state == InterpreterState.STATE_ELSE:
+            raise ScriptError(context, '"elif" keyword in wrong state')
+        if keyword == 'else' and block.state == InterpreterState.STATE_ELSE:
+            raise ScriptError(context, '"else" keyword is extraneous')
+
+        instructions[block.arms[-1]].next_arm = index
+        if keyword == 'else':
+            block.state = InterpreterState.STATE_ELSE
+        if keyword == 'end':
+            for arm in block.arms[1:]:
+                instructions[arm].block_end = index
+            blocks.pop()
+        else:
+            block.arms.append(index)
+
+    if blocks:
+        context.line_no = len(compiled.source)  # more intuitive to point to last line
+        if blocks[-1].state == InterpreterState.STATE_PARALLEL:
+            raise ScriptError(context, 'Keyword ended with unterminated parallel block')
+        if blocks[-1].state == InterpreterState.STATE_WHILE:
+            raise ScriptError(context, 'Keyword ended with unterminated while loop')
         raise ScriptError(context, 'Keyword ended with unterminated if statement')
-    return context.retval
 
 
-#
-# ===== API Routines =====
-#
+def reset_retval(keyword, line_no):
+    '''A line that only sets $? to 'None', as control keywords do'''
+    return Instruction(line_no=line_no, words=(), code=((Op.PUSH, 'None'),), keyword=keyword)
+
+
+def compile_body(keyword, body):
+    '''Tokenize a keyword body once so execution need not re-split lines'''
+    compiled = CompiledBody(keyword=keyword, source=body)
+    for line_no, line in enumerate(body, start=1):
+        words = str(line).split()
+        if not words:
+            continue
+        instruction = Instruction(line_no=line_no,
+                                  words=tuple(compile_word(w) for w in words),
+                                  control=words[0] in CONTROL_KEYWORDS,
+                                  keyword=keyword)
+        compile_instruction(instruction)
+        compiled.instructions.append(instruction)
+    match_blocks(compiled)
+    return compiled
+
+
+# ===== Linking =====
+
+def substitute_args(code, args):
+    '''Code with $N replaced by the literal arguments of an inlined call'''
+    substituted = []
+    for op, operand in code:
+        if op == Op.PUSH_ARG:
+            if operand < len(args):
+                op, operand = Op.PUSH, args[operand]
+            else:  # Fails just as the call would have
+                op, operand = Op.FAIL, f'No such arg {operand}'
+        substituted.append((op, operand))
+    return tuple(substituted)
+
+
+def trace_code(body, hook):
+    '''Body code calling hook as it enters and before it returns, for Interpreter.settrace'''
+    code = [(op, operand + 1 if op in (Op.BRANCH, Op.JUMP) else operand) for op, operand in body.code]
+    body.code = [(Op.TRACE, (hook, 'enter'))] + code[:-1] + [(Op.TRACE, (hook, 'exit')), code[-1]]
+    body.locations = [(body.keyword, 0)] + body.locations + body.locations[-1:]
+
+
+def traced_primitive(hook, keyword, func):
+    '''Primitive calling hook before it runs'''
+    @wraps(func)
+    def traced(args, context):
+        hook(context, 'primitive', (keyword, args))
+        return func(args, context)
+    return traced
+
+
+def flatten(instructions):
+    '''One list of ops for the body, with blocks turned into jumps'''
+    starts = []
+    size = 0
+    for instruction in instructions:
+        starts.append(size)
+        keyword = instruction.words[0][1] if instruction.control else None
+        if instruction.spawn:  # Leaves its future for 'join'
+            size += len(instruction.code)
+        elif keyword == 'end' and instruction.loop_start is not None:
+            size += 1
+        else:
+            size += {'else': 1, 'end': 2, 'parallel': 0}.get(
+                keyword, len(instruction.code) + {'elif': 2, 'break': 3}.get(keyword, 1))
+    starts.append(size)
+
+    def arm_start(index):
+        # BRANCH already set $?, so skip the JUMP taken when the previous arm ran
+        return starts[index] + (instructions[index].words[0][1] != 'end')
+
+    def loop_exit(index):
+        # Past the 'end' of a loop, which jumps back to its 'while'
+        return starts[index] + 1
+
+    code = []
+    locations = []
+    for instruction in instructions:
+        keyword = instruction.words[0][1] if instruction.control else None
+        if instruction.spawn:
+            ops = instruction.code
+        elif keyword is None or keyword == 'join':
+            ops = instruction.code + ((Op.END_LINE, None),)
+        elif keyword == 'parallel':
+            ops = ()
+        elif keyword == 'if':
+            ops = instruction.code + ((Op.BRANCH, arm_start(instruction.next_arm)),)
+        elif keyword == 'elif':
+            ops = ((Op.JUMP, starts[instruction.block_end]),) + instruction.code + \
+                ((Op.BRANCH, arm_start(instruction.next_arm)),)
+        elif keyword == 'else':
+            ops = ((Op.JUMP, starts[instruction.block_end]),)
+        elif keyword == 'while':  # BRANCH sets $? as it leaves the loop
+            ops = instruction.code + ((Op.BRANCH, loop_exit(instruction.next_arm)),)
+        elif keyword == 'break':
+            ops = instruction.code + ((Op.PUSH, 'None'), (Op.END_LINE, None), (Op.JUMP, loop_exit(instruction.block_end)))
+        elif instruction.loop_start is not None:  # 'end' of a loop goes back to its condition
+            ops = ((Op.JUMP, starts[instruction.loop_start]),)
+        else:  # 'end' sets $?
+            ops = ((Op.PUSH, 'None'), (Op.END_LINE, None))
+        code.extend(ops)
+        locations.extend([(instruction.keyword, instruction.line_no)] * len(ops))
+    code.append((Op.RETURN, None))
+    locations.append(locations[-1] if locations else (None, 0))
+    return code, locations
 
-def register_primitive(name, func):
-    global KEYWORDS
-    KEYWORDS[name] = func
 
+# ===== Service Routines =====
 
-def primitive(name):
-    def decorate(fn):
-        @wraps(fn)
-        def wrapper(*args, **kwargs):
-            # TODO: auto management of Context?
-            return fn(*args, **kwargs)  # NOTE: unit test coverage misses this line it is a mystery
-        register_primitive(name, fn)
-        return wrapper
-    return decorate
+def own_body(kw_val):
+    '''A registered value to keep: bodies are copied, as their links belong to one interpreter'''
+    return kw_val.copy() if isinstance(kw_val, CompiledBody) else kw_val
 
 
-def register_keywords(keyword_dict):
-    global KEYWORDS
-    # Note will squash existing keys
-    KEYWORDS.update(keyword_dict)
+def return_value(ret):
+    if ret is None or ret == '':
+        return 'None'
+    return ret
 
 
-def register_variables(variables_dict):
-    global VARIABLES
-    # Note will squash existing keys
-    VARIABLES.update(variables_dict)
+@dataclass(frozen=True)
+class PrimitiveReference:
+    '''Stands in for a primitive when pickling, as decorated functions are not found by name'''
+    module: str
+    name: str
 
+    @staticmethod
+    def of(func):
+        '''Reference to func if its module has it (or its decorated version) by name, otherwise func'''
+        module = sys.modules.get(getattr(func, '__module__', None))
+        found = getattr(module, getattr(func, '__name__', ''), None)
+        if found is not None and getattr(found, '__wrapped__', found) is func:
+            return PrimitiveReference(func.__module__, func.__name__)
+        return func
 
-def execute_script(start_keyword, *args):
-    '''Start executing at the following keyword (generally 'main')'''
-    if not KEYWORDS.get(start_keyword):  # More intuitive error output
-        raise ScriptError(None, f'No such keyword "{start_keyword}"')
-    context = Context(parent_keyword=start_keyword)
-    # print(f'{context} execute_script {start_keyword} with {args}')
-    _, retval = execute_keyword(context, start_keyword, *args)
-    return retval
+    def resolve(self):
+        func = getattr(importlib.import_module(self.module), self.name)
+        return getattr(func, '__wrapped__', func)
 
 
-# ===== KEYWORDS =========
+def interpreter_of(context):
+    '''The Interpreter running whatever gave this context'''
+    return getattr(context, 'interpreter', None) or DEFAULT
 
-# ===== Control Flow =====
 
-@primitive('if')
-def if_keyword(args, context):
+def call_keyword(context, keyword, args, max_depth=MAX_CALL_DEPTH, jit=False):
+    '''Call a keyword by name, for use by primitives'''
+    return interpreter_of(context).call_keyword(context, keyword, args, max_depth, jit)
 
-    if not args or len(args) != 1:
-        raise ScriptError(context, '"if" keyword requires one argument')
 
-    new_ctx = Context(parent_context=context)
-    new_ctx.line_no = context.line_no
-    new_ctx.parent_keyword = context.parent_keyword
+def execute_keyword(context, keyword, *args):
+    return call_keyword(context, keyword, args)
 
-    # If we're skipping everything in this block, skip everything in child
-    if context.skipping:
-        new_ctx.state = InterpreterState.STATE_IF_PASS_ALL
-        new_ctx.skipping = True
-        return new_ctx, None
 
-    if args[0] == '0':  # TODO Hey so much more to do here
-        new_ctx.state = InterpreterState.STATE_IF_PASS
-        new_ctx.skipping = True
-    else:
-        new_ctx.state = InterpreterState.STATE_IF_RUN
-        new_ctx.skipping = False
-    return new_ctx, None
+def run_awaitable(awaitable, context):
+    '''Result of an async primitive called outside execute_script_async'''
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        async def wait():
+            return await awaitable
+        return asyncio.run(wait())
+    if hasattr(awaitable, 'close'):
+        awaitable.close()
+    raise ScriptError(context, 'Async primitive called while an event loop runs, use execute_script_async')
+
+
+# ===== Execution =====
+
+class Limits:
+    '''Budget of instructions and deadline for a script, shared with the 'parallel' lines it starts
+
+    Each line run and each keyword call made is an instruction. They are
+    counted when a script stops or after every CHECK_LINES, so a script can
+    run one instruction over its budget, and past its deadline by as long as
+    CHECK_LINES instructions or one primitive call take.
+    '''
+
+    def __init__(self, budget=None, timeout=None):
+        self.budget = budget  # Instructions, or None
+        self.timeout = timeout  # Seconds, or None
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+        self.used = 0
+        self.lock = threading.Lock()
+
+    def quota(self):
+        '''Instructions to run before spending them'''
+        if self.budget is None:
+            return CHECK_LINES
+        return max(1, min(self.budget - self.used + 1, CHECK_LINES))
+
+    def spend(self, context, lines, awaitable=None):
+        '''Count instructions run, raising ScriptError at context if over budget or past the deadline
+
+        An awaitable that resume() gave is closed first, as it will not be awaited.
+        '''
+        with self.lock:
+            self.used += lines
+        if self.budget is not None and self.used > self.budget:
+            error = ScriptError(context, f'Ran more than {self.budget} instructions')
+        elif self.deadline is not None and time.monotonic() > self.deadline:
+            error = ScriptError(context, f'Ran longer than {self.timeout} seconds')
+        else:
+            return
+        if hasattr(awaitable, 'close'):
+            awaitable.close()
+        raise error
+
+    def __getstate__(self):
+        # Other processes count their own instructions against what was left
+        return {name: value for name, value in self.__dict__.items() if name != 'lock'}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+
+class Execution:
+    '''A keyword body being run, along with what it calls, kept off the Python stack
+
+    resume() runs until the body returns, giving None with its result in
+    value, or until an async primitive gives an awaitable, giving that. What
+    the awaitable gives goes to send() before resuming. It gives YIELDED at
+    'yield' or when a quota of lines has run. Given Limits, keyword calls
+    count against the quota as lines do.
+    '''
+    __slots__ = ('interpreter', 'max_depth', 'frames', 'frame', 'stack', 'value', 'remaining', 'limits')
+
+    def __init__(self, interpreter, body, args, max_depth=MAX_CALL_DEPTH, limits=None):
+        if body.generation != interpreter.link_generation:
+            interpreter.link_body(body)
+        self.interpreter = interpreter
+        self.max_depth = max_depth
+        self.frames = []  # Callers of the current frame
+        self.frame = Frame(interpreter, body, args)
+        self.stack = []  # Shared by all frames, as each line leaves it as it found it
+        self.value = None
+        self.remaining = 0  # Of the quota when resume() last stopped
+        self.limits = limits  # Passed on to 'parallel' lines
+
+    def send(self, result):
+        '''Result of the awaited primitive call, as (context, value)'''
+        _, ret = result
+        self.stack.append('None' if ret is None or ret == '' else ret)
+        self.frame.pc += 1
+
+    def resume(self, quota=0):
+        '''Run until done, waiting or yielding, or after quota lines if not zero'''
+        # Locals are quicker to compare against than class attributes
+        PUSH, PUSH_GLOBAL, PUSH_LOCAL, PUSH_ARG, PUSH_RETVAL = \
+            Op.PUSH, Op.PUSH_GLOBAL, Op.PUSH_LOCAL, Op.PUSH_ARG, Op.PUSH_RETVAL
+        STORE_GLOBAL, STORE_LOCAL = Op.STORE_GLOBAL, Op.STORE_LOCAL
+        CALL, CALL_KEYWORD, CALL_PRIMITIVE, CALL_BODY = Op.CALL, Op.CALL_KEYWORD, Op.CALL_PRIMITIVE, Op.CALL_BODY
+        CALL_ASYNC, YIELD = Op.CALL_ASYNC, Op.YIELD
+        END_LINE, BRANCH, JUMP, RETURN = Op.END_LINE, Op.BRANCH, Op.JUMP, Op.RETURN
+        values = self.interpreter.variables.values
+        max_depth = self.max_depth
+        frames = self.frames
+        frame = self.frame
+        stack = self.stack
+        code, pc, args, retval, local_values = frame.code, frame.pc, frame.args, frame.retval, frame.locals
+        remaining = quota  # Never reaches zero when there is no quota
+        limited = self.limits is not None  # Keyword calls count against the quota too
+        while True:
+            op, operand = code[pc]
+            pc += 1
+            if op == PUSH:
+                stack.append(operand)
+            elif op == CALL_PRIMITIVE:
+                func, nargs = operand
+                base = len(stack) - nargs
+                call_args = tuple(stack[base:])
+                del stack[base:]
+                frame.pc = pc - 1
+                _, ret = func(call_args, frame)  # TODO: reverse this
+                stack.append('None' if ret is None or ret == '' else ret)
+            elif op == END_LINE:
+                retval = stack.pop()
+                remaining -= 1
+                if remaining == 0:
+                    frame.pc, frame.retval, self.frame, self.remaining = pc, retval, frame, 0
+                    return YIELDED
+            elif op == PUSH_GLOBAL:
+                value = values[operand]
+                if value is UNSET:
+                    frame.pc = pc - 1
+                    raise ScriptError(frame, f'No variable ${self.interpreter.variables.names[operand]}')
+                stack.append(value)
+            elif op == PUSH_ARG:
+                try:
+                    stack.append(args[operand])
+                except IndexError:
+                    frame.pc = pc - 1
+                    raise ScriptError(frame, f'No such arg {operand}') from None
+            elif op == STORE_GLOBAL:
+                values[operand] = stack[-1]
+                stack[-1] = 'None'
+            elif op == BRANCH:
+                retval = 'None'
+                value = stack.pop()
+                if value == 0 or value == '0':
+                    pc = operand
+                remaining -= 1
+                if remaining == 0:
+                    frame.pc, frame.retval, self.frame, self.remaining = pc, retval, frame, 0
+                    return YIELDED
+            elif op == JUMP:
+                pc = operand
+            elif op == PUSH_LOCAL:
+                value = local_values[operand]
+                if value is UNSET:
+                    frame.pc = pc - 1
+                    name = [name for name, slot in frame.body.locals.items() if slot == operand][0]
+                    raise ScriptError(frame, f'No variable ${name}')
+                stack.append(value)
+            elif op == STORE_LOCAL:
+                local_values[operand] = stack[-1]
+                stack[-1] = 'None'
+            elif op == PUSH_RETVAL:  # Return value of last line
+                stack.append(retval)
+            elif op == CALL_ASYNC:  # Stop, leaving the call's location, until send() has its result
+                func, nargs = operand
+                base = len(stack) - nargs
+                call_args = tuple(stack[base:])
+                del stack[base:]
+                frame.pc = pc - 1
+                frame.retval = retval
+                self.frame = frame
+                self.remaining = remaining
+                return func(call_args, frame)
+            elif op == YIELD:
+                stack.append('None')
+                frame.pc, frame.retval, self.frame, self.remaining = pc, retval, frame, remaining
+                return YIELDED
+            elif op == RETURN:
+                if not frames:
+                    self.frame = frame
+                    self.value = retval
+                    self.remaining = remaining
+                    return None
+                ret = 'None' if retval is None or retval == '' else retval
+                frame = frames.pop()
+                code, pc, args, retval, local_values = \
+                    frame.code, frame.pc, frame.args, frame.retval, frame.locals
+                stack.append(ret)
+            else:
+                if op == CALL_BODY:
+                    callee, nargs = operand
+                elif op == CALL_KEYWORD:  # Did not resolve when linked
+                    keyword = operand[0]
+                    callee, nargs = self.interpreter.resolve_keyword(keyword), operand[1]
+                elif op == CALL:  # Keyword is itself a value on the stack
+                    keyword = stack[-operand]
+                    callee, nargs = self.interpreter.resolve_keyword(keyword), operand - 1
+                    if callee:
+                        del stack[-operand]
+                elif op == Op.SPAWN:  # Runs on the pool while the lines after it do
+                    from daytona.parallel import spawn
+                    keyword, nargs, _ = operand
+                    base = len(stack) - nargs
+                    call_args = tuple(stack[base:])
+                    if keyword is None:  # Keyword is itself a value on the stack
+                        base -= 1
+                        keyword = stack[base]
+                    del stack[base:]
+                    frame.pc = pc - 1
+                    stack.append(spawn(frame, keyword, call_args, max_depth - len(frames) - 1, limits=self.limits))
+                    continue
+                elif op == Op.JOIN:
+                    from daytona.parallel import join
+                    base = len(stack) - len(operand)
+                    frame.pc = pc - 1
+                    results = join(stack[base:])
+                    del stack[base:]
+                    for store, value in zip(operand, results):
+                        if store is not None:
+                            (values if store[0] == STORE_GLOBAL else local_values)[store[1]] = value
+                    stack.append('None')
+                    continue
+                elif op == Op.TRACE:
+                    hook, event = operand
+                    frame.pc = pc - 1
+                    hook(frame, event, frame.args if event == 'enter' else retval if event == 'exit' else None)
+                    continue
+                else:
+                    frame.pc = pc - 1
+                    raise ScriptError(frame, operand)
+                base = len(stack) - nargs
+                call_args = tuple(stack[base:])
+                frame.pc = pc - 1
+                if not callee:
+                    raise ScriptError(frame, f'No such keyword "{keyword}"')
+                del stack[base:]
+                if callable(callee):  # Only reached by calls resolved as they run
+                    if self.interpreter.tracer is not None:
+                        self.interpreter.tracer(frame, 'primitive', (keyword, call_args))
+                    result = callee(call_args, frame)  # TODO: reverse this
+                    if type(result) is not tuple and inspect.isawaitable(result):
+                        frame.retval = retval
+                        self.frame = frame
+                        self.remaining = remaining
+                        return result
+                    _, ret = result
+                    stack.append('None' if ret is None or ret == '' else ret)
+                    continue
+                if len(frames) + 1 >= max_depth:
+                    raise ScriptError(frame, f'Calls nested more than {max_depth} deep')
+                if callee.generation != self.interpreter.link_generation:
+                    self.interpreter.link_body(callee)
+                frame.pc = pc
+                frame.retval = retval
+                frames.append(frame)
+                frame = Frame(self.interpreter, callee, call_args)
+                code, pc, args, retval, local_values = frame.code, 0, call_args, 'None', frame.locals
+                if limited:  # So recursion that never ends a line is still stopped
+                    remaining -= 1
+                    if remaining == 0:
+                        self.frame, self.remaining = frame, 0
+                        return YIELDED
+
+
+# ===== Interpreter =====
 
+@dataclass
+class LoadStats:
+    loaded: int = 0    # Keyword bodies registered, at once or from library files
+    compiled: int = 0  # Keyword bodies compiled, which lazy ones are when first needed
+    files: int = 0     # Library files read
 
-@primitive('elif')
-def elif_keyword(args, context):
-    if not args or len(args) != 1:
-        raise ScriptError(context, '"elif" keyword requires one argument')
-
-    if context.state == InterpreterState.STATE_IF_PASS_ALL:
-        return context, None
-
-    if context.state == InterpreterState.STATE_IF_RUN:
-        context.state = InterpreterState.STATE_IF_DONE
-        context.skipping = True
-    elif context.state == InterpreterState.STATE_IF_PASS:
-        if args[0] != '0':  # TODO Hey so muc more to do here
-            context.state = InterpreterState.STATE_IF_RUN
-            context.skipping = False
-    else:
-        raise ScriptError(context, '"elif" keyword in wrong state')
-    return context, None
+    def __str__(self):
+        return f'{self.loaded} keywords loaded ({self.files} library files read), {self.compiled} compiled'
 
 
-@primitive('else')
-def else_keyword(args, context):
-    if args and len(args) > 0:
-        raise ScriptError(context, '"else" keyword has arguments')
+@dataclass
+class ReloadReport:
+    added: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    unchanged: int = 0
+    relinked: int = 0  # Bodies to link again, as they call or inlined what changed
+    report: List = field(default_factory=list)  # Optimizations made to the bodies compiled
+    compile_time: float = 0.0  # Seconds
+    swap_time: float = 0.0  # Seconds the keyword table was locked
+    total_time: float = 0.0
 
-    if context.state == InterpreterState.STATE_IF_PASS_ALL:
-        return context, None
+    def __str__(self):
+        return (f'{len(self.changed)} changed, {len(self.added)} added, {len(self.removed)} removed, '
+                f'{self.unchanged} unchanged, {self.relinked} to relink; compile {self.compile_time * 1000:.2f}ms, '
+                f'swap {self.swap_time * 1000:.2f}ms, total {self.total_time * 1000:.2f}ms')
+
+
+class Interpreter:
+    '''Keyword table, variable store and primitives, so scripts can run side by side
+
+    The module level functions use DEFAULT.
+    '''
+    def __init__(self):
+        self.keywords: Dict[str, Any] = dict(BUILTINS)
+        self.variables = VariableStore()
+        self.link_generation = 0  # Bumped whenever a keyword name may change meaning
+        self.inline_threshold = INLINE_THRESHOLD  # Bodies of at most this many instructions are inlined
+        self.parallel_pool = None  # Executor for 'parallel' blocks, None for daytona.parallel's thread pool
+        self.libraries = []  # daytona.library.Library indexes of files to load keywords from when needed
+        self.library_files = set()  # Paths of library files read
+        self.load_stats = LoadStats()
+        self.link_lock = threading.RLock()  # Held while linking and while reloading
+        self.tracer = None  # settrace hook, linked into bodies
+
+    def fork(self):
+        '''Copy with its own keywords and variables, sharing compiled instructions'''
+        forked = Interpreter()
+        forked.keywords = {keyword: kw_val.copy() if isinstance(kw_val, CompiledBody) else kw_val
+                           for keyword, kw_val in self.keywords.items()}
+        forked.variables.update(self.variables)
+        forked.inline_threshold = self.inline_threshold
+        forked.tracer = self.tracer
+        forked.parallel_pool = self.parallel_pool
+        forked.libraries = list(self.libraries)
+        forked.library_files = set(self.library_files)
+        return forked
+
+    def __getstate__(self):
+        '''Unlinked bodies, primitives and variables, for other processes'''
+        keywords = {}
+        for keyword, kw_val in self.keywords.items():
+            if isinstance(kw_val, CompiledBody):
+                kw_val = kw_val.copy()
+            elif callable(kw_val):
+                kw_val = PrimitiveReference.of(kw_val)
+            keywords[keyword] = kw_val
+        return {'keywords': keywords, 'variables': dict(self.variables), 'inline_threshold': self.inline_threshold,
+                'libraries': self.libraries, 'library_files': self.library_files}
+
+    def __setstate__(self, state):
+        self.__init__()
+        self.keywords.update((keyword, kw_val.resolve() if isinstance(kw_val, PrimitiveReference) else kw_val)
+                             for keyword, kw_val in state['keywords'].items())
+        self.variables.update(state['variables'])
+        self.inline_threshold = state['inline_threshold']
+        self.libraries = state['libraries']
+        self.library_files = state['library_files']
+
+    # ----- Linking -----
+
+    def invalidate_links(self):
+        '''Make every body resolve its keyword references again before running'''
+        self.link_generation += 1
+
+    def resolve_keyword(self, keyword):
+        '''The primitive or compiled body a keyword name refers to, or None
+
+        Lazy bodies are compiled, and library files loaded, here.
+        '''
+        kw_val = self.keywords.get(keyword)
+        if kw_val is None and self.libraries:
+            kw_val = self.load_library_keyword(keyword)
+        if not kw_val and not isinstance(kw_val, list):
+            return None
+        if not callable(kw_val) and not isinstance(kw_val, CompiledBody):  # Lazy, or placed in KEYWORDS directly
+            kw_val = self.keywords[keyword] = compile_body(keyword, kw_val)
+            self.load_stats.compiled += 1
+        return kw_val
+
+    def load_library_keyword(self, keyword):
+        '''Register the keywords of the library file that has keyword, if not read before, returning its body
+
+        They are registered lazily and only where not already registered, so
+        bodies linked before need not be linked again.
+        '''
+        for library in self.libraries:
+            path = library.index.get(keyword)
+            if path is not None:
+                break
+        else:
+            return None
+        if path in self.library_files:
+            return None
+        self.library_files.add(path)
+        bodies = {k: v for k, v in library.read(path).items()
+                  if library.index.get(k, path) == path and k not in self.keywords}
+        self.keywords.update(bodies)
+        self.load_stats.loaded += len(bodies)
+        self.load_stats.files += 1
+        return self.keywords.get(keyword)
+
+    def settrace(self, hook):
+        '''Call hook(frame, event, arg) as scripts run, or stop when hook is None
+
+        Events are 'enter' (arg is the call's arguments), 'line' (before it
+        runs), 'primitive' (arg is (keyword, arguments)) and 'exit' (arg is the
+        value returned). Bodies are linked again with the hook in them and
+        nothing inlined, so there is no cost without one. Traced scripts run
+        interpreted even when jit is asked for.
+        '''
+        self.tracer = hook
+        self.invalidate_links()
+
+    def gettrace(self):
+        return self.tracer
+
+    def set_inline_threshold(self, instructions):
+        '''Inline calls to bodies of at most this many instructions, zero for none'''
+        self.inline_threshold = instructions
+        self.invalidate_links()
+
+    def assignment(self, instruction):
+        ''''set' or 'local' for lines the builtins will handle that can be linked as stores'''
+        if instruction.assigns is None:
+            return None
+        op, operand = instruction.code[-1]
+        if op != Op.CALL_KEYWORD:
+            return None
+        keyword, nargs = operand
+        if keyword == 'set' and nargs == 2 and self.keywords.get(keyword) is do_set.__wrapped__:
+            return keyword
+        if keyword == 'local' and nargs in (1, 2) and self.keywords.get(keyword) is do_local.__wrapped__:
+            return keyword
+        return None
+
+    def link_variables(self, body):
+        '''Give each variable declared 'local' a slot in the body's frames'''
+        body.locals = {}
+        for instruction in body.instructions:
+            if self.assignment(instruction) == 'local' and instruction.assigns not in body.locals:
+                body.locals[instruction.assigns] = len(body.locals)
+        body.nlocals = len(body.locals)
+
+    def link_code(self, body, instruction):
+        '''Instruction code with keyword and variable names resolved to their targets'''
+        code = instruction.code
+        kind = self.assignment(instruction)
+        if kind is not None:  # Drop the pushed name and store the value straight into its slot
+            body.depends.add(kind)
+            if instruction.assigns in body.locals:
+                store = (Op.STORE_LOCAL, body.locals[instruction.assigns])
+            else:
+                store = (Op.STORE_GLOBAL, self.variables.slot(instruction.assigns))
+            if code[-1][1][1] == 1:  # 'local NAME' only declares it
+                code = ((Op.PUSH, 'None'),)
+            else:
+                code = code[1:-1] + (store,)
+        linked = []
+        for op, operand in code:
+            if op == Op.PUSH_VAR:
+                if operand in body.locals:
+                    op, operand = Op.PUSH_LOCAL, body.locals[operand]
+                else:
+                    op, operand = Op.PUSH_GLOBAL, self.variables.slot(operand)
+            elif op == Op.CALL_KEYWORD:
+                target = self.resolve_keyword(operand[0])
+                body.depends.add(operand[0])
+                if target is None:  # Still looked up, and fails, when it runs
+                    context = Context(parent_keyword=instruction.keyword, line_no=instruction.line_no)
+                    body.unresolved.append(ScriptError(context, f'No such keyword "{operand[0]}"'))
+                elif target is do_yield.__wrapped__ and operand[1] == 0:
+                    op, operand = Op.YIELD, None
+                elif callable(target):
+                    op = Op.CALL_ASYNC if inspect.iscoroutinefunction(target) else Op.CALL_PRIMITIVE
+                    if self.tracer is not None:
+                        target = traced_primitive(self.tracer, operand[0], target)
+                    operand = (target, operand[1])
+                else:
+                    op, operand = Op.CALL_BODY, (target, operand[1])
+            linked.append((op, operand))
+        return tuple(linked)
+
+    def link_spawn(self, body, instruction):
+        '''Code for a 'parallel' line, ending in SPAWN of its call, and the store of a 'set' or 'local' or None'''
+        if instruction.code[-1][0] == Op.FAIL:
+            return instruction.code, None
+        code = self.link_code(body, instruction)
+        store = None
+        call = instruction.code[-1]
+        if code[-1][0] in (Op.STORE_GLOBAL, Op.STORE_LOCAL):  # The value is stored when joined
+            code, store, call = code[:-1], code[-1], instruction.code[-2]
+        if call[0] == Op.CALL:  # Keyword is itself a value on the stack
+            spawn = (Op.SPAWN, (None, call[1] - 1, None))
+        else:
+            spawn = (Op.SPAWN, (call[1][0], call[1][1], self.resolve_keyword(call[1][0])))
+        return code[:-1] + (spawn,), store
+
+    def inline_call(self, body, instruction, linking):
+        '''Lines to run in place of a statement calling a small body, or None'''
+        *arg_code, (op, operand) = instruction.code
+        if op != Op.CALL_BODY or any(arg_op != Op.PUSH for arg_op, _ in arg_code):
+            return None
+        callee = operand[0]
+        if callee in linking:  # Recursive, keep the call
+            return None
+        if callee.generation != self.link_generation:
+            self.link_body(callee, linking)
+        if len(callee.linked) > self.inline_threshold or callee.nlocals:
+            return None
+        args = tuple(value for _, value in arg_code)
+        inlined = [replace(line, code=substitute_args(line.code, args)) for line in callee.linked]
+        # Calls start with $? as 'None' and return 'None' when empty
+        if not inlined or any(op == Op.PUSH_RETVAL for op, _ in inlined[0].code):
+            inlined.insert(0, reset_retval(callee.keyword, 0))
+        body.unresolved.extend(callee.unresolved)
+        body.depends.update(callee.depends)
+        return inlined
+
+    def link_body(self, body, linking=()):
+        '''Resolve keyword names to their targets so calls need not look them up'''
+        with self.link_lock:  # Not while reload_keywords swaps bodies
+            linking = linking + (body,)
+            body.unresolved = []
+            body.depends = set()
+            self.link_variables(body)
+            linked = []
+            stores = []  # Of each line in the 'parallel' block being linked
+            for instruction in body.instructions:
+                keyword = instruction.words[0][1] if instruction.control else None
+                if instruction.spawn:
+                    code, store = self.link_spawn(body, instruction)
+                    stores.append(store)
+                elif keyword == 'join':
+                    code = ((Op.JOIN, tuple(stores)),)
+                    stores = []
+                else:
+                    code = self.link_code(body, instruction)
+                if self.tracer is not None and not instruction.spawn and keyword not in ('else', 'end', 'parallel'):
+                    code = ((Op.TRACE, (self.tracer, 'line')),) + code
+                instruction = replace(instruction, code=code)
+                inlined = None
+                if not instruction.control and not instruction.spawn and self.inline_threshold > 0 and \
+                        self.tracer is None:
+                    inlined = self.inline_call(body, instruction, linking)
+                if inlined is None:
+                    linked.append(instruction)
+                else:
+                    linked.extend(inlined)
+            match_blocks(body, linked)
+            body.linked = linked
+            body.code, body.locations = flatten(linked)
+            if self.tracer is not None:
+                trace_code(body, self.tracer)
+            body.generation = self.link_generation
+
+    def link(self, start_keyword=None):
+        '''Link bodies reachable from start_keyword (or all), returning errors for unresolved names'''
+        if start_keyword is None:
+            pending = list(self.keywords)
+        else:
+            pending = [start_keyword]
+        pending = [self.resolve_keyword(keyword) for keyword in pending]
+        errors = []
+        seen = set()
+        while pending:
+            body = pending.pop(0)
+            if not isinstance(body, CompiledBody) or id(body) in seen:
+                continue
+            seen.add(id(body))
+            if body.generation != self.link_generation:
+                self.link_body(body)
+            errors.extend(error for error in body.unresolved if id(error) not in seen)
+            seen.update(id(error) for error in body.unresolved)  # Inlined bodies share theirs
+            pending.extend(operand[0] if op == Op.CALL_BODY else operand[2] for instruction in body.linked
+                           for op, operand in instruction.code if op in (Op.CALL_BODY, Op.SPAWN))
+        return errors
+
+    # ----- Running -----
+
+    def call_keyword(self, context, keyword, args, max_depth=MAX_CALL_DEPTH, jit=False, profile=None, limits=None):
+        '''Call a keyword by name, for use by primitives and execute_script'''
+        kw_val = self.resolve_keyword(keyword)
+        if not kw_val:
+            raise ScriptError(context, f'No such keyword "{keyword}"')
+        if callable(kw_val):
+            if self.tracer is not None:
+                self.tracer(context, 'primitive', (keyword, args))
+            result = kw_val(args, context)  # TODO: reverse this
+            if inspect.isawaitable(result):
+                result = run_awaitable(result, context)
+            context, ret = result
+        elif profile is not None:
+            ret = profile.run(self, kw_val, args, max_depth, limits)
+        elif limits is not None:
+            ret = self.run(kw_val, args, max_depth, limits)
+        elif jit and self.tracer is None:
+            from daytona.jit import execute
+            ret = execute(kw_val, args, max_depth, self)
+        else:
+            ret = self.run(kw_val, args, max_depth)
+        return context, return_value(ret)
+
+    def run(self, body, args, max_depth=MAX_CALL_DEPTH, limits=None):
+        '''Run a body and everything it calls, returning its value'''
+        execution = Execution(self, body, args, max_depth, limits)
+        if limits is not None:
+            return self.run_limited(execution, limits)
+        awaitable = execution.resume()
+        while awaitable is not None:
+            if awaitable is not YIELDED:  # Nothing else to run, so carry on
+                execution.send(run_awaitable(awaitable, execution.frame))
+            awaitable = execution.resume()
+        return execution.value
+
+    def run_limited(self, execution, limits):
+        '''Run an Execution a quota of instructions at a time, spending them against limits'''
+        while True:
+            quota = limits.quota()
+            awaitable = execution.resume(quota)
+            limits.spend(execution.frame, quota - execution.remaining, awaitable)
+            if awaitable is None:
+                return execution.value
+            if awaitable is not YIELDED:  # Nothing else to run, so carry on
+                execution.send(run_awaitable(awaitable, execution.frame))
+
+    async def run_async(self, body, args, max_depth=MAX_CALL_DEPTH, limits=None):
+        '''Run a body and everything it calls, awaiting async primitives, returning its value'''
+        execution = Execution(self, body, args, max_depth, limits)
+        quota = limits.quota() if limits else 0
+        awaitable = execution.resume(quota)
+        while True:
+            if limits is not None:
+                limits.spend(execution.frame, quota - execution.remaining, awaitable)
+            if awaitable is None:
+                break
+            if awaitable is YIELDED:  # Let other tasks run
+                await asyncio.sleep(0)
+            else:
+                execution.send(await awaitable)
+            quota = limits.quota() if limits else 0
+            awaitable = execution.resume(quota)
+        return execution.value
+
+    # ----- API -----
+
+    def register_primitive(self, name, func):
+        self.keywords[name] = func
+        self.invalidate_links()
+
+    def primitive(self, name):
+        def decorate(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                # TODO: auto management of Context?
+                return fn(*args, **kwargs)  # NOTE: unit test coverage misses this line it is a mystery
+            self.register_primitive(name, fn)
+            return wrapper
+        return decorate
+
+    def compile_keywords(self, keyword_dict, optimize=False, removed=()):
+        '''Keyword bodies compiled (and optimized) for this interpreter, and the optimizations made
+
+        Bodies compiled already are copied, as each interpreter links its own.
+        Optimizing folds against the table as it will be once keyword_dict is
+        registered and the keywords in removed are gone.
+        '''
+        compiled = {k: compile_body(k, v) if isinstance(v, list) else own_body(v)
+                    for k, v in keyword_dict.items()}
+        self.load_stats.compiled += sum(1 for v in keyword_dict.values() if isinstance(v, list))
+        report = []
+        if optimize:
+            from daytona.optimize import optimize_body
+            table = ChainMap(compiled, dict.fromkeys(removed), self.keywords)
+            for keyword, body in compiled.items():
+                if isinstance(body, CompiledBody):
+                    compiled[keyword], optimizations = optimize_body(body, table)
+                    report.extend(optimizations)
+        return compiled, report
+
+    def register_keywords(self, keyword_dict, optimize=False, lazy=False):
+        '''With optimize, returns the list of optimizations made to the bodies
+
+        With lazy, bodies are compiled when first needed (when something that
+        calls them is linked), so errors in them are only found then.
+        '''
+        if lazy:
+            if optimize:
+                raise ValueError('Lazy keywords cannot be optimized, as they are compiled when first needed')
+            compiled, report = {k: own_body(v) for k, v in keyword_dict.items()}, []
+        else:
+            compiled, report = self.compile_keywords(keyword_dict, optimize)
+        self.load_stats.loaded += len(compiled)
+        # Note will squash existing keys
+        self.keywords.update(compiled)
+        self.invalidate_links()
+        return report
+
+    def reload_keywords(self, keyword_dict, replaces=(), optimize=False):
+        '''Register keyword_dict, compiling only the bodies that differ from those registered
+
+        Keywords in replaces (those loaded from the same place before) that are
+        not in keyword_dict are removed. Bodies that call or inlined what
+        changed link again when next needed, the rest keep their links. The
+        table changes in one step; calls in progress finish with the code they
+        started with. Returns a ReloadReport.
+        '''
+        started = time.perf_counter()
+        reload = ReloadReport()
+        changes = {}
+        for keyword, kw_val in keyword_dict.items():
+            current = self.keywords.get(keyword)
+            if current is None:
+                reload.added.append(keyword)
+            elif (current.source if isinstance(current, CompiledBody) else current) == kw_val:
+                reload.unchanged += 1
+                continue
+            else:
+                reload.changed.append(keyword)
+            changes[keyword] = kw_val
+        reload.removed = [keyword for keyword in replaces if keyword not in keyword_dict and keyword in self.keywords]
+        compiled, reload.report = self.compile_keywords(changes, optimize, reload.removed)  # Raises before anything changes
+        swapping = time.perf_counter()
+        reload.compile_time = swapping - started
+        with self.link_lock:
+            self.keywords.update(compiled)
+            for keyword in reload.removed:
+                del self.keywords[keyword]
+            reload.relinked = self.invalidate_dependents(set(compiled).union(reload.removed))
+        reload.swap_time = time.perf_counter() - swapping
+        self.load_stats.loaded += len(compiled)
+        reload.total_time = time.perf_counter() - started
+        return reload
+
+    def invalidate_dependents(self, names):
+        '''Have linked bodies that resolved any of names link again, returning how many
+
+        So do their callers, directly or not, as jit functions call each other's functions.
+        '''
+        jit = sys.modules.get('daytona.jit')
+        linked = [kw_val for kw_val in self.keywords.values()
+                  if isinstance(kw_val, CompiledBody) and kw_val.generation == self.link_generation]
+        callers = {}  # id of body => bodies calling it
+        for body in linked:
+            for op, operand in body.code:
+                if op == Op.CALL_BODY or op == Op.SPAWN and isinstance(operand[2], CompiledBody):
+                    callers.setdefault(id(operand[0] if op == Op.CALL_BODY else operand[2]), []).append(body)
+        stale = [body for body in linked if not body.depends.isdisjoint(names)]
+        seen = set(id(body) for body in stale)
+        for body in stale:  # Grows as callers are found
+            for caller in callers.get(id(body), ()):
+                if id(caller) not in seen:
+                    seen.add(id(caller))
+                    stale.append(caller)
+        for body in stale:
+            body.generation = -1
+            if jit is not None:  # Linked again at the same link_generation, so the function would look current
+                jit.CACHE.pop(body, None)
+        return len(stale)
+
+    def register_variables(self, variables_dict):
+        # Note will squash existing keys
+        self.variables.update(variables_dict)
+
+    def add_library(self, library):
+        '''Load keywords not otherwise registered from a daytona.library.Library, or the paths for one
+
+        Each file is read when one of its keywords is first needed.
+        '''
+        from daytona.library import Library
+        if not isinstance(library, Library):
+            library = Library(library)
+        self.libraries.append(library)
+        self.invalidate_links()  # Names that did not resolve may now
+        return library
+
+    def set_parallel_pool(self, pool):
+        '''Run the lines of 'parallel' blocks on pool, a concurrent.futures Executor, or None for the default
+
+        See daytona.parallel.process_pool for running them in other processes.
+        '''
+        self.parallel_pool = pool
+
+    def link_script(self, start_keyword):
+        '''Link what start_keyword runs, raising for every name that will not resolve'''
+        if self.resolve_keyword(start_keyword) is None:  # More intuitive error output
+            raise ScriptError(None, f'No such keyword "{start_keyword}"')
+        errors = self.link(start_keyword)
+        if errors:  # Report every name that will not resolve, before running anything
+            msg = errors[0].msg
+            if len(errors) > 1:
+                msg += f' (also {", ".join(str(error) for error in errors[1:])})'
+            raise ScriptError(errors[0].context, msg)
+
+    def execute_script(self, start_keyword, *args, max_depth=MAX_CALL_DEPTH, jit=None, profile=None, budget=None,
+                       timeout=None):
+        '''Start executing at the following keyword (generally 'main')
+
+        jit=True runs keywords as generated Python functions, None uses JIT_DEFAULT.
+        profile, a daytona.profile.Profiler, times each keyword and line, running them interpreted.
+        budget (instructions) and timeout (seconds) stop the script with a ScriptError where it got to,
+        running it interpreted; see Limits.
+        '''
+        self.link_script(start_keyword)
+        context = Context(parent_keyword=start_keyword, interpreter=self)
+        args = tuple(args)
+        limits = None if budget is None and timeout is None else Limits(budget, timeout)
+        _, retval = self.call_keyword(context, start_keyword, args, max_depth, JIT_DEFAULT if jit is None else jit,
+                                      profile, limits)
+        return retval
+
+    async def execute_script_async(self, start_keyword, *args, max_depth=MAX_CALL_DEPTH, budget=None, timeout=None):
+        '''execute_script, but awaiting async primitives so other tasks run meanwhile
+
+        Always interprets, as jit functions cannot wait.
+        '''
+        self.link_script(start_keyword)
+        kw_val = self.resolve_keyword(start_keyword)
+        args = tuple(args)
+        if callable(kw_val):
+            result = kw_val(args, Context(parent_keyword=start_keyword, interpreter=self))
+            if inspect.isawaitable(result):
+                result = await result
+            _, ret = result
+        else:
+            limits = None if budget is None and timeout is None else Limits(budget, timeout)
+            ret = await self.run_async(kw_val, args, max_depth, limits)
+        return return_value(ret)
+
+    def run_many(self, scripts, max_workers=None, max_depth=MAX_CALL_DEPTH, jit=None):
+        '''Run (start_keyword, *args) scripts on a thread pool, returning their values in order
+
+        Each worker thread has its own fork of this interpreter and each script
+        starts from a copy of the variables as they were, so scripts cannot see
+        each other's changes. A script that fails gives its ScriptError instead.
+        '''
+        variables = dict(self.variables)
+        workers = threading.local()
+
+        def run_one(script):
+            forked = getattr(workers, 'interpreter', None)
+            if forked is None:
+                forked = workers.interpreter = self.fork()
+            else:
+                forked.variables.clear()
+                forked.variables.update(variables)
+            try:
+                return forked.execute_script(*script, max_depth=max_depth, jit=jit)
+            except ScriptError as ex:
+                return ex
 
-    if context.state == InterpreterState.STATE_ELSE:
-        raise ScriptError(context, '"else" keyword is extraneous')
+        with ThreadPoolExecutor(max_workers) as pool:
+            return list(pool.map(run_one, scripts))
 
-    if context.state == InterpreterState.STATE_IF_PASS:
-        context.state = InterpreterState.STATE_ELSE
-        context.skipping = False
-    if context.state in (InterpreterState.STATE_IF_RUN, InterpreterState.STATE_IF_DONE):
-        context.state = InterpreterState.STATE_ELSE
-        context.skipping = True
-    return context, None
+    def execute_batch(self, start_keyword, arg_tuples, max_workers=None, ordered=True, chunksize=100,
+                      max_depth=MAX_CALL_DEPTH, jit=None, mp_context=None):
+        '''Run start_keyword once per argument tuple on a process pool, yielding BatchResults
 
+        See daytona.batch.
+        '''
+        from daytona.batch import execute_batch
+        return execute_batch(self, start_keyword, arg_tuples, max_workers=max_workers, ordered=ordered,
+                             chunksize=chunksize, max_depth=max_depth, jit=JIT_DEFAULT if jit is None else jit,
+                             mp_context=mp_context)
 
-@primitive('end')
-def end_keyword(args, context=None, **kwargs):
-    safe_end = (InterpreterState.STATE_IF_RUN,
-                InterpreterState.STATE_IF_PASS,
-                InterpreterState.STATE_ELSE,
-                InterpreterState.STATE_IF_DONE,
-                InterpreterState.STATE_IF_PASS_ALL)
 
-    if args and len(args) > 0:
-        raise ScriptError(context, '"end" keyword has arguments')
+#
+# ===== API Routines =====
+#
 
-    if context.state not in safe_end:
-        raise ScriptError(context, '"end" keyword not within "if" statement')
+BUILTINS: Dict[str, Any] = {}  # Primitives every Interpreter starts with
+DEFAULT = Interpreter()
+KEYWORDS = DEFAULT.keywords
+VARIABLES = DEFAULT.variables
+
+invalidate_links = DEFAULT.invalidate_links
+resolve_keyword = DEFAULT.resolve_keyword
+set_inline_threshold = DEFAULT.set_inline_threshold
+settrace = DEFAULT.settrace
+gettrace = DEFAULT.gettrace
+link_body = DEFAULT.link_body
+link = DEFAULT.link
+run = DEFAULT.run
+register_primitive = DEFAULT.register_primitive
+primitive = DEFAULT.primitive
+register_keywords = DEFAULT.register_keywords
+reload_keywords = DEFAULT.reload_keywords
+register_variables = DEFAULT.register_variables
+add_library = DEFAULT.add_library
+set_parallel_pool = DEFAULT.set_parallel_pool
+execute_script = DEFAULT.execute_script
+execute_script_async = DEFAULT.execute_script_async
+run_many = DEFAULT.run_many
+execute_batch = DEFAULT.execute_batch
+
+
+def builtin(name):
+    '''Register a primitive with DEFAULT and every Interpreter made after'''
+    def decorate(fn):
+        BUILTINS[name] = fn
+        return primitive(name)(fn)
+    return decorate
 
-    pcontext = context.parent_context
-    pcontext.line_no = context.line_no + 1  # TODO is true?
-    return pcontext, None
 
+# ===== KEYWORDS =========
 
 # ===== Base keywords =====
 
-@primitive('print')
+@builtin('print')
 def do_print(args, context):
     print(' '.join([str(i) for i in args]))
     return context, None
 
 
-@primitive('set')
+@builtin('set')
 def do_set(args, context):
     if not args or len(args) != 2:
         raise ScriptError(context, '"set" keyword requires two arguments')
-    VARIABLES[args[0]] = str(args[1])
+    interpreter_of(context).variables[args[0]] = args[1]
     return context, None
 
 
-# TODO: sleep, exit, return
+@builtin('local')
+def do_local(args, context):
+    '''Only runs when misused, as proper 'local' lines are linked into stores'''
+    raise ScriptError(context, '"local" keyword requires a variable name and optional value')
+
+
+@builtin('sleep')
+async def do_sleep(args, context):
+    '''Waits without holding up other scripts when run by execute_script_async'''
+    if not args or len(args) != 1:
+        raise ScriptError(context, '"sleep" keyword requires seconds')
+    try:
+        seconds = float(args[0])
+    except (TypeError, ValueError) as ex:
+        raise ScriptError(context, '"sleep" keyword accepts numbers only') from ex
+    await asyncio.sleep(seconds)
+    return context, None
+
+
+@builtin('yield')
+def do_yield(args, context):
+    '''Linked into a switch to another script when scheduled, so this only runs for dynamic calls'''
+    return context, None
+
+
+# TODO: exit, return
 
 # ===== Arithmetic/logic keywords =====
 
 # TODO: decorator such that it ensures arg count and type
 
-@primitive('++')
+def to_number(keyword, value, context):
+    '''Values are usually ints already, but strings of digits still count'''
+    if type(value) is int:
+        return value
+    try:
+        return int(value)
+    except (TypeError, ValueError) as ex:
+        raise ScriptError(context, f'"{keyword}" keyword accepts numbers only') from ex
+
+
+@builtin('++')
 def do_increment(args, context):
     if not args or len(args) != 1:
         raise ScriptError(context, '"++" keyword is unary')
-    val = None
-    try:
-        val = int(args[0])
-    except ValueError as ex:
-        raise ScriptError(context, '"++" keyword accepts numbers only') from ex
-    return context, str(val + 1)
+    return context, to_number('++', args[0], context) + 1
 
 
-@primitive('--')
+@builtin('--')
 def do_decrement(args, context):
     if not args or len(args) != 1:
         raise ScriptError(context, '"--" keyword is unary')
-    try:
-        val = int(args[0])
-    except ValueError as ex:
-        raise ScriptError(context, '"--" keyword accepts numbers only') from ex
-    return context, str(val - 1)
+    return context, to_number('--', args[0], context) - 1
 
 
-@primitive('+')
+@builtin('+')
 def do_add(args, context):
     if not args or len(args) == 0:
         raise ScriptError(context, '"+" keyword requires arguments')
     sum = 0
     for arg in args:
-        try:
-            sum += int(arg)
-        except ValueError as ex:
-            raise ScriptError(context, '"+" keyword accepts numbers only') from ex
-    return context, str(sum)
+        sum += arg if type(arg) is int else to_number('+', arg, context)
+    return context, sum
 
 # TODO: subtract, multiply, divide, boolean logic
 
@@ -0,0 +1,103 @@
+'''
+Run one keyword over many argument tuples on a process pool
+
+Each worker process is given the Interpreter once, when it starts, and then
+runs chunks of argument tuples against it. Results stream back as they are
+done, either in the order the arguments came or as chunks finish.
+'''
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass
+from itertools import islice
+import os
+from typing import Any, Tuple
+
+from daytona import ScriptError, MAX_CALL_DEPTH
+
+
+WORKER = None  # This worker process's Interpreter
+
+
+@dataclass
+class BatchResult:
+    index: int  # Position of args in the arguments given
+    args: Tuple
+    value: Any = None
+    error: ScriptError = None
+
+
+def start_worker(interpreter):
+    global WORKER
+    WORKER = interpreter
+
+
+def run_chunk(start_keyword, chunk, max_depth, jit):
+    '''(value, error) for each argument tuple in chunk'''
+    results = []
+    for args in chunk:
+        try:
+            results.append((WORKER.execute_script(start_keyword, *args, max_depth=max_depth, jit=jit), None))
+        except ScriptError as ex:
+            results.append((None, ex))
+    return results
+
+
+def chunked(arg_tuples, chunksize):
+    '''(index of first, list of tuples) for each chunk'''
+    arg_tuples = iter(arg_tuples)
+    index = 0
+    while True:
+        chunk = [tuple(args) for args in islice(arg_tuples, chunksize)]
+        if not chunk:
+            return
+        yield index, chunk
+        index += len(chunk)
+
+
+def execute_batch(interpreter, start_keyword, arg_tuples, max_workers=None, ordered=True, chunksize=100,
+                  max_depth=MAX_CALL_DEPTH, jit=False, mp_context=None):
+    '''Run start_keyword with each of arg_tuples on a process pool, returning a generator of BatchResults
+
+    A script that fails gives a BatchResult with its ScriptError, but one that
+    cannot be linked raises here. With ordered False, results come as chunks
+    finish. Only a few chunks per worker are read ahead of the results, so
+    arg_tuples can be a long generator.
+    '''
+    interpreter.link_script(start_keyword)  # Fail now rather than once per item
+    max_workers = max_workers or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(max_workers, mp_context=mp_context, initializer=start_worker, initargs=(interpreter,))
+    return stream(pool, max_workers, chunked(arg_tuples, chunksize), ordered, start_keyword, max_depth, jit)
+
+
+def stream(pool, max_workers, chunks, ordered, start_keyword, max_depth, jit):
+    '''Keep a few chunks per worker in flight, yielding their results'''
+    in_flight = {}  # future => (index, chunk)
+    order = deque()  # Futures in the order submitted
+
+    def submit():
+        for index, chunk in islice(chunks, 2 * max_workers - len(in_flight)):
+            future = pool.submit(run_chunk, start_keyword, chunk, max_depth, jit)
+            in_flight[future] = (index, chunk)
+            if ordered:
+                order.append(future)
+
+    def results(future):
+        index, chunk = in_flight.pop(future)
+        for offset, (value, error) in enumerate(future.result()):
+            yield BatchResult(index + offset, chunk[offset], value, error)
+
+    try:
+        submit()
+        while in_flight:
+            if ordered:
+                done = [order.popleft()]
+            else:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from results(future)
+            submit()
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+# EOF
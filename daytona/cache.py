@@ -0,0 +1,153 @@
+'''
+Keep compiled script files on disk, as Python keeps .pyc files
+
+Loading a script file (YAML or daytona.compact) parses it and compiles every keyword. The
+compiled keywords are written to a cache file next to it (in __pycache__),
+keyed by a hash of the file and by VERSION, so later loads of the same
+file read them back instead. A cache file that does not match is ignored
+and written again.
+
+Cache files are pickles, so are trusted just as .pyc files are.
+'''
+
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+import hashlib
+import os
+import pickle
+import sys
+import time
+from typing import Dict, List
+
+import daytona
+from daytona.compact import load_source
+
+
+FORMAT = 1  # Bump when what is written changes
+
+
+def compiler_digest():
+    '''Hash of the modules that compile keywords, so a changed compiler does not read old caches'''
+    digest = hashlib.sha256()
+    package = os.path.dirname(os.path.abspath(daytona.__file__))
+    for name in ('__init__.py', 'optimize.py'):
+        try:
+            with open(os.path.join(package, name), 'rb') as f:
+                digest.update(f.read())
+        except OSError:  # Not installed as files, so the format and Python version must do
+            pass
+    return digest.hexdigest()[:16]
+
+
+VERSION = f'{FORMAT}-{sys.implementation.cache_tag}-{compiler_digest()}'
+
+
+@dataclass
+class Loaded:
+    '''Keywords compiled from a script file, ready for register_keywords'''
+    path: str
+    keywords: Dict
+    report: List = field(default_factory=list)  # Optimizations, when compiled with optimize
+    warm: bool = False  # Read from the cache
+    timings: Dict[str, float] = field(default_factory=dict)  # Stage => seconds
+
+    def __str__(self):
+        stages = ', '.join(f'{stage} {seconds * 1000:.2f}ms' for stage, seconds in self.timings.items())
+        return (f'{"warm" if self.warm else "cold"} start of {self.path}: {len(self.keywords)} keywords, '
+                f'{stages}, total {sum(self.timings.values()) * 1000:.2f}ms')
+
+
+@contextmanager
+def timed(timings, stage):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - started
+
+
+def cache_path(path):
+    '''Where the cache for a script file goes'''
+    directory, name = os.path.split(os.path.abspath(path))
+    return os.path.join(directory, '__pycache__', f'{name}.{sys.implementation.cache_tag}.daytona')
+
+
+def cache_key(source, optimize, pure=()):
+    '''pure names the primitives optimizing could fold, as a table that lacks one compiles differently'''
+    return {'version': VERSION, 'hash': hashlib.sha256(source).hexdigest(), 'optimize': optimize, 'pure': pure}
+
+
+def read_cache(filename, key):
+    '''(keywords, report) from a cache file made with key, None if there is no such cache'''
+    try:
+        with open(filename, 'rb') as f:
+            if pickle.load(f) != key:  # Only the header is read for a stale cache
+                return None
+            return pickle.load(f)
+    except Exception:  # Missing, damaged or from something else, so compile as if it were not there
+        return None
+
+
+def write_cache(filename, key, keywords, report):
+    '''Replace the cache file in one go, so a reader never sees half of it'''
+    temporary = f'{filename}.{os.getpid()}'
+    try:
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with open(temporary, 'wb') as f:
+            pickle.dump(key, f, pickle.HIGHEST_PROTOCOL)
+            pickle.dump((keywords, report), f, pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, filename)
+    except OSError:  # Read only, say; the next load compiles again
+        try:
+            os.unlink(temporary)
+        except OSError:
+            pass
+
+
+def load(path, optimize=False, interpreter=None, use_cache=True, refresh=False):
+    '''Compiled keywords of a script file, from its cache when that is up to date
+
+    interpreter (daytona.DEFAULT) is the one they will be registered with, as
+    optimizing depends on its keywords. Compile errors raise ScriptError and
+    leave any cache alone. With use_cache False, the cache is neither read
+    nor written; with refresh, it is written but not read.
+    '''
+    interpreter = interpreter or daytona.DEFAULT
+    loaded = Loaded(path=path, keywords={})
+    timings = loaded.timings
+    with timed(timings, 'read'):
+        with open(path, 'rb') as f:
+            source = f.read()
+    with timed(timings, 'hash'):
+        if optimize:
+            from daytona.optimize import pure_primitives
+            key = cache_key(source, optimize, pure_primitives(interpreter.keywords))
+        else:
+            key = cache_key(source, optimize)
+    filename = cache_path(path)
+    if use_cache and not refresh:
+        with timed(timings, 'read cache'):
+            cached = read_cache(filename, key)
+        if cached is not None:
+            loaded.keywords, loaded.report = cached
+            loaded.warm = True
+            return loaded
+    with timed(timings, 'parse'):
+        keyword_dict = load_source(source, path)
+    with timed(timings, 'compile'):
+        loaded.keywords, loaded.report = interpreter.compile_keywords(keyword_dict, optimize)
+    if use_cache:
+        with timed(timings, 'write cache'):
+            write_cache(filename, key, loaded.keywords, loaded.report)
+    return loaded
+
+
+def load_keywords(path, optimize=False, interpreter=None, use_cache=True, refresh=False):
+    '''Load a script file as load() does and register its keywords, returning the Loaded'''
+    interpreter = interpreter or daytona.DEFAULT
+    loaded = load(path, optimize, interpreter, use_cache, refresh)
+    with timed(loaded.timings, 'register'):
+        interpreter.register_keywords(loaded.keywords)
+    return loaded
+
+# EOF
@@ -0,0 +1,157 @@
+'''
+Compact script format, parsed a line at a time
+
+    # Comments and blank lines are skipped
+    main:
+        print This is an example script
+        if 1
+            print It performs a test
+        end
+    nothing:
+
+A line that does not start with whitespace and ends with ':' starts a
+keyword, and the indented lines after it, stripped, are its body. Files
+ending in EXTENSION give the same keyword dict that the YAML format would,
+without the YAML parser, and the other script loaders (daytona.cache,
+daytona.library, daytona.reload) read either by way of read_keywords.
+
+    python -m daytona.compact script.yml [...]
+
+writes script.day next to each YAML file given.
+'''
+
+import argparse
+import os
+import sys
+
+from daytona import ScriptError
+
+
+EXTENSION = '.day'
+
+
+def is_compact(path):
+    return path.endswith(EXTENSION)
+
+
+def parse(lines, name='<script>'):
+    '''(keyword, body) for each keyword of lines, as each ends'''
+    keyword = None
+    body = None
+    seen = set()
+    for line_no, line in enumerate(lines, 1):
+        text = line.strip()
+        if not text or text[0] == '#':
+            continue
+        if line[0] in ' \t':
+            if keyword is None:
+                raise ScriptError(None, f'{name}@{line_no}: Indented line before any keyword')
+            body.append(text)
+        elif text[-1] == ':':
+            if keyword is not None:
+                yield keyword, body
+            keyword, body = text[:-1].rstrip(), []
+            if not keyword or keyword in seen:
+                raise ScriptError(None, f'{name}@{line_no}: Keyword "{keyword}" is empty or already given')
+            seen.add(keyword)
+        else:
+            raise ScriptError(None, f'{name}@{line_no}: Expected "keyword:" or an indented line of its body')
+    if keyword is not None:
+        yield keyword, body
+
+
+def scan(path):
+    '''Keywords of a compact script file, without reading their bodies'''
+    keywords = []
+    with open(path, 'r') as f:
+        for line in f:
+            if line[0] not in ' \t#\n':
+                text = line.rstrip()
+                if text[-1:] == ':':
+                    keywords.append(text[:-1].rstrip())
+    return keywords
+
+
+def load_yaml(source):
+    import yaml  # Only when needed, as importing it takes a while
+    return yaml.safe_load(source) or {}
+
+
+def parse_errors():
+    '''Exceptions besides ScriptError that reading a script file has raised, for except clauses
+
+    Only YAML files raise others, and reading one imports yaml, so it is not imported here.
+    '''
+    yaml = sys.modules.get('yaml')
+    return (yaml.YAMLError,) if yaml is not None else ()
+
+
+def load_source(source, path):
+    '''Keyword dict of a script file's text (or bytes), in the format its name says'''
+    if is_compact(path):
+        if isinstance(source, bytes):
+            source = source.decode()
+        return dict(parse(source.splitlines(), path))
+    return load_yaml(source)
+
+
+def read_keywords(path):
+    '''Keyword dict of a script file of either format'''
+    with open(path, 'r') as f:
+        if is_compact(path):
+            return dict(parse(f, path))
+        return load_yaml(f)
+
+
+OPENS = {'if', 'while', 'parallel'}  # Lines after these are indented a level more
+CLOSES = {'end', 'join'}  # These and the lines after them a level less
+ARMS = {'elif', 'else'}  # These a level less than the lines around them
+
+
+def indents(body):
+    '''Indent of each line of body, showing its blocks as scripts conventionally do'''
+    depth = 0
+    for text in body:
+        word = text.split(None, 1)[0]
+        if word in CLOSES:
+            depth = max(depth - 1, 0)
+        yield '    ' * (depth + (0 if word in ARMS and depth else 1))
+        if word in OPENS:
+            depth += 1
+
+
+def dumps(keyword_dict):
+    '''Compact text of a keyword dict, raising ValueError for what the format cannot hold'''
+    lines = []
+    for keyword, body in keyword_dict.items():
+        keyword = str(keyword)
+        if not keyword.strip() or keyword != keyword.strip() or keyword[0] == '#' or '\n' in keyword:
+            raise ValueError(f'Keyword "{keyword}" cannot be written compactly')
+        lines.append(f'{keyword}:')
+        body = ['' if line is None else str(line).strip() for line in body or []]
+        for text in body:
+            if not text or text[0] == '#' or '\n' in text:
+                raise ValueError(f'Line "{text}" of keyword "{keyword}" cannot be written compactly')
+        lines.extend(indent + text for indent, text in zip(indents(body), body))
+    return '\n'.join(lines) + '\n'
+
+
+def convert(path, output=None):
+    '''Write a YAML script file in the compact format (next to it, by default), returning where'''
+    output = output or os.path.splitext(path)[0] + EXTENSION
+    text = dumps(read_keywords(path))
+    with open(output, 'w') as f:
+        f.write(text)
+    return output
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Convert YAML script files to the compact format')
+    parser.add_argument('scripts', nargs='+', help='YAML script files')
+    args = parser.parse_args()
+
+    for script in args.scripts:
+        print(f'{script} => {convert(script)}')
+
+# EOF
@@ -0,0 +1,328 @@
+'''
+Transpile linked keyword bodies to Python functions
+
+Each body becomes one Python function: primitive calls are direct calls,
+'local' variables are Python locals, if/elif/else blocks are Python
+conditionals and while/break loops are Python loops. The lines of 'parallel' blocks are spawned just as the
+interpreter does, their futures held in Python locals until 'join'. Every line is given a Context of its own, so ScriptErrors
+report the same keyword@line as the interpreter does.
+
+Keyword calls use Python calls, so nesting is also limited by the Python
+recursion limit.
+'''
+
+import inspect
+import itertools
+import linecache
+import re
+import weakref
+
+import daytona
+from daytona import Op, Context, ScriptError, UNSET
+
+
+# CompiledBody => (Interpreter.link_generation, function, source)
+CACHE = weakref.WeakKeyDictionary()
+
+SOURCE_SERIAL = itertools.count(1)  # For a distinct file name per compile, so linecache can show the source
+
+
+class TooDeep(Exception):
+    '''Nesting limit reached; execute() knows the limit, so reports it'''
+    def __init__(self, context):
+        super().__init__()
+        self.context = context
+
+
+class Unsupported(Exception):
+    '''A line the transpiler cannot express; execute() interprets the body instead'''
+
+
+# ===== Helpers called from generated code =====
+
+def unset(context, name):
+    raise ScriptError(context, f'No variable ${name}')
+
+
+def noarg(context, index):
+    raise ScriptError(context, f'No such arg {index}')
+
+
+def fail(context, msg):
+    raise ScriptError(context, msg)
+
+
+def deep(context):
+    raise TooDeep(context)
+
+
+def spawn(context, keyword, args, room):
+    from daytona.parallel import spawn
+    return spawn(context, keyword, args, room, jit=True)
+
+
+def join(futures):
+    from daytona.parallel import join
+    return join(futures)
+
+
+def call_dynamic(words, context, room):
+    '''Call a keyword only known by name when it runs'''
+    keyword, args = words[0], words[1:]
+    target = context.interpreter.resolve_keyword(keyword)
+    if not target:
+        raise ScriptError(context, f'No such keyword "{keyword}"')
+    if callable(target):
+        result = target(args, context)
+        if inspect.isawaitable(result):
+            result = daytona.run_awaitable(result, context)
+        return daytona.return_value(result[1])
+    if room <= 0:
+        raise TooDeep(context)
+    return function(target, context.interpreter)(args, room - 1)
+
+
+# ===== Code generation =====
+
+class Namespace:
+    '''Globals of the generated functions, shared by one compile'''
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        self.globals = {
+            'UNSET': UNSET, 'values': interpreter.variables.values,
+            'unset': unset, 'noarg': noarg, 'fail': fail, 'deep': deep, 'call_dynamic': call_dynamic,
+            'run_awaitable': daytona.run_awaitable, 'spawn': spawn, 'join': join,
+        }
+        self.names = {}  # id of value => name in globals
+
+    def name(self, prefix, value):
+        key = (prefix, id(value))
+        if key not in self.names:
+            self.names[key] = f'{prefix}{len(self.names)}'
+            self.globals[self.names[key]] = value
+        return self.names[key]
+
+    def context(self, keyword, line_no):
+        key = ('C', keyword, line_no)
+        if key not in self.names:
+            self.names[key] = f'C{len(self.names)}'
+            self.globals[self.names[key]] = Context(parent_keyword=keyword, line_no=line_no,
+                                                    interpreter=self.interpreter)
+        return self.names[key]
+
+    def constant(self, value):
+        if type(value) in (str, int):
+            return repr(value)
+        return self.name('K', value)
+
+
+def function_name(body, serial):
+    return f'k_{re.sub(r"[^0-9a-zA-Z_]", "_", body.keyword)}_{serial}'  # Prefixed, as keywords may start with a digit
+
+
+def normalized(call):
+    return f"(r if (r := {call}) is not None and r != '' else 'None')"
+
+
+def expression(namespace, body, instruction, names, code):
+    '''Python statements for a line's code, the last leaving its value in "value"'''
+    here = namespace.context(instruction.keyword, instruction.line_no)
+    local_names = {slot: name for name, slot in body.locals.items()}
+    stack = []
+    statements = []
+
+    def pop(nargs):
+        args = stack[len(stack) - nargs:]
+        del stack[len(stack) - nargs:]
+        return f'({", ".join(args)}{"," if len(args) == 1 else ""})'
+
+    for op, operand in code:
+        if op == Op.PUSH:
+            stack.append(namespace.constant(operand))
+        elif op == Op.PUSH_GLOBAL:
+            name = namespace.interpreter.variables.names[operand]
+            stack.append(f'(v if (v := values[{operand}]) is not UNSET else unset({here}, {name!r}))')
+        elif op == Op.PUSH_LOCAL:
+            stack.append(f'(l{operand} if l{operand} is not UNSET else unset({here}, {local_names[operand]!r}))')
+        elif op == Op.PUSH_ARG:
+            stack.append(f'(args[{operand}] if {operand} < nargs else noarg({here}, {operand}))')
+        elif op == Op.PUSH_RETVAL:
+            stack.append('retval')
+        elif op == Op.CALL_PRIMITIVE:
+            func, nargs = operand
+            stack.append(normalized(f'{namespace.name("P", func)}({pop(nargs)}, {here})[1]'))
+        elif op == Op.CALL_ASYNC:  # Functions cannot wait, so this runs it to the end
+            func, nargs = operand
+            stack.append(normalized(f'run_awaitable({namespace.name("P", func)}({pop(nargs)}, {here}), {here})[1]'))
+        elif op == Op.CALL_BODY:
+            callee, nargs = operand
+            stack.append(f'({names[callee]}({pop(nargs)}, room - 1) if room > 0 else deep({here}))')
+        elif op == Op.CALL_KEYWORD:  # Did not resolve when linked
+            keyword, nargs = operand
+            stack.append(f'call_dynamic(({keyword!r},) + {pop(nargs)}, {here}, room)')
+        elif op == Op.CALL:
+            stack.append(f'call_dynamic({pop(operand)}, {here}, room)')
+        elif op == Op.SPAWN:
+            keyword, nargs, _ = operand
+            args = pop(nargs)
+            keyword = repr(keyword) if keyword is not None else stack.pop()
+            stack.append(f'spawn({here}, {keyword}, {args}, room)')
+        elif op == Op.YIELD:  # Nothing else to switch to
+            stack.append("'None'")
+        elif op == Op.FAIL:
+            stack.append(f'fail({here}, {operand!r})')
+        elif op in (Op.STORE_GLOBAL, Op.STORE_LOCAL):
+            if len(stack) != 1:  # Later values would be worked out after the store
+                raise Unsupported(f'store with {len(stack)} values')
+            target = f'values[{operand}]' if op == Op.STORE_GLOBAL else f'l{operand}'
+            statements.append(f'{target} = {stack.pop()}')
+            stack.append("'None'")
+        else:
+            raise Unsupported(f'op {op}')
+    if len(stack) != 1:
+        raise Unsupported(f'line leaves {len(stack)} values')
+    return statements, stack[0]
+
+
+def body_source(namespace, body, names):
+    '''Source of the function for one linked body'''
+    lines = [f'def {names[body]}(args, room):', "    retval = 'None'"]
+    if body.nlocals:
+        lines.append(f'    {" = ".join(f"l{slot}" for slot in range(body.nlocals))} = UNSET')
+    if any(op == Op.PUSH_ARG for instruction in body.linked for op, _ in instruction.code):
+        lines.append('    nargs = len(args)')
+    depth = 1
+    headers = []  # Index in lines of each open arm's header, to add 'pass' if it is empty
+    futures = []  # Locals holding the futures of the 'parallel' block's lines
+    for instruction in body.linked:
+        where = f'  # {instruction.keyword}@{instruction.line_no}'
+        keyword = instruction.words[0][1] if instruction.control else None
+        if keyword in ('elif', 'else', 'end'):  # A loop always has its condition, so is never empty
+            if headers.pop() == len(lines) - 1:
+                lines.append('    ' * (depth) + 'pass')
+            depth -= 1
+        indent = '    ' * depth
+        if keyword in ('if', 'elif'):
+            statements, value = expression(namespace, body, instruction, names, instruction.code)
+            lines.extend(indent + statement for statement in statements)
+            if keyword == 'if':
+                lines.append(f'{indent}c = {value}{where}')
+                lines.append(f"{indent}retval = 'None'")  # Arms start with $? unset
+                lines.append(f"{indent}if c != 0 and c != '0':")
+            else:  # Only reached when the arms before did not run, so $? is already 'None'
+                lines.append(f"{indent}elif (c := {value}) != 0 and c != '0':{where}")
+        elif keyword == 'else':
+            lines.append(f'{indent}else:{where}')
+        elif keyword == 'while':  # The condition may need statements of its own, so is tested within
+            statements, value = expression(namespace, body, instruction, names, instruction.code)
+            lines.append(f'{indent}while True:{where}')
+            lines.extend(indent + '    ' + statement for statement in statements)
+            lines.append(f'{indent}    c = {value}{where}')
+            lines.append(f"{indent}    retval = 'None'")
+            lines.append(f"{indent}    if c == 0 or c == '0':")
+            lines.append(f'{indent}        break')
+        elif keyword == 'break':
+            lines.append(f"{indent}retval = 'None'{where}")
+            lines.append(f'{indent}break')
+        elif instruction.loop_start is not None:  # 'end' of a loop
+            pass
+        elif keyword == 'end':
+            lines.append(f"{indent}retval = 'None'{where}")
+        elif keyword == 'parallel':
+            futures = []
+        elif keyword == 'join':
+            lines.append(f'{indent}j = join([{", ".join(futures)}]){where}')
+            for index, store in enumerate(instruction.code[0][1]):
+                if store is not None:
+                    target = f'values[{store[1]}]' if store[0] == Op.STORE_GLOBAL else f'l{store[1]}'
+                    lines.append(f'{indent}{target} = j[{index}]')
+            lines.append(f"{indent}retval = 'None'")
+        elif instruction.spawn:
+            statements, value = expression(namespace, body, instruction, names, instruction.code)
+            lines.extend(indent + statement for statement in statements)
+            futures.append(f'f{len(futures)}')
+            lines.append(f'{indent}{futures[-1]} = {value}{where}')
+        else:
+            statements, value = expression(namespace, body, instruction, names, instruction.code)
+            lines.extend(indent + statement for statement in statements)
+            lines.append(f'{indent}retval = {value}{where}')
+        if keyword in ('if', 'elif', 'else', 'while'):
+            headers.append(len(lines) - 1)
+            depth += 1
+    lines.append('    return retval')
+    return '\n'.join(lines) + '\n'
+
+
+def reachable(body, interpreter):
+    '''Linked bodies body calls, directly or not, that need compiling, including itself'''
+    pending = [body]
+    found = []
+    while pending:
+        body = pending.pop()
+        if body in found:
+            continue
+        if body.generation != interpreter.link_generation:
+            interpreter.link_body(body)
+        cached = CACHE.get(body)
+        if cached is not None and cached[0] == interpreter.link_generation:
+            continue
+        found.append(body)
+        pending.extend(operand[0] if op == Op.CALL_BODY else operand[2] for instruction in body.linked
+                       for op, operand in instruction.code
+                       if op == Op.CALL_BODY or op == Op.SPAWN and isinstance(operand[2], daytona.CompiledBody))
+    return found
+
+
+def compile_bodies(body, interpreter):
+    '''Compile body and whatever it calls that is not compiled, as one Python source'''
+    bodies = reachable(body, interpreter)
+    namespace = Namespace(interpreter)
+    names = {}
+    for index, compiling in enumerate(bodies):
+        names[compiling] = function_name(compiling, index)
+    for compiling in bodies:
+        for instruction in compiling.linked:
+            for op, operand in instruction.code:
+                if op == Op.CALL_BODY and operand[0] not in names:  # Compiled before
+                    names[operand[0]] = namespace.name('B', CACHE[operand[0]][1])
+    sources = {compiling: body_source(namespace, compiling, names) for compiling in bodies}
+    source = '\n\n'.join(sources.values())
+    filename = f'<daytona jit {next(SOURCE_SERIAL)}>'
+    linecache.cache[filename] = (len(source), None, source.splitlines(True), filename)
+    exec(compile(source, filename, 'exec'), namespace.globals)
+    for compiling in bodies:
+        CACHE[compiling] = (interpreter.link_generation, namespace.globals[names[compiling]], sources[compiling])
+
+
+def function(body, interpreter=None):
+    '''The Python function for a body of interpreter (daytona.DEFAULT), compiling it if needed'''
+    interpreter = interpreter or daytona.DEFAULT
+    cached = CACHE.get(body)
+    if cached is None or cached[0] != interpreter.link_generation or body.generation != interpreter.link_generation:
+        compile_bodies(body, interpreter)
+        cached = CACHE[body]
+    return cached[1]
+
+
+def source(body, interpreter=None):
+    '''Generated Python source for a body, for the curious'''
+    function(body, interpreter)
+    return CACHE[body][2]
+
+
+def execute(body, args, max_depth=daytona.MAX_CALL_DEPTH, interpreter=None):
+    '''Run a compiled body through its Python function, returning its value'''
+    interpreter = interpreter or daytona.DEFAULT
+    try:
+        func = function(body, interpreter)
+    except Unsupported:
+        return interpreter.run(body, args, max_depth)
+    try:
+        return func(args, max_depth - 1)
+    except TooDeep as ex:
+        raise ScriptError(ex.context, f'Calls nested more than {max_depth} deep') from None
+    except RecursionError:
+        raise ScriptError(Context(parent_keyword=body.keyword, line_no=0),
+                          'Calls nested too deep for the jit') from None
+
+# EOF
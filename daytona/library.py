@@ -0,0 +1,72 @@
+'''
+Index a script library split across many script files
+
+The index of which file has each keyword is made by scanning the files for
+their top level keys, without parsing them, so an interpreter given the
+library (add_library) only parses the files it needs, when it first needs
+one of their keywords. Where files have the same keyword, the first file
+(in the order given, and by name within a directory) has it.
+
+Top level keys of YAML files must be on lines of their own, as in
+
+    main:
+      - print hello
+
+Files in the compact format (daytona.compact) are read as well.
+'''
+
+import glob
+import os
+import re
+
+from daytona.compact import EXTENSION, is_compact, scan, read_keywords
+
+
+KEY = re.compile(r'''^(?P<quote>["']?)(?P<name>[^\s#"'\-][^:]*?)(?P=quote)\s*:(\s|$)''')
+
+
+def script_files(paths):
+    '''Script files named by paths, those within directories included'''
+    if isinstance(paths, str):
+        paths = [paths]
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, '*.yml')) + glob.glob(os.path.join(path, '*.yaml')) +
+                                glob.glob(os.path.join(path, '*' + EXTENSION))))
+        else:
+            files.append(path)
+    return files
+
+
+def scan_keywords(path):
+    '''Top level keys of a script file'''
+    if is_compact(path):
+        return scan(path)
+    keywords = []
+    with open(path, 'r') as f:
+        for line in f:
+            match = KEY.match(line)
+            if match:
+                keywords.append(match.group('name'))
+    return keywords
+
+
+class Library:
+    '''Which file has each keyword, for Interpreter.add_library'''
+
+    def __init__(self, paths):
+        self.files = script_files(paths)
+        self.index = {}  # keyword => path
+        for path in self.files:
+            for keyword in scan_keywords(path):
+                self.index.setdefault(keyword, path)
+
+    def read(self, path):
+        '''Keyword bodies of one of the files'''
+        return read_keywords(path)
+
+    def __repr__(self):
+        return f'Library({len(self.index)} keywords in {len(self.files)} files)'
+
+# EOF
@@ -0,0 +1,197 @@
+'''
+Load time optimization of compiled keyword bodies
+
+Calls to pure arithmetic primitives with literal arguments are folded to
+their value, and if/elif/else arms whose condition is a constant are
+either dropped or stripped of their condition. 'while' loops whose
+condition is a false constant are dropped.
+'''
+
+from dataclasses import dataclass, replace
+
+import daytona
+from daytona import Op, Context, CompiledBody, ScriptError, reset_retval
+
+
+# Primitives that always give the same result for the same arguments
+PURE_PRIMITIVES = {
+    '+': daytona.do_add.__wrapped__,
+    '++': daytona.do_increment.__wrapped__,
+    '--': daytona.do_decrement.__wrapped__,
+}
+
+
+@dataclass
+class Optimization:
+    keyword: str
+    line_no: int
+    action: str
+
+    def __str__(self):
+        return f'{self.keyword}@{self.line_no}: {self.action}'
+
+
+def pure_primitives(keywords):
+    '''Names of the pure primitives keywords still has, so the calls that can be folded'''
+    return tuple(name for name, func in PURE_PRIMITIVES.items() if keywords.get(name) is func)
+
+
+def control_keyword(instruction):
+    return instruction.words[0][1] if instruction.control else None
+
+
+def fold_code(code, context, report, keywords):
+    '''Replace calls to pure primitives that only have literal arguments'''
+    folded = []
+    for op, operand in code:
+        if op == Op.CALL_KEYWORD:
+            keyword, nargs = operand
+            func = PURE_PRIMITIVES.get(keyword)
+            base = len(folded) - nargs
+            if func is not None and keywords.get(keyword) is func and \
+                    all(o == Op.PUSH for o, _ in folded[base:]):
+                args = tuple(value for _, value in folded[base:])
+                try:
+                    _, value = func(args, context)
+                except ScriptError:  # Leave it to fail when it runs
+                    pass
+                else:
+                    del folded[base:]
+                    folded.append((Op.PUSH, value))
+                    report.append(Optimization(context.parent_keyword, context.line_no,
+                                               f'folded ( {" ".join(str(w) for w in (keyword,) + args)} ) to {value}'))
+                    continue
+        folded.append((op, operand))
+    return tuple(folded)
+
+
+def fold_constants(compiled, report, keywords):
+    context = Context(parent_keyword=compiled.keyword)
+    instructions = []
+    for instruction in compiled.instructions:
+        context.line_no = instruction.line_no
+        if instruction.spawn:  # Its call has to stay, to be run on the pool
+            instructions.append(instruction)
+            continue
+        code = fold_code(instruction.code, context, report, keywords)
+        if code != instruction.code:
+            instruction = replace(instruction, code=code)
+        instructions.append(instruction)
+    return instructions
+
+
+def constant_condition(instruction):
+    '''True or False for a constant if/elif condition, otherwise None'''
+    if len(instruction.code) == 1 and instruction.code[0][0] == Op.PUSH:
+        return not daytona.is_false(instruction.code[0][1])
+    return None
+
+
+def as_keyword(instruction, keyword):
+    words = ((instruction.words[0][0], keyword),)
+    if keyword == 'else':
+        return replace(instruction, words=words, code=(), next_arm=None, block_end=None)
+    return replace(instruction, words=words + instruction.words[1:], next_arm=None, block_end=None)
+
+
+def block_arms(instructions, index):
+    '''Header index of each arm of the block starting at index, and of its end'''
+    arms = []
+    while control_keyword(instructions[index]) != 'end':
+        arms.append(index)
+        index = instructions[index].next_arm
+    return arms, index
+
+
+def eliminate_branches(compiled, instructions, start, stop, report):
+    '''Rebuild instructions[start:stop], dropping arms with constant conditions'''
+    kept = []
+    index = start
+    while index < stop:
+        instruction = instructions[index]
+        if control_keyword(instruction) == 'while' and constant_condition(instruction) is False:
+            end = instruction.next_arm
+            report.append(Optimization(compiled.keyword, instruction.line_no,
+                                       f'removed "while" loop through line {instructions[end].line_no}'))
+            kept.append(reset_retval(compiled.keyword, instruction.line_no))  # As leaving the loop would
+            index = end + 1
+            continue
+        if control_keyword(instruction) != 'if':
+            kept.append(replace(instruction, next_arm=None, block_end=None)
+                        if instruction.control else instruction)
+            index += 1
+            continue
+
+        arms, end = block_arms(instructions, index)
+        block = []
+        opened = False  # Whether an arm kept its condition, so the block stays
+        for position, header in enumerate(arms):
+            arm = instructions[header]
+            keyword = control_keyword(arm)
+            body_stop = arm.next_arm
+            holds = True if keyword == 'else' else constant_condition(arm)
+            if holds is False:
+                report.append(Optimization(compiled.keyword, arm.line_no,
+                                           f'removed "{keyword}" arm through line '
+                                           f'{instructions[body_stop].line_no - 1}'))
+                continue
+            body = eliminate_branches(compiled, instructions, header + 1, body_stop, report)
+            if holds is None:
+                if not opened and keyword == 'elif':  # Its condition saw $? reset by the 'if' before it
+                    block.append(reset_retval(compiled.keyword, arm.line_no))
+                block.append(as_keyword(arm, 'elif' if opened else 'if'))
+                opened = True
+            elif opened:
+                block.append(as_keyword(arm, 'else'))
+            else:  # Always runs, so the block goes and only this arm's body remains
+                if keyword != 'else':
+                    report.append(Optimization(compiled.keyword, arm.line_no, f'removed constant "{keyword}"'))
+                block.append(reset_retval(compiled.keyword, arm.line_no))
+            block.extend(body)
+            if holds:
+                if position + 1 < len(arms):
+                    report.append(Optimization(compiled.keyword, instructions[arms[position + 1]].line_no,
+                                               f'removed arms after constant "{keyword}" through line '
+                                               f'{instructions[end].line_no - 1}'))
+                break
+
+        if opened:
+            block.append(replace(instructions[end]))
+        else:
+            block.append(reset_retval(compiled.keyword, instructions[end].line_no))
+        kept.extend(block)
+        index = end + 1
+    return kept
+
+
+def drop_unneeded_resets(instructions):
+    '''A reset stands in for a removed control keyword, but only matters if
+    the body ends there, the next line reads $? or it ends a loop's body'''
+    kept = []
+    for index, instruction in enumerate(instructions):
+        if not instruction.words and index + 1 < len(instructions):
+            following = instructions[index + 1]
+            if following.loop_start is None and (  # A loop's 'end' leaves $? for its condition
+                    control_keyword(following) in ('elif', 'else', 'end') or
+                    all(op != Op.PUSH_RETVAL for op, _ in following.code)):
+                continue
+        kept.append(instruction)
+    return kept
+
+
+def optimize_body(compiled, keywords=None):
+    '''Returns an optimized copy of the compiled body and what was done to it
+
+    keywords is the table the body will be registered in, daytona.KEYWORDS if not given.
+    '''
+    if keywords is None:
+        keywords = daytona.KEYWORDS
+    report = []
+    instructions = fold_constants(compiled, report, keywords)
+    instructions = eliminate_branches(compiled, instructions, 0, len(instructions), report)
+    optimized = CompiledBody(keyword=compiled.keyword, source=compiled.source,
+                             instructions=drop_unneeded_resets(instructions))
+    daytona.match_blocks(optimized)
+    return optimized, report
+
+# EOF
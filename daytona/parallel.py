@@ -0,0 +1,85 @@
+'''
+Run the lines of 'parallel' blocks alongside each other
+
+Each line within parallel ... join is a keyword call, started on the
+interpreter's pool (a thread pool unless set_parallel_pool says otherwise)
+with its arguments worked out first. 'join' waits for them all; the value
+of a 'set NAME ( call )' or 'local NAME ( call )' line is stored then. The
+first line to fail, in the order written, raises its ScriptError.
+
+Threads share the interpreter and its variables. Processes each have the
+interpreter as it was when the pool was made, and their changes to
+variables are not seen by the script.
+
+A line run by the pool that has 'parallel' blocks of its own runs them one
+line after another, as the pool may have no workers left to run them.
+'''
+
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+import os
+import threading
+
+import daytona
+from daytona import Context
+from daytona import batch
+
+
+DEFAULT_POOL = None  # Made when first needed, shared by interpreters without a pool of their own
+POOL_LOCK = threading.Lock()
+
+CHILD = threading.local()  # Whether this thread is running a 'parallel' line
+
+
+def default_pool():
+    global DEFAULT_POOL
+    with POOL_LOCK:
+        if DEFAULT_POOL is None:
+            DEFAULT_POOL = ThreadPoolExecutor(thread_name_prefix='daytona-parallel')
+        return DEFAULT_POOL
+
+
+def process_pool(interpreter, max_workers=None, mp_context=None):
+    '''Pool running 'parallel' lines in processes, each given interpreter once when it starts
+
+    Primitives must be importable by module and name unless workers are forked.
+    '''
+    return ProcessPoolExecutor(max_workers or os.cpu_count() or 1, mp_context=mp_context,
+                               initializer=batch.start_worker, initargs=(interpreter,))
+
+
+def run_child(interpreter, context, keyword, args, max_depth, jit, limits=None):
+    '''Value of one line's call, in a pool thread or process (where interpreter is None)'''
+    interpreter = interpreter or batch.WORKER
+    context.interpreter = interpreter
+    outer = getattr(CHILD, 'running', False)
+    CHILD.running = True
+    try:
+        return interpreter.call_keyword(context, keyword, args, max_depth, jit, limits=limits)[1]
+    finally:
+        CHILD.running = outer
+
+
+def spawn(context, keyword, args, max_depth, jit=False, limits=None):
+    '''Future of calling keyword from the 'parallel' line at context, within the caller's Limits if any'''
+    interpreter = daytona.interpreter_of(context)
+    # The caller carries on from here, so the child has a Context of its own
+    context = Context(parent_keyword=context.parent_keyword, line_no=context.line_no)
+    if getattr(CHILD, 'running', False):
+        future = Future()
+        try:
+            future.set_result(run_child(interpreter, context, keyword, args, max_depth, jit, limits))
+        except Exception as ex:
+            future.set_exception(ex)
+        return future
+    pool = interpreter.parallel_pool or default_pool()
+    if isinstance(pool, ProcessPoolExecutor):
+        return pool.submit(run_child, None, context, keyword, args, max_depth, jit, limits)
+    return pool.submit(run_child, interpreter, context, keyword, args, max_depth, jit, limits)
+
+
+def join(futures):
+    '''Values of the futures, once all are done, raising the error of the first to fail'''
+    wait(futures)
+    return [daytona.return_value(future.result()) for future in futures]
+
+# EOF
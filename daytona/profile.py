@@ -0,0 +1,222 @@
+'''
+Profile scripts by keyword and by line
+
+    profiler = Profiler()
+    interpreter.execute_script('main', profile=profiler)
+    print(profiler.report())
+    profiler.write_collapsed('main.folded')  # For flamegraph.pl or speedscope
+
+A profiled script runs interpreted, one line at a time, so the profiler
+sees each line end and each keyword call start and return. It counts calls
+of each keyword and runs of each keyword@line, with their self time and
+cumulative time (including what they call, counted once when recursive).
+
+Calls made from the start of a line until the call are timed as part of the
+keyword called. Keywords small enough to be inlined (see
+set_inline_threshold) have their lines timed but their calls not counted,
+and keywords run by primitives or on a 'parallel' pool are timed as part of
+the line that called them.
+'''
+
+from collections import Counter
+from dataclasses import dataclass
+import time
+from typing import Dict, Tuple
+
+from daytona import Execution, Op, YIELDED, MAX_CALL_DEPTH, run_awaitable
+
+
+@dataclass
+class Stats:
+    calls: int = 0  # Of a keyword, or runs of a line
+    self_time: float = 0.0  # Seconds, not counting keywords called
+    cumulative: float = 0.0  # Seconds, counting keywords called
+
+
+class Entry:
+    '''A frame as the profiler last saw it'''
+    __slots__ = ('frame', 'keyword', 'prefix', 'entered', 'counted', 'line', 'line_start', 'line_children', 'calling')
+
+    def __init__(self, frame, prefix, entered, counted):
+        self.frame = frame
+        self.keyword = frame.body.keyword
+        self.prefix = prefix  # Stack node of its callers
+        self.entered = entered
+        self.counted = counted  # Not recursive, so its time counts as cumulative
+        self.line = line_at(frame, 0)  # The line running
+        self.line_start = entered
+        self.line_children = 0.0  # Time in calls made by the line running
+        self.calling = None  # Location of the line running, once it calls
+
+
+def line_at(frame, pc):
+    '''Location of the line that runs from pc, after any jump past an elif or else arm'''
+    code = frame.code
+    while code[pc][0] == Op.JUMP:
+        pc = code[pc][1]
+    return frame.locations[pc]
+
+
+def location(entry, where):
+    '''Collapsed stack name of a location, showing what inlined it'''
+    keyword, line_no = where
+    if keyword == entry.keyword:
+        return f'{keyword}@{line_no}'
+    return f'{entry.keyword};{keyword}@{line_no}'
+
+
+class Profiler:
+    '''Collects Stats from every execute_script(..., profile=profiler) it is given'''
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.keywords: Dict[str, Stats] = {}
+        self.lines: Dict[Tuple[str, int], Stats] = {}  # By (keyword, line_no)
+        self.nodes = {}  # (parent node, name) => stack node, numbered as they are first seen
+        self.paths = []  # (parent node, name) of each stack node
+        self.times = Counter()  # Stack node => self seconds
+        self.total = 0.0
+        self.active_keywords = Counter()  # Entries of each keyword
+        self.active_lines = Counter()  # Entries calling from each line
+
+    def keyword_stats(self, keyword):
+        stats = self.keywords.get(keyword)
+        if stats is None:
+            stats = self.keywords[keyword] = Stats()
+        return stats
+
+    def line_stats(self, where):
+        stats = self.lines.get(where)
+        if stats is None:
+            stats = self.lines[where] = Stats()
+        return stats
+
+    def node(self, parent, name):
+        '''Stack node of name called from parent, so stacks are not built as strings for every line'''
+        key = (parent, name)
+        node = self.nodes.get(key)
+        if node is None:
+            node = self.nodes[key] = len(self.paths)
+            self.paths.append(key)
+        return node
+
+    def run(self, interpreter, body, args, max_depth=MAX_CALL_DEPTH, limits=None):
+        '''Run a body as Interpreter.run does, profiling it, returning its value'''
+        execution = Execution(interpreter, body, args, max_depth, limits)
+        shadow = []
+        started = last = self.clock()
+        try:
+            while True:
+                result = execution.resume(1)  # One line, unless it yields or waits first
+                if limits is not None:
+                    limits.spend(execution.frame, 1 - execution.remaining, result)
+                if result is None:
+                    break
+                if result is not YIELDED:
+                    execution.send(run_awaitable(result, execution.frame))
+                now = self.clock()
+                # A call counted against limits stops at the start of the keyword called, not a line's end
+                line_ended = result is YIELDED and execution.remaining == 0 and execution.frame.pc != 0
+                self.step(shadow, execution, last, now, line_ended)
+                last = now
+        finally:
+            now = self.clock()
+            self.unwind(shadow, 0, now)
+            self.total += now - started
+        return execution.value
+
+    def step(self, shadow, execution, last, now, line_ended):
+        '''Account for what ran between last and now'''
+        frames = execution.frames
+        depth = len(frames) + 1
+        kept = min(len(shadow), depth)  # Frames still running since last time
+        while kept and shadow[kept - 1].frame is not (frames[kept - 1] if kept < depth else execution.frame):
+            kept -= 1
+        self.unwind(shadow, kept, last)  # Returned just after their last line
+        for index in range(kept, depth):
+            frame = frames[index] if index < len(frames) else execution.frame
+            prefix = None
+            if shadow:
+                parent = shadow[-1]
+                where = parent.frame.locations[parent.frame.pc]
+                prefix = self.node(parent.prefix, location(parent, where))
+                if parent.calling is None:
+                    parent.calling = where
+                    self.active_lines[where] += 1
+            entry = Entry(frame, prefix, last, self.active_keywords[frame.body.keyword] == 0)
+            self.active_keywords[entry.keyword] += 1
+            self.keyword_stats(entry.keyword).calls += 1
+            shadow.append(entry)
+        if line_ended:
+            self.end_line(shadow[-1], now)
+
+    def end_line(self, entry, now):
+        where = entry.line
+        elapsed = now - entry.line_start
+        own = elapsed - entry.line_children
+        stats = self.line_stats(where)
+        stats.calls += 1
+        stats.self_time += own
+        if entry.calling is not None:
+            self.active_lines[entry.calling] -= 1
+            entry.calling = None
+        if self.active_lines[where] == 0:
+            stats.cumulative += elapsed
+        stats = self.keyword_stats(where[0])
+        stats.self_time += own
+        if where[0] != entry.keyword:  # Inlined, so not a call of its own
+            stats.cumulative += elapsed
+        self.times[self.node(entry.prefix, location(entry, where))] += own
+        entry.line_start = now
+        entry.line_children = 0.0
+        entry.line = line_at(entry.frame, entry.frame.pc)
+
+    def unwind(self, shadow, depth, now):
+        '''Entries above depth have returned by now'''
+        while len(shadow) > depth:
+            entry = shadow.pop()
+            elapsed = now - entry.entered
+            self.active_keywords[entry.keyword] -= 1
+            if entry.counted:
+                self.keyword_stats(entry.keyword).cumulative += elapsed
+            if entry.calling is not None:
+                self.active_lines[entry.calling] -= 1
+            if shadow:
+                shadow[-1].line_children += elapsed
+
+    def report(self, sort='self', limit=20):
+        '''Keywords then lines, most time first, sorted by self, cumulative or calls'''
+        key = {'self': lambda item: item[1].self_time, 'cumulative': lambda item: item[1].cumulative,
+               'calls': lambda item: item[1].calls}[sort]
+
+        def table(title, stats):
+            rows = [f'{title:32} {"calls":>10} {"self ms":>10} {"cum ms":>10}']
+            for name, entry in sorted(stats, key=key, reverse=True)[:limit]:
+                rows.append(f'{name:32} {entry.calls:10} {entry.self_time * 1000:10.3f} {entry.cumulative * 1000:10.3f}')
+            return rows
+
+        lines = [f'{self.total * 1000:.3f} ms profiled, {sum(stats.calls for stats in self.keywords.values())} '
+                 f'keyword calls, {sum(stats.calls for stats in self.lines.values())} lines run', '']
+        lines.extend(table('keyword', self.keywords.items()))
+        lines.append('')
+        lines.extend(table('keyword@line', ((f'{keyword}@{line_no}', stats)
+                                            for (keyword, line_no), stats in self.lines.items())))
+        return '\n'.join(lines) + '\n'
+
+    def stacks(self):
+        '''Self seconds of each stack, named 'caller@line;callee@line' as collapsed stacks are'''
+        names = []
+        for parent, name in self.paths:
+            names.append(name if parent is None else f'{names[parent]};{name}')
+        return {names[node]: seconds for node, seconds in self.times.items()}
+
+    def collapsed(self):
+        '''Collapsed stacks, one 'caller@line;callee@line microseconds' per line, for flame graphs'''
+        return ''.join(f'{stack} {round(seconds * 1e6)}\n' for stack, seconds in sorted(self.stacks().items())
+                       if round(seconds * 1e6) > 0)
+
+    def write_collapsed(self, path):
+        with open(path, 'w') as f:
+            f.write(self.collapsed())
+
+# EOF
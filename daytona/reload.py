@@ -0,0 +1,104 @@
+'''
+Reload script files into a running interpreter when they change
+
+A Watcher registers each file it is given, then, whenever check() finds
+one changed on disk, reloads it with Interpreter.reload_keywords: only
+keywords whose bodies changed are compiled, and keywords that went from
+the file are removed. start() checks in a background thread.
+
+A file that no longer parses or compiles is reported and left as it was
+loaded, so a half saved edit cannot break the scripts running.
+'''
+
+from dataclasses import dataclass, field
+import os
+import threading
+from typing import Any, List
+
+import daytona
+from daytona import ReloadReport, ScriptError
+from daytona.compact import read_keywords, parse_errors
+
+
+@dataclass
+class WatchedFile:
+    path: str
+    stamp: Any = None  # (mtime, size) when last read
+    keywords: List[str] = field(default_factory=list)  # Loaded from it
+
+
+@dataclass
+class Reload:
+    path: str
+    report: ReloadReport = None
+    error: Exception = None  # Why it was not reloaded
+
+    def __str__(self):
+        return f'{self.path}: {self.error if self.error else self.report}'
+
+
+def stamp(path):
+    info = os.stat(path)
+    return info.st_mtime_ns, info.st_size
+
+
+class Watcher:
+    '''Keeps an interpreter (daytona.DEFAULT) up to date with script files'''
+
+    def __init__(self, interpreter=None, optimize=False):
+        self.interpreter = interpreter or daytona.DEFAULT
+        self.optimize = optimize
+        self.files = {}  # path => WatchedFile
+        self.lock = threading.Lock()  # One check at a time
+        self.thread = None
+        self.stopping = threading.Event()
+
+    def watch(self, path):
+        '''Load a file now and reload it when it changes, returning the Reload'''
+        with self.lock:
+            watched = self.files[path] = WatchedFile(path)
+            return self.reload(watched)
+
+    def reload(self, watched):
+        try:
+            watched.stamp = stamp(watched.path)
+            keyword_dict = read_keywords(watched.path)
+            report = self.interpreter.reload_keywords(keyword_dict, replaces=watched.keywords,
+                                                      optimize=self.optimize)
+        except (OSError, ScriptError, *parse_errors()) as ex:
+            return Reload(watched.path, error=ex)
+        watched.keywords = list(keyword_dict)
+        return Reload(watched.path, report)
+
+    def check(self):
+        '''Reload the files changed since they were last read, returning a Reload for each'''
+        reloads = []
+        with self.lock:
+            for watched in self.files.values():
+                try:
+                    changed = stamp(watched.path) != watched.stamp
+                except OSError:  # Gone for now, perhaps being saved
+                    continue
+                if changed:
+                    reloads.append(self.reload(watched))
+        return reloads
+
+    def start(self, interval=1.0, callback=None):
+        '''Check every interval seconds in a daemon thread, giving callback each Reload'''
+        def run():
+            while not self.stopping.wait(interval):
+                for reload in self.check():
+                    if callback is not None:
+                        callback(reload)
+
+        self.stopping.clear()
+        self.thread = threading.Thread(target=run, name='daytona-reload', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+# EOF
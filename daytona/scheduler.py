@@ -0,0 +1,123 @@
+'''
+Interleave many scripts in one thread
+
+Each script is an Execution that the Scheduler resumes in turn, round
+robin, for at most its quota of lines or until it reaches 'yield'. Async
+primitives are run to the end where they are called, holding up the
+others, so use execute_script_async for scripts that wait on I/O.
+'''
+
+from collections import deque
+from dataclasses import dataclass, field
+import time
+from typing import Any, Tuple
+
+import daytona
+from daytona import Execution, ScriptError, YIELDED, MAX_CALL_DEPTH
+
+
+@dataclass
+class Task:
+    keyword: str
+    args: Tuple
+    quota: int  # Lines to run before switching, zero to run until 'yield'
+    execution: Execution = field(default=None, repr=False)
+    value: Any = None
+    error: ScriptError = None
+    slices: int = 0  # Times it has been resumed
+    lines: int = 0   # Lines it has run
+    done: bool = False
+
+
+@dataclass
+class SchedulerStats:
+    tasks: int = 0
+    switches: int = 0     # Resumes after the first of each task
+    yields: int = 0       # Switches asked for by 'yield'
+    preemptions: int = 0  # Switches from running out of quota
+    lines: int = 0
+    run_time: float = 0.0    # Seconds within scripts
+    total_time: float = 0.0  # Seconds within run()
+
+    @property
+    def switch_time(self):
+        '''Mean seconds spent between one script stopping and the next starting'''
+        resumes = self.switches + self.tasks
+        return (self.total_time - self.run_time) / resumes if resumes else 0.0
+
+    def __str__(self):
+        return (f'{self.tasks} tasks, {self.lines} lines, {self.switches} switches '
+                f'({self.yields} yields, {self.preemptions} preemptions), '
+                f'{self.switch_time * 1e6:.2f} us per switch, '
+                f'{(self.total_time - self.run_time) / self.total_time if self.total_time else 0:.1%} overhead')
+
+
+class Scheduler:
+    '''Round robin over scripts spawned in one interpreter (daytona.DEFAULT if not given)'''
+
+    def __init__(self, interpreter=None, quota=100):
+        self.interpreter = interpreter or daytona.DEFAULT
+        self.quota = quota
+        self.ready = deque()
+        self.stats = SchedulerStats()
+
+    def spawn(self, start_keyword, *args, quota=None, max_depth=MAX_CALL_DEPTH):
+        '''Add a script to run, returning its Task; a primitive just runs'''
+        self.interpreter.link_script(start_keyword)
+        task = Task(keyword=start_keyword, args=args, quota=self.quota if quota is None else quota)
+        kw_val = self.interpreter.resolve_keyword(start_keyword)
+        if callable(kw_val):
+            _, task.value = self.interpreter.call_keyword(daytona.Context(parent_keyword=start_keyword,
+                                                                          interpreter=self.interpreter),
+                                                          start_keyword, args)
+            task.done = True
+            return task
+        task.execution = Execution(self.interpreter, kw_val, args, max_depth)
+        self.ready.append(task)
+        self.stats.tasks += 1
+        return task
+
+    def step(self, task):
+        '''Resume a task for one slice, returning whether it has finished'''
+        execution = task.execution
+        if task.slices:
+            self.stats.switches += 1
+        task.slices += 1
+        try:
+            result = execution.resume(task.quota)
+            while result is not None and result is not YIELDED:  # Nothing else runs while it waits
+                execution.send(daytona.run_awaitable(result, execution.frame))
+                result = execution.resume(execution.remaining)
+        except ScriptError as ex:
+            task.error = ex
+            task.done = True
+        else:
+            if result is None:
+                task.value = daytona.return_value(execution.value)
+                task.done = True
+            elif execution.remaining == 0 and task.quota:
+                self.stats.preemptions += 1
+            else:
+                self.stats.yields += 1
+        lines = task.quota - execution.remaining
+        task.lines += lines
+        self.stats.lines += lines
+        return task.done
+
+    def run(self):
+        '''Run every spawned script to the end, returning the stats'''
+        ready = self.ready
+        stats = self.stats
+        clock = time.perf_counter
+        started = clock()
+        while ready:
+            task = ready.popleft()
+            resumed = clock()
+            done = self.step(task)
+            stats.run_time += clock() - resumed
+            if not done:
+                ready.append(task)
+        stats.total_time += clock() - started
+        return stats
+
+# EOF
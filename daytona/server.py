@@ -0,0 +1,236 @@
+'''
+Serve script executions over a Unix socket
+
+A Server loads its keywords once, then answers requests sent as JSON lines:
+
+    {"id": 1, "keyword": "main", "args": [1, "two"]}
+
+with one JSON line each:
+
+    {"id": 1, "value": 3, "output": "printed\\n"}
+    {"id": 1, "error": "main@2: No such keyword \\"nope\\""}
+
+A connection can send any number of requests, which are answered in turn.
+Connections are served by a pool of max_workers threads, and wait for a
+free worker when all are busy. As with Interpreter.run_many, each worker
+has its own fork of the interpreter and each request starts from the
+variables as they were when the server started. What a script prints is
+returned as its output rather than written to the server's stdout.
+
+    python -m daytona.server SOCKET script.yml [--library PATH] [--workers N]
+    run_client.py SOCKET [--main KEYWORD] [ARGS...]
+'''
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+
+import daytona
+from daytona import ScriptError, MAX_CALL_DEPTH
+
+
+class ThreadOutput:
+    '''Stands in for sys.stdout, sending what threads serving a request print to that request'''
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def capture(self):
+        self.local.buffer = io.StringIO()
+
+    def release(self):
+        buffer, self.local.buffer = self.local.buffer, None
+        return buffer.getvalue()
+
+    def write(self, text):
+        buffer = getattr(self.local, 'buffer', None)
+        return (buffer or self.stream).write(text)
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+class Handler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            response = self.server.respond(line)
+            self.wfile.write(json.dumps(response, default=str).encode() + b'\n')
+            self.wfile.flush()
+
+
+class Server(socketserver.UnixStreamServer):
+    '''Runs scripts for clients of the socket at path, from interpreter (daytona.DEFAULT)'''
+
+    allow_reuse_address = True
+
+    def __init__(self, path, interpreter=None, max_workers=4, max_depth=MAX_CALL_DEPTH, jit=None,
+                 capture_output=True):
+        if os.path.exists(path):
+            os.unlink(path)  # Left by a server that did not stop cleanly
+        self.path = path
+        self.interpreter = interpreter or daytona.DEFAULT
+        self.variables = dict(self.interpreter.variables)
+        self.max_depth = max_depth
+        self.jit = jit
+        self.pool = ThreadPoolExecutor(max_workers, thread_name_prefix='daytona-server')
+        self.workers = threading.local()
+        self.connections = set()  # Open, so closing the server can close them
+        self.thread = None
+        self.output = None
+        super().__init__(path, Handler)
+        if capture_output:
+            self.output = sys.stdout = ThreadOutput(sys.stdout)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self.serve_connection, request, client_address)
+
+    def serve_connection(self, request, client_address):
+        self.connections.add(request)
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.connections.discard(request)
+            self.shutdown_request(request)
+
+    def worker(self):
+        '''This thread's fork of the interpreter, with the variables set back'''
+        forked = getattr(self.workers, 'interpreter', None)
+        if forked is None:
+            forked = self.workers.interpreter = self.interpreter.fork()
+        else:
+            forked.variables.clear()
+            forked.variables.update(self.variables)
+        return forked
+
+    def respond(self, line):
+        '''The response to one request line'''
+        try:
+            request = json.loads(line)
+            keyword = request['keyword']
+            args = request.get('args', [])
+            if not isinstance(keyword, str) or not isinstance(args, list):
+                raise TypeError
+        except (ValueError, TypeError, KeyError):
+            return {'error': 'Requests need a "keyword" and optional list of "args"'}
+        response = {'id': request.get('id')}
+        if self.output:
+            self.output.capture()
+        try:
+            response['value'] = self.worker().execute_script(keyword, *args, max_depth=self.max_depth, jit=self.jit)
+        except ScriptError as ex:
+            response['error'] = str(ex)
+        except Exception as ex:  # Raised by a primitive, so the connection carries on
+            response['error'] = f'{type(ex).__name__}: {ex}'
+        finally:
+            if self.output:
+                response['output'] = self.output.release()
+        return response
+
+    def start(self):
+        '''Serve in a daemon thread'''
+        self.thread = threading.Thread(target=self.serve_forever, name='daytona-server', daemon=True)
+        self.thread.start()
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        for request in list(self.connections):
+            try:
+                request.shutdown(socket.SHUT_RDWR)  # Ends the worker's wait for the next request
+            except OSError:
+                pass
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        if self.output is not None and sys.stdout is self.output:
+            sys.stdout = self.output.stream
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+
+class Client:
+    '''Sends requests to a Server, one at a time, over one connection'''
+
+    def __init__(self, path, timeout=None):
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.settimeout(timeout)
+        self.socket.connect(path)
+        self.file = self.socket.makefile('rwb')
+        self.requests = 0
+
+    def request(self, keyword, *args):
+        '''The response to running keyword with args, as a dict'''
+        self.requests += 1
+        self.file.write(json.dumps({'id': self.requests, 'keyword': keyword, 'args': list(args)}).encode() + b'\n')
+        self.file.flush()
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError('Server closed the connection')
+        return json.loads(line)
+
+    def execute_script(self, keyword, *args):
+        '''Value of running keyword with args, raising ScriptError if it failed'''
+        response = self.request(keyword, *args)
+        if 'error' in response:
+            raise ScriptError(None, response['error'])
+        return response['value']
+
+    def close(self):
+        try:
+            self.file.close()
+        except OSError:  # Flushing a request the server never read
+            pass
+        self.socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main(argv=None):
+    from daytona.cache import load
+
+    parser = argparse.ArgumentParser(description='Serve Daytona script executions over a Unix socket')
+    parser.add_argument('socket', type=str, help='socket path to listen on')
+    parser.add_argument('scripts', nargs='*', help='script files to load')
+    parser.add_argument('--library', action='append', default=[],
+                        help='script file or directory of them to load keywords from when first needed')
+    parser.add_argument('--workers', default=4, type=int, help='connections served at once')
+    parser.add_argument('--optimize', action='store_true', help='fold constants and drop constant branches')
+    parser.add_argument('--jit', action='store_true', help='run keywords as generated Python functions')
+    args = parser.parse_args(argv)
+
+    for script in args.scripts:
+        daytona.register_keywords(load(script, optimize=args.optimize).keywords)
+    if args.library:
+        daytona.add_library(args.library)
+    with Server(args.socket, max_workers=args.workers, jit=args.jit) as server:
+        print(f'Serving on {args.socket}', file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
+
+# EOF
@@ -0,0 +1,81 @@
+'''
+Hooks for Interpreter.settrace
+
+    tracer = SamplingTracer(every=100)
+    interpreter.settrace(tracer)
+    interpreter.execute_script('main')
+    interpreter.settrace(None)
+    print(tracer.report())
+
+A hook is called as hook(frame, event, arg), where frame gives
+parent_keyword and line_no, for these events:
+
+    'enter'      a keyword body starts, arg is its arguments
+    'line'       a line is about to run
+    'primitive'  a primitive is about to be called, arg is (keyword, arguments)
+    'exit'       a keyword body returns, arg is the value
+
+Hooks are called from whichever thread runs the script, 'parallel' lines
+included.
+'''
+
+from collections import Counter, deque
+from dataclasses import dataclass
+import sys
+
+
+@dataclass
+class Sample:
+    event: str
+    keyword: str
+    line_no: int
+    primitive: str = None  # Called, for 'primitive' events
+
+
+class SamplingTracer:
+    '''Records every Nth event (of those given, or all), keeping the last maxlen samples if given'''
+
+    def __init__(self, every=100, events=None, maxlen=None):
+        self.every = every
+        self.events = set(events) if events else None
+        self.countdown = every
+        self.seen = 0  # Events of the kinds sampled, sampled or not
+        self.samples = deque(maxlen=maxlen)
+
+    def __call__(self, frame, event, arg):
+        if self.events is not None and event not in self.events:
+            return
+        self.seen += 1
+        self.countdown -= 1
+        if self.countdown:
+            return
+        self.countdown = self.every
+        self.samples.append(Sample(event, frame.parent_keyword, frame.line_no, arg[0] if event == 'primitive' else None))
+
+    def counts(self):
+        '''Samples of each (event, keyword, line_no, primitive)'''
+        return Counter((sample.event, sample.keyword, sample.line_no, sample.primitive) for sample in self.samples)
+
+    def report(self, limit=20):
+        '''Most sampled locations first'''
+        lines = [f'{len(self.samples)} samples of {self.seen} events, 1 in {self.every}']
+        for (event, keyword, line_no, primitive), count in self.counts().most_common(limit):
+            lines.append(f'{count:8} {event:10} {keyword}@{line_no}' + (f' {primitive}' if primitive else ''))
+        return '\n'.join(lines) + '\n'
+
+
+def printer(file=None):
+    '''Hook printing every event, indented by call depth'''
+    depth = 0
+
+    def hook(frame, event, arg):
+        nonlocal depth
+        if event == 'exit':
+            depth -= 1
+        print(f'{"  " * depth}{event} {frame.parent_keyword}@{frame.line_no}' + ('' if arg is None else f' {arg}'),
+              file=file or sys.stderr)
+        if event == 'enter':
+            depth += 1
+    return hook
+
+# EOF
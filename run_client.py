@@ -0,0 +1,46 @@
+#!/bin/python3
+'''
+Run some script on a server started by 'python -m daytona.server'.
+
+Only speaks the socket's JSON lines, as importing daytona would cost as much
+startup as the server saves.
+'''
+
+import sys
+import argparse
+import json
+import socket
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Run Daytona script on a server')
+    parser.add_argument('socket', type=str,
+                        help='socket path the server listens on')
+    parser.add_argument('args', nargs='*',
+                        help='arguments to the start keyword')
+    parser.add_argument('--main', default='main', type=str,
+                        help='script start keyword')
+    parser.add_argument('--value', action='store_true',
+                        help='print the value the script returned')
+    args = parser.parse_args()
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            connection.connect(args.socket)
+            with connection.makefile('rwb') as f:
+                f.write(json.dumps({'id': 1, 'keyword': args.main, 'args': args.args}).encode() + b'\n')
+                f.flush()
+                response = json.loads(f.readline() or b'{"error": "Server closed the connection"}')
+    except OSError as ex:
+        print(f'No server on {args.socket}: {ex}')
+        sys.exit(1)
+
+    sys.stdout.write(response.get('output', ''))
+    if 'error' in response:
+        print(response['error'], file=sys.stderr)
+        sys.exit(1)
+    if args.value:
+        print(response['value'])
+
+# EOF
@@ -6,8 +6,9 @@ Run some script.
 from os.path import exists
 import sys
 import argparse
-import yaml
 import daytona
+from daytona.cache import load
+from daytona.profile import Profiler
 
 
 if __name__ == '__main__':
@@ -17,16 +18,57 @@ if __name__ == '__main__':
                         help='script file name')
     parser.add_argument('--main', default='main', type=str,
                         help='script start keyword')
+    parser.add_argument('--optimize', action='store_true',
+                        help='fold constants and drop constant branches, reporting what changed')
+    parser.add_argument('--jit', action='store_true',
+                        help='run keywords as generated Python functions')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='always compile the script, neither reading nor writing its cache')
+    parser.add_argument('--startup-timing', action='store_true',
+                        help='load the script without then with its cache, printing where the time went')
+    parser.add_argument('--library', action='append', default=[],
+                        help='script file or directory of them to load keywords from when first needed')
+    parser.add_argument('--lazy', action='store_true',
+                        help='compile keywords of the script only when first needed, bypassing its cache')
+    parser.add_argument('--load-stats', action='store_true',
+                        help='print how many keywords were loaded and compiled')
+    parser.add_argument('--profile', action='store_true',
+                        help='print time spent in each keyword and line, running them interpreted')
+    parser.add_argument('--profile-collapsed', type=str, default=None,
+                        help='profile as --profile does, writing collapsed stacks for flame graphs to this file')
     args = parser.parse_args()
+    if args.lazy and args.optimize:  # As register_keywords refuses
+        parser.error('--lazy keywords cannot be optimized, as they are compiled when first needed')
+    if args.startup_timing and args.no_cache:  # Both loads would be cold
+        parser.error('--startup-timing compares loads without and with the cache, so cannot be used with --no-cache')
 
     if not exists(args.script):
         print(f'No such file {args.script}')
         sys.exit(1)
 
-    with open(args.script, 'r') as f:
-        body_dict = yaml.safe_load(f)
+    if args.lazy:  # The script is a library of one file
+        daytona.add_library([args.script])
+    else:
+        if args.startup_timing:  # Cold writes the cache that warm then reads
+            print(load(args.script, optimize=args.optimize, use_cache=not args.no_cache, refresh=True), file=sys.stderr)
+        loaded = load(args.script, optimize=args.optimize, use_cache=not args.no_cache)
+        if args.startup_timing:
+            print(loaded, file=sys.stderr)
 
-    daytona.register_keywords(body_dict)
-    daytona.execute_script(args.main)
+        daytona.register_keywords(loaded.keywords)
+        for optimization in loaded.report:
+            print(f'optimized {optimization}', file=sys.stderr)
+    if args.library:
+        daytona.add_library(args.library)
+    profiler = Profiler() if args.profile or args.profile_collapsed else None
+    try:
+        daytona.execute_script(args.main, jit=args.jit, profile=profiler)
+    finally:
+        if args.profile:
+            print(profiler.report(), file=sys.stderr)
+        if args.profile_collapsed:
+            profiler.write_collapsed(args.profile_collapsed)
+    if args.load_stats:
+        print(daytona.DEFAULT.load_stats, file=sys.stderr)
 
 # EOF
@@ -0,0 +1,15 @@
+"""
+    Test configuration : 'pytest --jit' runs every script through daytona.jit
+"""
+
+import daytona
+
+
+def pytest_addoption(parser):
+    parser.addoption('--jit', action='store_true', help='run scripts as generated Python functions')
+
+
+def pytest_configure(config):
+    daytona.JIT_DEFAULT = config.getoption('--jit')
+
+# EOF
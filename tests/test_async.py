@@ -0,0 +1,132 @@
+"""
+    Unit Test : Async primitives and execute_script_async
+"""
+
+import asyncio
+import time
+import yaml
+import unittest
+from parameterized import parameterized
+from daytona import primitive, register_keywords, execute_script, execute_script_async, ScriptError, KEYWORDS, Op
+from daytona import link
+
+body = """
+waits:
+  - async-echo first $0
+  - async-echo ( async-echo nested ) $?
+  - value-of $?
+waits-in-call:
+  - if ( async-echo 1 )
+  -     waits $0
+  - end
+  - value-of $?
+waits-dynamic:
+  - $0 dynamic
+sleeps:
+  - async-record $0 start
+  - sleep 0.05
+  - async-record $0 end
+sleep-noarg:
+  - sleep
+sleep-words:
+  - sleep forever
+async-fails:
+  - async-fail ( ++ 1 )
+"""
+
+ARGS = []
+
+
+@primitive('async-echo')
+async def do_async_echo(args, context):
+    await asyncio.sleep(0)
+    ARGS.append(args)
+    return context, args[-1]
+
+
+@primitive('async-record')
+async def do_async_record(args, context):
+    ARGS.append(args)
+    return context, None
+
+
+@primitive('async-fail')
+async def do_async_fail(args, context):
+    await asyncio.sleep(0)
+    raise ScriptError(context, f'failed with {args[0]}')
+
+
+@primitive('value-of')
+def do_value_of(args, context):
+    return context, args[0]
+
+
+class TestAsync(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        assert cls
+        register_keywords(yaml.safe_load(body))
+
+    def setUp(self):
+        assert self
+        global ARGS
+        ARGS = []
+
+    @parameterized.expand([('waits', ('arg',), 'arg', [('first', 'arg'), ('nested',), ('nested', 'arg')]),
+                           ('waits-in-call', ('arg',), 'None',
+                            [(1,), ('first', 'arg'), ('nested',), ('nested', 'arg')]),
+                           ('waits-dynamic', ('async-echo',), 'dynamic', [('dynamic',)]),
+                           ('async-echo', ('direct',), 'direct', [('direct',)]),
+                           ])
+    def test_same_either_way(self, keyword, args, retval, call_list):
+        '''execute_script runs async primitives to the end itself'''
+        self.assertEqual(asyncio.run(execute_script_async(keyword, *args)), retval)
+        self.assertEqual(ARGS, call_list)
+        ARGS.clear()
+        self.assertEqual(execute_script(keyword, *args), retval)
+        self.assertEqual(ARGS, call_list)
+
+    def test_linked(self):
+        link('waits')
+        self.assertIn(Op.CALL_ASYNC, [op for op, _ in KEYWORDS['waits'].code])
+
+    def test_concurrent(self):
+        '''Scripts waiting in sleep let the others run'''
+        async def main():
+            return await asyncio.gather(*(execute_script_async('sleeps', n) for n in range(20)))
+
+        start = time.perf_counter()
+        asyncio.run(main())
+        self.assertLess(time.perf_counter() - start, 20 * 0.05 / 2)
+        self.assertEqual([what for _, what in ARGS[:20]], ['start'] * 20)
+        self.assertEqual(sorted(ARGS[20:]), [(n, 'end') for n in range(20)])
+
+    @parameterized.expand([('sleep-noarg', 'sleep-noarg@1: "sleep" keyword requires seconds'),
+                           ('sleep-words', 'sleep-words@1: "sleep" keyword accepts numbers only'),
+                           ('async-fails', 'async-fails@1: failed with 2'),
+                           ])
+    def test_excepts(self, keyword, exception_str):
+        for run in (lambda: asyncio.run(execute_script_async(keyword)), lambda: execute_script(keyword)):
+            excepted = False
+            try:
+                run()
+            except ScriptError as ex:
+                self.assertEqual(str(ex), exception_str)
+                excepted = True
+            self.assertTrue(excepted)
+
+    def test_sync_in_event_loop(self):
+        '''execute_script cannot wait inside a running event loop'''
+        async def main():
+            execute_script('waits', 'arg')
+
+        excepted = False
+        try:
+            asyncio.run(main())
+        except ScriptError as ex:
+            self.assertEqual(str(ex), 'waits@1: Async primitive called while an event loop runs, use execute_script_async')
+            excepted = True
+        self.assertTrue(excepted)
+
+# EOF
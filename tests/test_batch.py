@@ -0,0 +1,98 @@
+"""
+    Unit Test : Process pool batches
+"""
+
+import multiprocessing
+import pickle
+import yaml
+import unittest
+from parameterized import parameterized
+from daytona import primitive, register_keywords, execute_batch, execute_script, ScriptError, Interpreter, KEYWORDS
+
+body = """
+batch-square:
+  - local N $0
+  - local TOTAL 0
+  - batch-times $N $N
+  - if ( batch-odd $? )
+  -     batch-fail $N
+  - end
+  - batch-times $N $N
+batch-broken:
+  - no-such-keyword
+"""
+
+
+@primitive('batch-times')
+def do_times(args, context):
+    return context, args[0] * args[1]
+
+
+@primitive('batch-odd')
+def do_odd(args, context):
+    return context, args[0] % 2
+
+
+@primitive('batch-fail')
+def do_fail(args, context):
+    raise ScriptError(context, f'{args[0]} is odd')
+
+
+class TestBatch(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        assert cls
+        register_keywords(yaml.safe_load(body))
+
+    @parameterized.expand([('ordered', True, 1), ('unordered', False, 1), ('chunked', True, 7)])
+    def test_batch(self, name, ordered, chunksize):
+        args = [(n,) for n in range(0, 200, 2)]
+        results = list(execute_batch('batch-square', args, max_workers=3, ordered=ordered, chunksize=chunksize))
+        if ordered:
+            self.assertEqual([result.index for result in results], list(range(100)))
+        self.assertEqual(sorted((result.args, result.value) for result in results),
+                         [((n,), n * n) for n in range(0, 200, 2)])
+
+    def test_errors(self):
+        '''Each item carries its own error, with its location'''
+        results = list(execute_batch('batch-square', ((n,) for n in range(10)), max_workers=2, chunksize=3))
+        for result in results:
+            if result.args[0] % 2:
+                self.assertIsNone(result.value)
+                self.assertEqual(str(result.error), f'batch-square@5: {result.args[0]} is odd')
+            else:
+                self.assertIsNone(result.error)
+                self.assertEqual(result.value, result.args[0] ** 2)
+
+    def test_link_errors(self):
+        '''A script that cannot run fails before anything is sent to workers'''
+        excepted = False
+        try:
+            execute_batch('batch-broken', [()])
+        except ScriptError as ex:
+            self.assertEqual(str(ex), 'batch-broken@1: No such keyword "no-such-keyword"')
+            excepted = True
+        self.assertTrue(excepted)
+
+    def test_pickles(self):
+        '''Interpreters and errors go to other processes without their running state'''
+        execute_script('batch-square', 4)
+        interpreter = pickle.loads(pickle.dumps(Interpreter().fork()))
+        self.assertIn('set', interpreter.keywords)
+        from daytona import DEFAULT
+        copied = pickle.loads(pickle.dumps(DEFAULT))
+        self.assertIs(copied.keywords['batch-times'], KEYWORDS['batch-times'])
+        self.assertIs(copied.keywords['set'], KEYWORDS['set'])
+        self.assertEqual(copied.execute_script('batch-square', 4), 16)
+        error = pickle.loads(pickle.dumps(ScriptError(None, 'message')))
+        self.assertEqual(str(error), 'message')
+
+    def test_spawn(self):
+        '''Workers that do not inherit memory are sent the interpreter'''
+        results = list(execute_batch('batch-square', [(2,), (3,)], max_workers=1,
+                                     mp_context=multiprocessing.get_context('spawn')))
+        self.assertEqual(results[0].value, 4)
+        self.assertEqual(str(results[1].error), 'batch-square@5: 3 is odd')
+
+# EOF
@@ -0,0 +1,108 @@
+"""
+    Unit Test : compiled script cache
+"""
+
+import os
+import tempfile
+import unittest
+from daytona import Interpreter, ScriptError, CompiledBody
+from daytona import cache
+
+script = """
+main:
+  - local N $0
+  - if ( + 0 1 )
+  -     set CACHED ( ++ $N )
+  - end
+  - helper $CACHED
+helper:
+  - + $0 $0
+"""
+
+
+class TestCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'script.yml')
+        self.write(script)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, text):
+        with open(self.path, 'w') as f:
+            f.write(text)
+
+    def test_warm(self):
+        '''The second load reads what the first compiled'''
+        cold = cache.load(self.path)
+        self.assertFalse(cold.warm)
+        self.assertIn('parse', cold.timings)
+        self.assertTrue(os.path.exists(cache.cache_path(self.path)))
+        warm = cache.load(self.path)
+        self.assertTrue(warm.warm)
+        self.assertNotIn('parse', warm.timings)
+        self.assertIsInstance(warm.keywords['main'], CompiledBody)
+        self.assertEqual(warm.keywords['main'].instructions, cold.keywords['main'].instructions)
+        interpreter = Interpreter()
+        loaded = cache.load_keywords(self.path, interpreter=interpreter)
+        self.assertTrue(loaded.warm)
+        self.assertEqual(interpreter.execute_script('main', 2), 6)
+
+    def test_stale(self):
+        '''A changed file, compiler or optimize setting compiles again'''
+        cache.load(self.path)
+        self.write(script.replace('+ $0 $0', '+ $0 1'))
+        changed = cache.load(self.path)
+        self.assertFalse(changed.warm)
+        interpreter = Interpreter()
+        interpreter.register_keywords(changed.keywords)
+        self.assertEqual(interpreter.execute_script('main', 2), 4)
+        self.assertTrue(cache.load(self.path).warm)
+
+        optimized = cache.load(self.path, optimize=True)
+        self.assertFalse(optimized.warm)
+        self.assertEqual(len(optimized.report), 2)
+        self.assertEqual([str(o) for o in cache.load(self.path, optimize=True).report],
+                         [str(o) for o in optimized.report])
+
+        interpreter = Interpreter()
+        interpreter.register_keywords({'+': ['-- 1']})
+        redefined = cache.load(self.path, optimize=True, interpreter=interpreter)
+        self.assertFalse(redefined.warm)
+        self.assertEqual(redefined.report, [])
+        self.assertEqual(len(cache.load(self.path, optimize=True).report), 2)  # Not what was just cached
+
+        version = cache.VERSION
+        cache.VERSION = 'other'
+        try:
+            self.assertFalse(cache.load(self.path).warm)
+        finally:
+            cache.VERSION = version
+
+    def test_damaged(self):
+        cache.load(self.path)
+        with open(cache.cache_path(self.path), 'wb') as f:
+            f.write(b'not a pickle')
+        self.assertFalse(cache.load(self.path).warm)
+        self.assertTrue(cache.load(self.path).warm)
+
+    def test_not_cached(self):
+        '''Scripts that do not compile, or loads told not to, leave no cache'''
+        self.write('main:\n  - if 1\n')
+        excepted = False
+        try:
+            cache.load(self.path)
+        except ScriptError as ex:
+            self.assertEqual(str(ex), 'main@1: Keyword ended with unterminated if statement')
+            excepted = True
+        self.assertTrue(excepted)
+        self.assertFalse(os.path.exists(cache.cache_path(self.path)))
+        self.write(script)
+        self.assertFalse(cache.load(self.path, use_cache=False).warm)
+        self.assertFalse(os.path.exists(cache.cache_path(self.path)))
+        cache.load(self.path)
+        self.assertFalse(cache.load(self.path, refresh=True).warm)
+
+# EOF
@@ -0,0 +1,102 @@
+"""
+    Unit Test : compact script format
+"""
+
+import os
+import tempfile
+import unittest
+import yaml
+from parameterized import parameterized
+from daytona import Interpreter, ScriptError
+from daytona.cache import load
+from daytona.compact import parse, scan, dumps, convert, read_keywords
+from daytona.library import Library
+
+compact = """# A comment
+main:
+    set OUT ( helper $0 )
+    if $OUT
+        print big
+    else
+        print small
+    end
+
+helper:
+\t+ $0 1
+nothing:
+'quoted' key::
+    helper 2
+"""
+
+expected = {
+    'main': ['set OUT ( helper $0 )', 'if $OUT', 'print big', 'else', 'print small', 'end'],
+    'helper': ['+ $0 1'],
+    'nothing': [],
+    "'quoted' key:": ['helper 2'],
+}
+
+
+class TestCompact(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, name, text):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+    def test_parse(self):
+        self.assertEqual(dict(parse(compact.splitlines())), expected)
+        self.assertEqual(scan(self.write('a.day', compact)), list(expected))
+
+    @parameterized.expand([
+        ('indented first', '  + 1 1\n', 'test@1: Indented line before any keyword'),
+        ('not a keyword', 'main:\n  + 1 1\n+ 2 2\n', 'test@3: Expected "keyword:" or an indented line of its body'),
+        ('given twice', 'main:\nother:\nmain:\n', 'test@3: Keyword "main" is empty or already given'),
+        ('empty', ' #\n:\n', 'test@2: Keyword "" is empty or already given'),
+    ])
+    def test_errors(self, name, text, message):
+        excepted = False
+        try:
+            dict(parse(text.splitlines(), 'test'))
+        except ScriptError as ex:
+            self.assertEqual(str(ex), message)
+            excepted = True
+        self.assertTrue(excepted)
+
+    def test_convert(self):
+        '''Converted files give the keywords the YAML did, with blocks indented'''
+        example = os.path.join(os.path.dirname(__file__), '..', 'example.yml')
+        with open(example) as f:
+            keyword_dict = yaml.safe_load(f)
+        output = convert(example, os.path.join(self.directory.name, 'example.day'))
+        self.assertEqual(read_keywords(output), keyword_dict)
+        self.assertIn('    if 1\n        print It performs a test\n    else\n', open(output).read())
+        self.assertEqual(dumps({'nested': ['if 1', 'parallel', 'a', 'join', 'elif 2', 'b', 'end', 'c'], 7: None}),
+                         'nested:\n    if 1\n        parallel\n            a\n        join\n    elif 2\n        b\n'
+                         '    end\n    c\n7:\n')
+        self.assertEqual(dumps({'loop': ['while $N', 'if $N', 'break', 'end', 'end']}),
+                         'loop:\n    while $N\n        if $N\n            break\n        end\n    end\n')
+        for keyword_dict in ({'main': ['']}, {'main': ['#']}, {' main': []}, {'main': ['a\nb']}):
+            self.assertRaises(ValueError, dumps, keyword_dict)
+
+    def test_loaders(self):
+        '''The cache, libraries and interpreters take compact files as they do YAML'''
+        path = self.write('lib.day', compact)
+        self.assertEqual(self.write('other.yml', 'other:\n  - helper 5\n'), Library(self.directory.name).files[1])
+        interpreter = Interpreter()
+        interpreter.register_keywords(load(path, interpreter=interpreter).keywords)
+        self.assertEqual(interpreter.execute_script('helper', 1), 2)
+        self.assertTrue(load(path, interpreter=interpreter).warm)
+
+        interpreter = Interpreter()
+        interpreter.add_library(self.directory.name)
+        self.assertEqual(interpreter.execute_script('other'), 6)
+        self.assertEqual(interpreter.execute_script("'quoted' key:"), 3)
+
+# EOF
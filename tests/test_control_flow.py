@@ -5,7 +5,7 @@
 import yaml
 import unittest
 from parameterized import parameterized
-from daytona import primitive, register_keywords, execute_script, ScriptError
+from daytona import primitive, register_keywords, execute_script, ScriptError, KEYWORDS
 
 body = """
 does_nothing:
@@ -58,49 +58,6 @@ if-false-elif-false-else:
   - else
   -     cf True
   - end
-if-noarg:
-  - if
-incomplete-if:
-  - if 1
-  -     cf Does get here
-incomplete-elif:
-  - if 1
-  -     cf Does get here
-  - elif 0
-incomplete-else:
-  - if 1
-  -     cf Does get here
-  - else
-elif-alone:
-  - elif 0
-elif-after-else:
-  - if 0
-  -     cf Does not get here
-  - else
-  -     cf True
-  - elif 0
-elif-noarg:
-  - if 0
-  -     cf Does not get here
-  - elif
-else-arg:
-  - if 0
-  -     cf Does not get here
-  - else 0
-end-alone:
-  - end
-end-arg:
-  - if 0
-  -     cf Does not get here
-  - end 0
-if-else-else:
-  - if 0
-  -     cf Does not get here
-  - else
-  -     cf True
-  - else
-  -     cf Does not get here
-  - end
 if-nested-false:
   - if 0
   -     if 1
@@ -158,6 +115,63 @@ if-nested2-true:
   -     end
   - end
   - cf True
+if-false-skips-garbage:
+  - if 0
+  -     cf $nosuch ( ( (
+  - end
+if-chain-retval:
+  - if 0
+  -     cf Does not get here
+  - elif 1
+  -     cf $?
+  - end
+  - cf $?
+"""
+
+broken_body = """
+if-noarg:
+  - if
+incomplete-if:
+  - if 1
+  -     cf Does get here
+incomplete-elif:
+  - if 1
+  -     cf Does get here
+  - elif 0
+incomplete-else:
+  - if 1
+  -     cf Does get here
+  - else
+elif-alone:
+  - elif 0
+elif-after-else:
+  - if 0
+  -     cf Does not get here
+  - else
+  -     cf True
+  - elif 0
+elif-noarg:
+  - if 0
+  -     cf Does not get here
+  - elif
+else-arg:
+  - if 0
+  -     cf Does not get here
+  - else 0
+end-alone:
+  - end
+end-arg:
+  - if 0
+  -     cf Does not get here
+  - end 0
+if-else-else:
+  - if 0
+  -     cf Does not get here
+  - else
+  -     cf True
+  - else
+  -     cf Does not get here
+  - end
 """
 
 ARGS = []
@@ -200,6 +214,8 @@ class TestControl(unittest.TestCase):
                            ('if-nested-true-2', 2),
                            ('if-nested-true-3', 2),
                            ('if-nested2-true', 2),
+                           ('if-false-skips-garbage', 0),
+                           ('if-chain-retval', 2),
                            ])
     def test_control_taken(self, keyword, call_count):
         execute_script(keyword)
@@ -220,12 +236,19 @@ class TestControl(unittest.TestCase):
                            ('if-else-else', 'if-else-else@5: "else" keyword is extraneous'),
                            ])
     def test_control_excepts(self, keyword, exception_str):
+        '''Unbalanced blocks are found when registering, not when running'''
         excepted = False
         try:
-            execute_script(keyword)
+            register_keywords({keyword: yaml.safe_load(broken_body)[keyword]})
         except ScriptError as ex:
             self.assertEqual(str(ex), exception_str)
             excepted = True
         self.assertTrue(excepted)
+        self.assertNotIn(keyword, KEYWORDS)
+
+    def test_jump_targets(self):
+        instructions = KEYWORDS['if-false-elif-false-else'].instructions
+        self.assertEqual([(i.next_arm, i.block_end) for i in instructions],
+                         [(2, None), (None, None), (4, 6), (None, None), (6, 6), (None, None), (None, None)])
 
 # EOF
@@ -5,7 +5,7 @@
 import yaml
 import unittest
 from parameterized import parameterized
-from daytona import primitive, register_keywords, execute_script, ScriptError
+from daytona import primitive, register_keywords, execute_script, ScriptError, KEYWORDS, Op
 
 
 body = """
@@ -15,6 +15,12 @@ chains-return:
   - ex ( ex2 one )
 unclosed:
   - ( ex one
+unopened:
+  - ex one )
+empty:
+  - ex ( )
+dynamic:
+  - ( ex2 ex ) dyn
 """
 
 ARGS = []
@@ -52,12 +58,15 @@ class TestExecution(unittest.TestCase):
 
     @parameterized.expand([('one', [('one',), ('None',)]),
                            ('chains-return', [('one',)]),
+                           ('dynamic', [('dyn',)]),
                            ])
     def test_simple(self, keyword, call_list):
         execute_script(keyword)
         self.assertEqual(ARGS, call_list)
 
     @parameterized.expand([('unclosed', 'unclosed@1: Unclosed expression'),
+                           ('unopened', 'unopened@1: Unopened expression'),
+                           ('empty', 'empty@1: Empty expression'),
                            ])
     def test_excepts(self, keyword, exception_str):
         excepted = False
@@ -67,6 +76,13 @@ class TestExecution(unittest.TestCase):
             self.assertEqual(str(ex), exception_str)
             excepted = True
         self.assertTrue(excepted)
+        self.assertEqual(ARGS, [])  # Nothing ran before the error
+
+    def test_postfix(self):
+        self.assertEqual(KEYWORDS['one'].instructions[0].code,
+                         ((Op.PUSH, 'one'), (Op.CALL_KEYWORD, ('ex', 1)), (Op.CALL_KEYWORD, ('ex', 1))))
+        self.assertEqual(KEYWORDS['dynamic'].instructions[0].code,
+                         ((Op.PUSH, 'ex'), (Op.CALL_KEYWORD, ('ex2', 1)), (Op.PUSH, 'dyn'), (Op.CALL, 2)))
 
 
 # EOF
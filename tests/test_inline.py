@@ -0,0 +1,151 @@
+"""
+    Unit Test : Inlining
+"""
+
+import yaml
+import unittest
+from parameterized import parameterized
+from daytona import primitive, register_keywords, execute_script, ScriptError, KEYWORDS, Op, link
+from daytona import set_inline_threshold, INLINE_THRESHOLD
+
+body = """
+helper:
+  - il $0 $1
+calls-helper:
+  - helper one two
+  - il $?
+retval-helper:
+  - il $?
+calls-retval-helper:
+  - il before
+  - retval-helper
+empty-helper: []
+calls-empty-helper:
+  - il before
+  - empty-helper
+  - il $?
+branchy-helper:
+  - if $0
+  -     il yes
+  - else
+  -     il no
+  - end
+calls-branchy-helper:
+  - if 1
+  -     branchy-helper 1
+  -     branchy-helper 0
+  - end
+calls-with-expression:
+  - helper ( + 1 2 ) three
+calls-with-variable:
+  - helper $var 1
+recursive:
+  - if $0
+  -     recursive ( -- $0 )
+  - end
+nested-helper:
+  - helper nested x
+calls-nested-helper:
+  - nested-helper
+big-helper:
+  - il 1
+  - il 2
+  - il 3
+calls-big-helper:
+  - big-helper
+missing-arg:
+  - helper one
+fails-inside:
+  - il fine
+  - ++ $0
+calls-fails-inside:
+  - fails-inside frotz
+unresolved-inside:
+  - no-such-helper
+calls-unresolved-inside:
+  - unresolved-inside
+"""
+
+ARGS = []
+
+
+@primitive('il')
+def do_inline(args, context):
+    ARGS.append(args)
+    return context, 'il'
+
+
+class TestInline(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        assert cls
+        register_keywords(yaml.safe_load(body))
+
+    def setUp(self):
+        assert self
+        global ARGS
+        ARGS = []
+
+    def tearDown(self):
+        set_inline_threshold(INLINE_THRESHOLD)
+
+    def run_both(self, keyword, *args):
+        '''Runs inlined and not, which must agree, returning the calls made'''
+        global ARGS
+        set_inline_threshold(0)
+        plain = execute_script(keyword, *args)
+        plain_args, ARGS = ARGS, []
+        set_inline_threshold(INLINE_THRESHOLD)
+        self.assertEqual(execute_script(keyword, *args), plain)
+        self.assertEqual(ARGS, plain_args)
+        return ARGS
+
+    @parameterized.expand([('calls-helper', [('one', 'two'), ('il',)]),
+                           ('calls-retval-helper', [('before',), ('None',)]),
+                           ('calls-empty-helper', [('before',), ('None',)]),
+                           ('calls-branchy-helper', [('yes',), ('no',)]),
+                           ('calls-with-expression', [(3, 'three')]),
+                           ('calls-nested-helper', [('nested', 'x')]),
+                           ('calls-big-helper', [(1,), (2,), (3,)]),
+                           ])
+    def test_same_behavior(self, keyword, call_list):
+        self.assertEqual(self.run_both(keyword), call_list)
+
+    def test_recursive(self):
+        self.assertEqual(self.run_both('recursive', 3), [])
+        self.assertIn((Op.CALL_BODY, (KEYWORDS['recursive'], 1)), KEYWORDS['recursive'].linked[1].code)
+
+    def test_inlined(self):
+        link('calls-helper')
+        self.assertEqual(KEYWORDS['calls-helper'].linked[0].code,
+                         ((Op.PUSH, 'one'), (Op.PUSH, 'two'), (Op.CALL_PRIMITIVE, (do_inline.__wrapped__, 2))))
+        self.assertEqual(KEYWORDS['calls-helper'].linked[0].keyword, 'helper')
+        link('calls-nested-helper')
+        self.assertEqual(len(KEYWORDS['calls-nested-helper'].linked), 1)  # Inlined through two calls
+        for keyword in ('calls-with-expression', 'calls-with-variable', 'calls-big-helper'):
+            link(keyword)
+            self.assertEqual(KEYWORDS[keyword].linked[0].code[-1][0], Op.CALL_BODY)
+
+    def test_threshold(self):
+        set_inline_threshold(3)
+        link('calls-big-helper')
+        self.assertEqual(len(KEYWORDS['calls-big-helper'].linked), 3)
+        self.assertEqual(self.run_both('calls-big-helper'), [(1,), (2,), (3,)])
+
+    @parameterized.expand([('missing-arg', 'helper@1: No such arg 1'),
+                           ('calls-fails-inside', 'fails-inside@2: "++" keyword accepts numbers only'),
+                           ('calls-unresolved-inside', 'unresolved-inside@1: No such keyword "no-such-helper"'),
+                           ])
+    def test_error_location(self, keyword, exception_str):
+        for threshold in (0, INLINE_THRESHOLD):
+            set_inline_threshold(threshold)
+            excepted = False
+            try:
+                execute_script(keyword)
+            except ScriptError as ex:
+                self.assertEqual(str(ex), exception_str)
+                excepted = True
+            self.assertTrue(excepted)
+
+# EOF
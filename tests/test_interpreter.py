@@ -0,0 +1,153 @@
+"""
+    Unit Test : Interpreter instances and run_many
+"""
+
+import sys
+import threading
+import time
+import yaml
+import unittest
+from parameterized import parameterized
+from daytona import Interpreter, ScriptError, DEFAULT, KEYWORDS, VARIABLES, execute_script
+
+body = """
+stores:
+  - set NAME $0
+  - work
+  - work
+  - check $0 $NAME
+  - value $NAME
+work:
+  - local TOTAL 0
+  - set TOTAL ( + $TOTAL 1 )
+  - yield
+  - set COUNT ( + $TOTAL 1 )
+counts:
+  - set COUNT ( ++ $COUNT )
+  - value $COUNT
+fails:
+  - check $0 ( ++ $0 )
+"""
+
+
+def make_interpreter(switch=False, mismatches=None):
+    interpreter = Interpreter()
+
+    @interpreter.primitive('yield')
+    def do_yield(args, context):
+        if switch:  # Let other threads in
+            time.sleep(0)
+        return context, None
+
+    @interpreter.primitive('check')
+    def do_check(args, context):
+        if args[0] != args[1] and mismatches is not None:
+            mismatches.append(args)
+        if args[0] != args[1]:
+            raise ScriptError(context, f'{args[0]} changed to {args[1]}')
+        return context, None
+
+    @interpreter.primitive('value')
+    def do_value(args, context):
+        return context, args[0]
+
+    interpreter.register_keywords(yaml.safe_load(body))
+    return interpreter
+
+
+class TestInterpreter(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        assert cls
+        cls.switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)  # Switch threads as often as possible
+
+    @classmethod
+    def tearDownClass(cls):
+        sys.setswitchinterval(cls.switch_interval)
+
+    def test_isolated(self):
+        '''Keywords and variables belong to their Interpreter'''
+        first = make_interpreter()
+        second = Interpreter()
+        first.register_variables({'COUNT': 10})
+        self.assertEqual(first.execute_script('counts'), 11)
+        self.assertNotIn('COUNT', second.variables)
+        self.assertNotIn('COUNT', VARIABLES)
+        self.assertNotIn('counts', second.keywords)
+        self.assertNotIn('counts', KEYWORDS)
+        self.assertNotIn('check', KEYWORDS)
+        self.assertIn('set', second.keywords)  # Builtins come with every Interpreter
+
+    def test_default(self):
+        '''Module level functions use the default Interpreter'''
+        self.assertIs(KEYWORDS, DEFAULT.keywords)
+        self.assertIs(VARIABLES, DEFAULT.variables)
+        DEFAULT.register_keywords({'interpreter-default': ['set INTERPRETER_DEFAULT yes']})
+        execute_script('interpreter-default')
+        self.assertEqual(VARIABLES['INTERPRETER_DEFAULT'], 'yes')
+
+    def test_fork(self):
+        interpreter = make_interpreter()
+        interpreter.register_variables({'COUNT': 1})
+        forked = interpreter.fork()
+        self.assertEqual(forked.execute_script('counts'), 2)
+        self.assertEqual(interpreter.variables['COUNT'], 1)
+        self.assertIs(forked.keywords['counts'].instructions, interpreter.keywords['counts'].instructions)
+        self.assertIsNot(forked.keywords['counts'], interpreter.keywords['counts'])
+
+    @parameterized.expand([('eager', False), ('lazy', True)])
+    def test_shared_bodies(self, name, lazy):
+        '''Bodies compiled once and registered in two interpreters are linked to each one's variables'''
+        first, second = Interpreter(), Interpreter()
+        compiled, _ = first.compile_keywords({'main': ['set X 1', '+ $X 1']})
+        first.register_keywords(compiled, lazy=lazy)
+        second.register_keywords(compiled, lazy=lazy)
+        self.assertEqual(first.execute_script('main'), 2)
+        second.register_variables({'Y': 0})
+        self.assertEqual(second.execute_script('main'), 2)
+        self.assertEqual((second.variables['X'], second.variables['Y']), (1, 0))
+
+    @parameterized.expand([('interpreted', False), ('jit', True)])
+    def test_run_many(self, name, jit):
+        '''Each script sees only its own variables, and results come back in order'''
+        interpreter = make_interpreter(switch=True)
+        scripts = [('stores', f'script{n}') for n in range(400)]
+        results = interpreter.run_many(scripts, max_workers=8, jit=jit)
+        self.assertEqual(results, [f'script{n}' for n in range(400)])
+        self.assertNotIn('NAME', interpreter.variables)
+
+    def test_run_many_errors(self):
+        '''A failed script gives its error in its place'''
+        interpreter = make_interpreter()
+        results = interpreter.run_many([('stores', 'one'), ('fails', 1), ('no-such-keyword',), ('counts',)])
+        self.assertEqual(results[0], 'one')
+        self.assertEqual(str(results[1]), 'fails@1: 1 changed to 2')
+        self.assertEqual(str(results[2]), 'No such keyword "no-such-keyword"')
+        self.assertEqual(str(results[3]), 'counts@1: No variable $COUNT')
+
+    def test_run_many_starts_from_variables(self):
+        interpreter = make_interpreter()
+        interpreter.register_variables({'COUNT': 5})
+        self.assertEqual(interpreter.run_many([('counts',)] * 50, max_workers=4), [6] * 50)
+
+    def test_threads(self):
+        '''Separate Interpreters in separate threads do not interfere'''
+        mismatches = []
+        interpreters = [make_interpreter(True, mismatches) for _ in range(8)]
+
+        def run(interpreter, n):
+            for repeat in range(50):
+                interpreter.execute_script('stores', f'{n}-{repeat}')
+
+        threads = [threading.Thread(target=run, args=(interpreter, n)) for n, interpreter in enumerate(interpreters)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(mismatches, [])
+        for n, interpreter in enumerate(interpreters):
+            self.assertEqual(interpreter.variables['NAME'], f'{n}-49')
+
+# EOF
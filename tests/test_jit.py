@@ -0,0 +1,166 @@
+"""
+    Unit Test : Python transpiling backend
+"""
+
+import yaml
+import unittest
+from parameterized import parameterized
+from daytona import primitive, register_keywords, execute_script, ScriptError, KEYWORDS
+from daytona import jit
+
+body = """
+jit-lines:
+  - jit one $0
+  - jit two $?
+jit-blocks:
+  - if $0
+  -     jit if
+  - elif ( -- $0 )
+  - else
+  -     jit else $?
+  - end
+  - jit after $?
+jit-nested:
+  - if $0
+  -     if ( -- $0 )
+  -         jit inner
+  -     end
+  - else
+  - end
+jit-locals:
+  - local COUNT $0
+  - set JIT_GLOBAL ( + $COUNT 1 )
+  - jit $COUNT $JIT_GLOBAL
+jit-calls:
+  - jit-countdown $0
+  - jit $?
+jit-countdown:
+  - if $0
+  -     jit-countdown ( -- $0 )
+  -     jit-rets $0
+  - end
+jit-rets:
+  - jit $0
+jit-dynamic:
+  - $0 dynamic
+jit-no-variable:
+  - jit
+  - jit $JIT_NOSUCH
+jit-no-arg:
+  - jit ( -- $1 )
+3jit-digit:
+  - jit 3
+jit-inlined-error:
+  - jit-fails
+jit-fails:
+  - jit ( ++ frotz )
+"""
+
+ARGS = []
+
+
+@primitive('jit')
+def do_jit(args, context):
+    ARGS.append(args)
+    return context, len(args)
+
+
+class TestJit(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        assert cls
+        register_keywords(yaml.safe_load(body))
+
+    def setUp(self):
+        assert self
+        global ARGS
+        ARGS = []
+
+    def both(self, keyword, *args):
+        '''Run interpreted then transpiled, returning what each did'''
+        results = []
+        for use_jit in (False, True):
+            ARGS.clear()
+            try:
+                results.append((execute_script(keyword, *args, jit=use_jit), list(ARGS)))
+            except ScriptError as ex:
+                results.append((str(ex), list(ARGS)))
+        return results
+
+    @parameterized.expand([('jit-lines', ('a',)),
+                           ('jit-blocks', (1,)),
+                           ('jit-blocks', (2,)),
+                           ('jit-blocks', (0,)),
+                           ('jit-nested', (1,)),
+                           ('jit-nested', (2,)),
+                           ('jit-nested', (0,)),
+                           ('jit-locals', (4,)),
+                           ('jit-calls', (3,)),
+                           ('jit-dynamic', ('jit',)),
+                           ('jit-dynamic', ('jit-rets',)),
+                           ('jit-dynamic', ('no-such-keyword',)),
+                           ('jit-no-variable', ()),
+                           ('jit-no-arg', ('a',)),
+                           ('jit-inlined-error', ()),
+                           ('3jit-digit', ()),
+                           ])
+    def test_same_as_interpreter(self, keyword, args):
+        interpreted, transpiled = self.both(keyword, *args)
+        self.assertEqual(interpreted, transpiled)
+
+    @parameterized.expand([('jit-no-variable', 'jit-no-variable@2: No variable $JIT_NOSUCH'),
+                           ('jit-inlined-error', 'jit-fails@1: "++" keyword accepts numbers only'),
+                           ])
+    def test_error_location(self, keyword, exception_str):
+        excepted = False
+        try:
+            execute_script(keyword, jit=True)
+        except ScriptError as ex:
+            self.assertEqual(str(ex), exception_str)
+            excepted = True
+        self.assertTrue(excepted)
+
+    def test_max_depth(self):
+        excepted = False
+        try:
+            execute_script('jit-countdown', 50, max_depth=10, jit=True)
+        except ScriptError as ex:
+            self.assertEqual(str(ex), 'jit-countdown@2: Calls nested more than 10 deep')
+            excepted = True
+        self.assertTrue(excepted)
+
+    def test_cached(self):
+        '''Functions are kept until something is registered'''
+        execute_script('jit-calls', 1, jit=True)
+        function = jit.function(KEYWORDS['jit-countdown'])
+        execute_script('jit-calls', 1, jit=True)
+        self.assertIs(jit.function(KEYWORDS['jit-countdown']), function)
+        register_keywords({'jit-unrelated': ['jit']})
+        execute_script('jit-calls', 1, jit=True)
+        self.assertIsNot(jit.function(KEYWORDS['jit-countdown']), function)
+
+    def test_source(self):
+        '''Primitive calls are direct and blocks are Python conditionals'''
+        source = jit.source(KEYWORDS['jit-blocks'])
+        self.assertTrue(source.startswith('def k_jit_blocks_'))
+        self.assertIn('if c != 0', source)
+        self.assertIn('elif (c := ', source)
+        self.assertIn('# jit-blocks@5', source)
+        self.assertNotIn('call_dynamic', source)
+
+    def test_unsupported(self):
+        '''A body the transpiler cannot express is interpreted'''
+        expression = jit.expression
+
+        def unsupported(*args):
+            raise jit.Unsupported('test')
+        jit.expression = unsupported
+        try:
+            register_keywords({'jit-unrelated': ['jit']})  # So nothing is already compiled
+            self.assertEqual(self.both('jit-calls', 2), [(1, [(1,), (2,), ('None',)])] * 2)
+            self.assertRaises(jit.Unsupported, jit.function, KEYWORDS['jit-calls'])
+        finally:
+            jit.expression = expression
+
+# EOF
@@ -0,0 +1,116 @@
+"""
+    Unit Test : lazy keywords and multi-file libraries
+"""
+
+import os
+import tempfile
+import unittest
+from daytona import Interpreter, ScriptError, CompiledBody
+from daytona.library import Library, scan_keywords
+
+files = {
+    'a.yml': """---
+# The start
+main:
+  - set OUT ( helper $0 )
+  - $1 $OUT
+'quoted':
+  - + 1 1
+...
+""",
+    'b.yml': """
+helper:
+  - + $0 ( other )
+other:
+  - ++ 0
+main:
+  - + 1000 0
+""",
+    'c.yaml': """
+unused: [ ++ 1 ]
+dynamic:
+  - ++ $0
+""",
+    'notes.txt': 'not: a script\n',
+}
+
+
+class TestLibrary(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        for name, text in files.items():
+            with open(os.path.join(self.directory.name, name), 'w') as f:
+                f.write(text)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def test_index(self):
+        '''Directories give their YAML files by name, and the first file with a keyword has it'''
+        library = Library(self.directory.name)
+        self.assertEqual([os.path.basename(path) for path in library.files], ['a.yml', 'b.yml', 'c.yaml'])
+        self.assertEqual(scan_keywords(self.path('a.yml')), ['main', 'quoted'])
+        self.assertEqual(library.index['main'], self.path('a.yml'))
+        self.assertEqual(library.index['unused'], self.path('c.yaml'))
+
+    def test_loads_when_needed(self):
+        '''Only the files and bodies a run needs are read and compiled'''
+        interpreter = Interpreter()
+        interpreter.add_library(self.directory.name)
+        self.assertEqual(interpreter.execute_script('main', 1, '++'), 3)
+        self.assertEqual(interpreter.library_files, {self.path('a.yml'), self.path('b.yml')})
+        self.assertEqual(interpreter.load_stats.loaded, 4)  # Not b.yml's main
+        self.assertEqual(interpreter.load_stats.compiled, 3)
+        self.assertIsInstance(interpreter.keywords['quoted'], list)
+        self.assertEqual(str(interpreter.load_stats), '4 keywords loaded (2 library files read), 3 compiled')
+
+        self.assertEqual(interpreter.execute_script('main', 1, 'dynamic'), 3)  # Found when it runs
+        self.assertEqual(interpreter.load_stats.files, 3)
+        self.assertNotIsInstance(interpreter.keywords['unused'], CompiledBody)
+
+    def test_registered_first(self):
+        '''Library keywords do not replace those registered'''
+        interpreter = Interpreter()
+        interpreter.register_keywords({'helper': ['+ $0 $0']})
+        interpreter.add_library([self.path('a.yml'), self.path('b.yml')])
+        self.assertEqual(interpreter.execute_script('main', 4, '++'), 9)
+        self.assertEqual(interpreter.library_files, {self.path('a.yml')})
+        forked = interpreter.fork()
+        self.assertEqual(forked.execute_script('other'), 1)
+        self.assertNotIn('other', interpreter.keywords)
+
+    def test_missing(self):
+        interpreter = Interpreter()
+        interpreter.add_library(self.directory.name)
+        excepted = False
+        try:
+            interpreter.execute_script('no-such-keyword')
+        except ScriptError as ex:
+            self.assertEqual(str(ex), 'No such keyword "no-such-keyword"')
+            excepted = True
+        self.assertTrue(excepted)
+        self.assertEqual(interpreter.library_files, set())
+
+    def test_lazy(self):
+        '''Lazy bodies compile, and report their errors, when first needed'''
+        interpreter = Interpreter()
+        interpreter.register_keywords({'lazy-main': ['lazy-empty', 'lazy-broken'], 'lazy-empty': [],
+                                       'lazy-broken': ['if 1'], 'lazy-unused': ['if']}, lazy=True)
+        self.assertEqual(interpreter.load_stats.compiled, 0)
+        self.assertEqual(interpreter.execute_script('lazy-empty'), 'None')
+        excepted = False
+        try:
+            interpreter.execute_script('lazy-main')
+        except ScriptError as ex:
+            self.assertEqual(str(ex), 'lazy-broken@1: Keyword ended with unterminated if statement')
+            excepted = True
+        self.assertTrue(excepted)
+        self.assertEqual(interpreter.load_stats.loaded, 4)
+        self.assertEqual(interpreter.load_stats.compiled, 2)
+        self.assertRaises(ValueError, interpreter.register_keywords, {'lazy-optimized': []}, optimize=True, lazy=True)
+
+# EOF
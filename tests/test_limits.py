@@ -0,0 +1,118 @@
+"""
+    Unit Test : line budgets, deadlines and call depth
+"""
+
+import asyncio
+import gc
+import pickle
+import unittest
+import warnings
+from parameterized import parameterized
+import daytona
+from daytona import Interpreter, Limits, ScriptError
+from daytona.profile import Profiler
+
+keywords = {
+    'main': ['set X 0', 'count 10', '+ $X 0'],
+    'count': ['if $0', '    set X ( ++ $X )', '    count ( -- $0 )', 'end'],
+    'forever': ['ping'],
+    'ping': ['pong'],
+    'pong': ['ping'],
+    'deep': ['deep ( ++ $0 )'],
+    'both': ['parallel', '    count 10', '    count 10', 'join'],
+    'sleeps': ['sleep 0', 'while 1', '    sleep 0', 'end'],
+}
+
+
+def make_interpreter():
+    interpreter = Interpreter()
+    interpreter.register_keywords(keywords)
+    return interpreter
+
+
+class TestLimits(unittest.TestCase):
+
+    @parameterized.expand([('budget', {'budget': 1000}), ('timeout', {'timeout': 60}),
+                           ('both', {'budget': 1000, 'timeout': 60})])
+    def test_within(self, name, limits):
+        '''Scripts within their limits run as they would without them'''
+        self.assertEqual(make_interpreter().execute_script('main', **limits), 10)
+
+    @parameterized.expand([('exact', 56, None), ('one over', 55, 'main@3')])
+    def test_budget(self, name, budget, where):
+        '''Lines run and keywords called are counted exactly, whatever CHECK_LINES is'''
+        interpreter = make_interpreter()
+        if where is None:
+            self.assertEqual(interpreter.execute_script('main', budget=budget), 10)
+            return
+        with self.assertRaises(ScriptError) as cm:
+            interpreter.execute_script('main', budget=budget)
+        self.assertEqual(str(cm.exception), f'{where}: Ran more than {budget} instructions')
+
+    def test_runaway(self):
+        '''Mutual recursion between keywords is stopped where it had got to'''
+        with self.assertRaises(ScriptError) as cm:
+            make_interpreter().execute_script('forever', budget=5000)
+        self.assertRegex(str(cm.exception), r'^p[io]ng@1: Ran more than 5000 instructions$')
+        with self.assertRaises(ScriptError) as cm:
+            make_interpreter().execute_script('forever', timeout=0.05)
+        self.assertIn('Ran longer than 0.05 seconds', str(cm.exception))
+
+    def test_depth(self):
+        '''max_depth still stops calls nesting too deep, with where they were'''
+        with self.assertRaises(ScriptError) as cm:
+            make_interpreter().execute_script('deep', 0, max_depth=50, budget=10 ** 6)
+        self.assertEqual(str(cm.exception), 'deep@1: Calls nested more than 50 deep')
+
+    def test_parallel(self):
+        '''Instructions run by a 'parallel' block count against the budget of the script that started it'''
+        interpreter = make_interpreter()
+        interpreter.variables['X'] = 0
+        limits = Limits(budget=10 ** 6)
+        interpreter.call_keyword(None, 'both', (), limits=limits)
+        self.assertEqual(limits.used, 2 * (42 + 10) + 1)
+        with self.assertRaises(ScriptError):
+            interpreter.execute_script('both', budget=100)
+
+    def test_async(self):
+        '''execute_script_async keeps to a budget too'''
+        interpreter = make_interpreter()
+        self.assertEqual(asyncio.run(interpreter.execute_script_async('main', budget=1000)), 10)
+        with self.assertRaises(ScriptError):
+            asyncio.run(interpreter.execute_script_async('forever', budget=1000))
+
+    def test_profile(self):
+        '''Profiled scripts keep to a budget, and counting calls does not add lines to the profile'''
+        plain, limited = Profiler(), Profiler()
+        self.assertEqual(make_interpreter().execute_script('main', profile=plain), 10)
+        self.assertEqual(make_interpreter().execute_script('main', profile=limited, budget=56), 10)
+        self.assertEqual({where: stats.calls for where, stats in plain.lines.items()},
+                         {where: stats.calls for where, stats in limited.lines.items()})
+        with self.assertRaises(ScriptError):
+            make_interpreter().execute_script('forever', profile=Profiler(), budget=100)
+
+    @parameterized.expand([('blocking',), ('async',), ('profiled',)])
+    def test_stopped_waiting(self, name):
+        '''An async primitive's awaitable is closed when the limits stop the script as it is called'''
+        interpreter = make_interpreter()
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            with self.assertRaises(ScriptError) as cm:
+                if name == 'async':
+                    asyncio.run(interpreter.execute_script_async('sleeps', timeout=0))
+                else:
+                    interpreter.execute_script('sleeps', timeout=0, profile=Profiler() if name == 'profiled' else None)
+            gc.collect()
+        self.assertEqual(str(cm.exception), 'sleeps@1: Ran longer than 0 seconds')
+        self.assertEqual([str(warning.message) for warning in caught], [])
+
+    def test_pickle(self):
+        '''Limits go to process pool workers with what is left of them'''
+        limits = Limits(budget=100, timeout=60)
+        limits.used = 40
+        copied = pickle.loads(pickle.dumps(limits))
+        self.assertEqual((copied.budget, copied.used, copied.deadline), (100, 40, limits.deadline))
+        self.assertEqual(copied.quota(), 61)
+        self.assertEqual(Limits().quota(), daytona.CHECK_LINES)
+
+# EOF
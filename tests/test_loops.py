@@ -0,0 +1,182 @@
+"""
+    Unit Test : while/break loops
+"""
+
+import yaml
+import unittest
+from parameterized import parameterized
+from daytona import Interpreter, ScriptError, Limits
+from daytona.optimize import optimize_body
+
+body = """
+count:
+  - set N $0
+  - set T 0
+  - while $N
+  -     set T ( + $T $N )
+  -     set N ( -- $N )
+  - end
+  - + $T 0
+never:
+  - set T 1
+  - while 0
+  -     set T 2
+  - end
+  - + $T 0
+stops:
+  - set N 10
+  - set T 0
+  - while 1
+  -     set N ( -- $N )
+  -     if $N
+  -         set T ( ++ $T )
+  -     else
+  -         break
+  -     end
+  - end
+  - set R $?
+  - + $T 0
+nested:
+  - set I 3
+  - set T 0
+  - while $I
+  -     set J 4
+  -     while 1
+  -         if $J
+  -             set J ( -- $J )
+  -             set T ( ++ $T )
+  -         else
+  -             break
+  -         end
+  -     end
+  -     set I ( -- $I )
+  - end
+  - + $T 0
+counted:
+  - local N $0
+  - while $N
+  -     add-one
+  -     local N ( -- $N )
+  - end
+add-one:
+  - set T ( ++ $T )
+forever:
+  - while 1
+  - end
+"""
+
+broken_body = """
+while-noarg:
+  - while
+  - end
+break-arg:
+  - while 1
+  -     break 1
+  - end
+break-alone:
+  - break
+break-in-if:
+  - if 1
+  -     break
+  - end
+unterminated-while:
+  - while 1
+  -     + 1 1
+else-in-while:
+  - while 1
+  -     else
+  - end
+end-after-while:
+  - while 1
+  - end
+  - end
+"""
+
+
+def make_interpreter():
+    interpreter = Interpreter()
+    interpreter.register_keywords(yaml.safe_load(body))
+    return interpreter
+
+
+class TestLoops(unittest.TestCase):
+
+    @parameterized.expand([('count', (100,), 5050),
+                           ('count', (0,), 0),
+                           ('never', (), 1),
+                           ('stops', (), 9),
+                           ('nested', (), 12),
+                           ])
+    def test_loop(self, keyword, args, expected):
+        self.assertEqual(make_interpreter().execute_script(keyword, *args), expected)
+
+    def test_break_retval(self):
+        '''Leaving a loop, by its condition or by 'break', sets $? to 'None' as 'end' does'''
+        interpreter = make_interpreter()
+        interpreter.execute_script('stops')
+        self.assertEqual(interpreter.variables['R'], 'None')
+        self.assertEqual(interpreter.execute_script('counted', 3), 'None')
+
+    @parameterized.expand([(0,), (2,)])
+    def test_inlined(self, threshold):
+        '''Loops calling keywords, and loops in inlined keywords, run the same'''
+        interpreter = make_interpreter()
+        interpreter.set_inline_threshold(threshold)
+        interpreter.register_keywords({'twice': ['count 10', 'set U $?', 'count 5', '+ $? $U'], 'calls': ['counted 1000']})
+        interpreter.variables['T'] = 0
+        interpreter.execute_script('calls')
+        self.assertEqual(interpreter.variables['T'], 1000)
+        self.assertEqual(interpreter.execute_script('twice'), 70)
+
+    def test_jump_targets(self):
+        '''The condition jumps past the end, which jumps back, and 'break' jumps to the end'''
+        instructions = make_interpreter().keywords['stops'].instructions
+        self.assertEqual([(i.next_arm, i.block_end, i.loop_start) for i in instructions[2:10]],
+                         [(9, None, None), (None, None, None), (6, None, None), (None, None, None),
+                          (8, 8, None), (None, 9, None), (None, None, None), (None, None, 2)])
+
+    def test_limits(self):
+        '''Loops that never end count against a budget'''
+        interpreter = make_interpreter()
+        with self.assertRaises(ScriptError) as cm:
+            interpreter.execute_script('forever', budget=10000)
+        self.assertEqual(str(cm.exception), 'forever@2: Ran more than 10000 instructions')
+        limits = Limits(budget=10 ** 6)
+        interpreter.call_keyword(None, 'count', (10,), limits=limits)
+        self.assertEqual(limits.used, 2 + 11 + 2 * 10 + 1)
+
+    def test_trace(self):
+        '''Testing the condition is a line each time round, and 'break' is a line too'''
+        interpreter = make_interpreter()
+        lines = []
+        interpreter.settrace(lambda frame, event, arg: lines.append(frame.line_no) if event == 'line' else None)
+        interpreter.execute_script('count', 2)
+        self.assertEqual(lines, [1, 2, 3, 4, 5, 3, 4, 5, 3, 7])
+        lines.clear()
+        interpreter.execute_script('stops')
+        self.assertEqual(lines[-6:], [3, 4, 5, 8, 11, 12])
+
+    def test_optimize(self):
+        '''A loop whose condition is false is dropped'''
+        interpreter = make_interpreter()
+        optimized, report = optimize_body(interpreter.keywords['never'], interpreter.keywords)
+        self.assertEqual([optimization.action for optimization in report], ['removed "while" loop through line 4'])
+        self.assertEqual([instruction.line_no for instruction in optimized.instructions], [1, 5])
+
+    @parameterized.expand([('while-noarg', 'while-noarg@1: "while" keyword requires one argument'),
+                           ('break-arg', 'break-arg@2: "break" keyword has arguments'),
+                           ('break-alone', 'break-alone@1: "break" keyword not within "while" loop'),
+                           ('break-in-if', 'break-in-if@2: "break" keyword not within "while" loop'),
+                           ('unterminated-while', 'unterminated-while@2: Keyword ended with unterminated while loop'),
+                           ('else-in-while', 'else-in-while@2: "else" keyword not within "if" statement'),
+                           ('end-after-while', 'end-after-while@3: "end" keyword not within "if" statement'),
+                           ])
+    def test_loop_excepts(self, keyword, exception_str):
+        '''Unbalanced loops are found when registering, not when running'''
+        interpreter = Interpreter()
+        with self.assertRaises(ScriptError) as cm:
+            interpreter.register_keywords({keyword: yaml.safe_load(broken_body)[keyword]})
+        self.assertEqual(str(cm.exception), exception_str)
+        self.assertNotIn(keyword, interpreter.keywords)
+
+# EOF
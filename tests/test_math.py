@@ -9,7 +9,8 @@ from daytona import primitive, register_keywords, execute_script, ScriptError, r
 
 variables = {
     'var1': 'oneVar',
-    'var2': 2
+    'var2': 2,
+    'var3': '-5'
     }
 
 body = """
@@ -23,6 +24,19 @@ adds:
   - math ( + 1 2 3 ( + 4 5 6 ) 7 8 ( ++ 9 ) $var2 )
 negative:
   - math ( + -1 -1 )
+strings:
+  - math ( + $var3 007 )
+zero:
+  - set ZERO ( -- 1 )
+  - math $ZERO
+  - if $ZERO
+  -     math Does not get here
+  - end
+  - math ( -- 1 )
+not-numbers:
+  - math 007 -0 +1 x1 ² ٣
+not-arguments:
+  - math $²
 dec-faults:
   - ( -- )
 inc-faults:
@@ -65,16 +79,20 @@ class TestMath(unittest.TestCase):
         ARGS = []
         CALLS = 0
 
-    @parameterized.expand([('increment', [('2',), ('3',)]),
-                           ('decrement', [('2',), ('1',)]),
-                           ('adds', [('48',)]),
-                           ('negative', [('-2',)]),
+    @parameterized.expand([('increment', [(2,), (3,)]),
+                           ('decrement', [(2,), (1,)]),
+                           ('adds', [(48,)]),
+                           ('negative', [(-2,)]),
+                           ('strings', [(2,)]),
+                           ('zero', [(0,), (0,)]),
+                           ('not-numbers', [('007', '-0', '+1', 'x1', '²', '٣')]),
                            ])
     def test_simple(self, keyword, call_list):
         execute_script(keyword)
         self.assertEqual(ARGS, call_list)
 
-    @parameterized.expand([('dec-faults', 'dec-faults@1: "--" keyword is unary'),
+    @parameterized.expand([('not-arguments', 'not-arguments@1: No variable $²'),
+                           ('dec-faults', 'dec-faults@1: "--" keyword is unary'),
                            ('inc-faults', 'inc-faults@1: "++" keyword is unary'),
                            ('invalid-arg-inc', 'invalid-arg-inc@1: "++" keyword accepts numbers only'),
                            ('invalid-arg-dec', 'invalid-arg-dec@1: "--" keyword accepts numbers only'),
@@ -0,0 +1,177 @@
+"""
+    Unit Test : Optimization
+"""
+
+import yaml
+import unittest
+from parameterized import parameterized
+from daytona import primitive, register_keywords, execute_script, KEYWORDS, Op, Interpreter
+
+body = """
+folds:
+  - opt ( + 1 2 3 ( ++ 4 ) ( -- 0 ) )
+folds-statement:
+  - + 1 2
+partial-fold:
+  - opt ( + $0 ( ++ 1 ) )
+no-fold-error:
+  - opt ( ++ frotz )
+if-true:
+  - if 1
+  -     opt True
+  - else
+  -     opt Does not get here
+  - end
+if-false:
+  - opt True
+  - if ( -- 1 )
+  -     opt Does not get here
+  - end
+if-false-reads-retval:
+  - opt True
+  - if 0
+  -     opt Does not get here
+  - end
+  - opt $?
+elif-chain:
+  - if 0
+  -     opt Does not get here
+  - elif $0
+  -     opt $0
+  - elif 1
+  -     opt $?
+  - elif $0
+  -     opt Does not get here
+  - end
+elif-reads-retval:
+  - + 0 0
+  - if 0
+  -     opt Does not get here
+  - elif $?
+  -     opt True
+  - else
+  -     opt Does not get here
+  - end
+loop-reads-retval:
+  - set N 2
+  - while ( + $N ( opt-zero $? ) )
+  -     set N ( -- $N )
+  -     if 1
+  -         + 7 0
+  -     end
+  - end
+nested:
+  - if $0
+  -     if 1
+  -         opt $0
+  -     end
+  - end
+returns-block:
+  - if 0
+  -     opt Does not get here
+  - else
+  -     opt True
+  - end
+"""
+
+ARGS = []
+
+
+@primitive('opt')
+def do_opt(args, context):
+    ARGS.append(args)
+    return context, 'opt'
+
+
+@primitive('opt-zero')
+def do_opt_zero(args, context):
+    ARGS.append(args)
+    return context, 0
+
+
+class TestOptimize(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        assert cls
+        body_dict = yaml.safe_load(body)
+        register_keywords(body_dict)
+        cls.plain = dict(KEYWORDS)
+        cls.report = [str(r) for r in register_keywords(body_dict, optimize=True)]
+
+    def setUp(self):
+        assert self
+        global ARGS
+        ARGS = []
+
+    def run_both(self, keyword, *args):
+        '''Returns what the plain and optimized bodies did, which must agree'''
+        global ARGS
+        optimized = KEYWORDS[keyword]
+        try:
+            KEYWORDS[keyword] = self.plain[keyword]
+            plain_ret = execute_script(keyword, *args)
+        finally:
+            KEYWORDS[keyword] = optimized
+        plain_args, ARGS = ARGS, []
+        ret = execute_script(keyword, *args)
+        self.assertEqual(ARGS, plain_args)
+        self.assertEqual(ret, plain_ret)
+        return ARGS, ret
+
+    @parameterized.expand([('folds', (), [(10,)]),
+                           ('folds-statement', (), []),
+                           ('partial-fold', (1,), [(3,)]),
+                           ('if-true', (), [('True',)]),
+                           ('if-false', (), [('True',)]),
+                           ('if-false-reads-retval', (), [('True',), ('None',)]),
+                           ('elif-chain', (0,), [('None',)]),
+                           ('elif-chain', (1,), [(1,)]),
+                           ('elif-reads-retval', (), [('True',)]),
+                           ('loop-reads-retval', (), [('None',)] * 3),
+                           ('nested', (1,), [(1,)]),
+                           ('nested', (0,), []),
+                           ('returns-block', (), [('True',)]),
+                           ])
+    def test_same_behavior(self, keyword, args, call_list):
+        self.assertEqual(self.run_both(keyword, *args)[0], call_list)
+
+    def test_folded_code(self):
+        self.assertEqual(KEYWORDS['folds'].instructions[0].code,
+                         ((Op.PUSH, 10), (Op.CALL_KEYWORD, ('opt', 1))))
+        self.assertEqual(KEYWORDS['partial-fold'].instructions[0].code,
+                         ((Op.PUSH_ARG, 0), (Op.PUSH, 2), (Op.CALL_KEYWORD, ('+', 2)), (Op.CALL_KEYWORD, ('opt', 1))))
+        self.assertEqual(KEYWORDS['no-fold-error'].instructions, self.plain['no-fold-error'].instructions)
+
+    def test_branches_removed(self):
+        self.assertEqual(len(KEYWORDS['if-true'].instructions), 2)  # The block's 'None' is still returned
+        self.assertEqual(len(KEYWORDS['if-false'].instructions), 2)
+        self.assertEqual([i.line_no for i in KEYWORDS['elif-chain'].instructions], [3, 4, 5, 6, 9])
+
+    def test_report(self):
+        self.assertIn('folds@1: folded ( ++ 4 ) to 5', self.report)
+        self.assertIn('folds@1: folded ( + 1 2 3 5 -1 ) to 10', self.report)
+        self.assertIn('folds-statement@1: folded ( + 1 2 ) to 3', self.report)
+        self.assertIn('if-true@1: removed constant "if"', self.report)
+        self.assertIn('if-true@3: removed arms after constant "if" through line 4', self.report)
+        self.assertIn('if-false@2: folded ( -- 1 ) to 0', self.report)
+        self.assertIn('if-false@2: removed "if" arm through line 3', self.report)
+        self.assertIn('elif-chain@1: removed "if" arm through line 2', self.report)
+        self.assertIn('elif-chain@7: removed arms after constant "elif" through line 8', self.report)
+
+    def test_redefined_together(self):
+        '''A primitive redefined in the same registration is not folded'''
+        interpreter = Interpreter()
+        interpreter.register_primitive('opt', do_opt)
+        self.assertEqual(interpreter.register_keywords({'+': ['opt custom'], 'm': ['opt ( + 1 2 )']}, optimize=True), [])
+        interpreter.execute_script('m')
+        self.assertEqual(ARGS, [('custom',), ('opt',)])
+        reload = interpreter.reload_keywords({'m': ['+ 1 2']}, replaces=['+', 'm'], optimize=True)
+        self.assertEqual(reload.removed, ['+'])
+        self.assertEqual(reload.report, [])
+
+    def test_not_by_default(self):
+        self.assertEqual(register_keywords({'unoptimized': ['opt ( + 1 2 )']}), [])
+        self.assertEqual(KEYWORDS['unoptimized'].instructions[0].code[-2], (Op.CALL_KEYWORD, ('+', 2)))
+
+# EOF
@@ -0,0 +1,266 @@
+"""
+    Unit Test : parallel/join blocks
+"""
+
+import os
+import threading
+import time
+import yaml
+import unittest
+from parameterized import parameterized
+from daytona import primitive, register_keywords, execute_script, ScriptError, KEYWORDS, VARIABLES, DEFAULT
+from daytona.parallel import process_pool
+
+body = """
+par-values:
+  - local L
+  - parallel
+  -     set PAR_A ( par-meet 1 )
+  -     local L ( par-meet ( + $0 1 ) )
+  -     par-meet ignored
+  -     par-child 4
+  - join
+  - par-values-check $?
+  - + $PAR_A $L
+par-values-check:
+  - par-last $0
+par-child:
+  - par-meet ( ++ $0 )
+par-dynamic:
+  - parallel
+  -     set PAR_D ( $0 5 )
+  - join
+  - + $PAR_D 0
+par-fails:
+  - parallel
+  -     par-wait 0.2 slow
+  -     par-fail first
+  - join
+par-child-fails:
+  - parallel
+  -     par-fail-later
+  - join
+par-fail-later:
+  - par-wait 0
+  - par-fail inner
+par-first-fails:
+  - parallel
+  -     par-wait 0.2 fail
+  -     par-fail second
+  - join
+par-nested:
+  - parallel
+  -     set PAR_N1 ( par-nested-child 1 )
+  -     set PAR_N2 ( par-nested-child 2 )
+  - join
+  - + $PAR_N1 $PAR_N2
+par-nested-child:
+  - parallel
+  -     set PAR_NESTED ( ++ $0 )
+  - join
+  - + $PAR_NESTED 0
+par-in-if:
+  - if $0
+  -     parallel
+  -         set PAR_I ( ++ $0 )
+  -     join
+  - else
+  -     set PAR_I none
+  - end
+  - par-last $PAR_I
+par-empty:
+  - parallel
+  - join
+par-pids:
+  - parallel
+  -     set PAR_P1 ( par-pid )
+  -     set PAR_P2 ( par-pid )
+  -     par-set-unseen
+  - join
+par-set-unseen:
+  - set PAR_UNSEEN changed
+"""
+
+broken_body = """
+parallel-arg:
+  - parallel now
+  - join
+join-arg:
+  - parallel
+  - join now
+join-alone:
+  - join
+join-in-if:
+  - parallel
+  -     if 1
+  -     join
+  - end
+if-in-parallel:
+  - parallel
+  -     if 1
+  -     end
+  - join
+parallel-in-parallel:
+  - parallel
+  -     parallel
+  -     join
+  - join
+end-in-parallel:
+  - if 1
+  -     parallel
+  - end
+unterminated-parallel:
+  - parallel
+  -     par-wait 0
+not-a-call:
+  - parallel
+  -     set PAR_X 1
+  - join
+"""
+
+BARRIER = None
+LAST = []
+
+
+@primitive('par-meet')
+def do_meet(args, context):
+    '''Returns only once as many calls as the barrier has parties are waiting, so they must run at once'''
+    if BARRIER is not None:
+        BARRIER.wait()
+    return context, args[0]
+
+
+@primitive('par-wait')
+def do_wait(args, context):
+    time.sleep(float(args[0]))
+    if len(args) > 1 and args[1] == 'fail':
+        raise ScriptError(context, 'waited then failed')
+    return context, None
+
+
+@primitive('par-fail')
+def do_fail(args, context):
+    raise ScriptError(context, f'{args[0]} failed')
+
+
+@primitive('par-last')
+def do_last(args, context):
+    LAST.append(args[0])
+    return context, args[0]
+
+
+@primitive('par-pid')
+def do_pid(args, context):
+    return context, os.getpid()
+
+
+class TestParallel(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        assert cls
+        register_keywords(yaml.safe_load(body))
+
+    def setUp(self):
+        assert self
+        global BARRIER
+        BARRIER = None
+        LAST.clear()
+
+    def excepts(self, keyword, *args, jit=False):
+        try:
+            execute_script(keyword, *args, jit=jit)
+        except ScriptError as ex:
+            return str(ex)
+        return None
+
+    @parameterized.expand([('interpreted', False), ('jit', True)])
+    def test_values(self, name, jit):
+        '''Lines run at once, and set and local take their values when joined'''
+        global BARRIER
+        BARRIER = threading.Barrier(4, timeout=10)
+        self.assertEqual(execute_script('par-values', 5, jit=jit), 7)
+        self.assertEqual(VARIABLES['PAR_A'], 1)
+        self.assertEqual(LAST, ['None'])  # join leaves $? as 'None'
+        self.assertNotIn('L', VARIABLES)
+
+    @parameterized.expand([('interpreted', False), ('jit', True)])
+    def test_dynamic(self, name, jit):
+        self.assertEqual(execute_script('par-dynamic', '++', jit=jit), 6)
+        self.assertEqual(self.excepts('par-dynamic', 'par-no-such', jit=jit), 'par-dynamic@2: No such keyword "par-no-such"')
+
+    @parameterized.expand([('par-fails', 'par-fails@3: first failed'),
+                           ('par-child-fails', 'par-fail-later@2: inner failed'),
+                           ('par-first-fails', 'par-first-fails@2: waited then failed'),
+                           ])
+    def test_errors(self, keyword, exception_str):
+        '''The first line, as written, to fail raises its error, with where it was'''
+        for jit in (False, True):
+            self.assertEqual(self.excepts(keyword, jit=jit), exception_str)
+
+    @parameterized.expand([('interpreted', False), ('jit', True)])
+    def test_nested(self, name, jit):
+        '''Lines on the pool run their own parallel blocks one line at a time'''
+        self.assertEqual(execute_script('par-nested', jit=jit), 5)
+
+    @parameterized.expand([('interpreted', False), ('jit', True)])
+    def test_blocks(self, name, jit):
+        execute_script('par-in-if', 1, jit=jit)
+        execute_script('par-in-if', 0, jit=jit)
+        self.assertEqual(LAST, [2, 'none'])
+        self.assertEqual(execute_script('par-empty', jit=jit), 'None')
+
+    def test_linked(self):
+        '''Lines are not inlined, and what they call is linked along with the script'''
+        DEFAULT.link('par-values')
+        self.assertEqual(KEYWORDS['par-child'].generation, DEFAULT.link_generation)
+        spawns = [instruction.line_no for instruction in KEYWORDS['par-values'].linked if instruction.spawn]
+        self.assertEqual(spawns, [3, 4, 5, 6])
+
+    def test_optimized(self):
+        '''Folding leaves the calls that are spawned'''
+        register_keywords({'par-folded': ['parallel', 'set PAR_F ( + 1 2 )', 'join', '+ $PAR_F ( + 1 2 )']},
+                          optimize=True)
+        self.assertEqual(execute_script('par-folded'), 6)
+
+    def test_processes(self):
+        '''A process pool runs lines elsewhere, with a copy of the variables'''
+        interpreter = DEFAULT.fork()
+        interpreter.set_parallel_pool(process_pool(interpreter, max_workers=2))
+        try:
+            interpreter.execute_script('par-pids')
+            self.assertNotEqual(interpreter.variables['PAR_P1'], os.getpid())
+            self.assertNotIn('PAR_UNSEEN', interpreter.variables)
+            excepted = False
+            try:
+                interpreter.execute_script('par-child-fails')
+            except ScriptError as ex:
+                self.assertEqual(str(ex), 'par-fail-later@2: inner failed')
+                excepted = True
+            self.assertTrue(excepted)
+        finally:
+            interpreter.parallel_pool.shutdown()
+
+    @parameterized.expand([('parallel-arg', 'parallel-arg@1: "parallel" keyword has arguments'),
+                           ('join-arg', 'join-arg@2: "join" keyword has arguments'),
+                           ('join-alone', 'join-alone@1: "join" keyword not within "parallel" block'),
+                           ('join-in-if', 'join-in-if@2: "if" keyword within "parallel" block'),
+                           ('if-in-parallel', 'if-in-parallel@2: "if" keyword within "parallel" block'),
+                           ('parallel-in-parallel', 'parallel-in-parallel@2: "parallel" keyword within "parallel" block'),
+                           ('end-in-parallel', 'end-in-parallel@3: "end" keyword within "parallel" block'),
+                           ('unterminated-parallel',
+                            'unterminated-parallel@2: Keyword ended with unterminated parallel block'),
+                           ('not-a-call', 'not-a-call@2: "parallel" block lines must call keywords'),
+                           ])
+    def test_block_excepts(self, keyword, exception_str):
+        '''Misplaced parallel and join are found when registering'''
+        excepted = False
+        try:
+            register_keywords({keyword: yaml.safe_load(broken_body)[keyword]})
+        except ScriptError as ex:
+            self.assertEqual(str(ex), exception_str)
+            excepted = True
+        self.assertTrue(excepted)
+        self.assertNotIn(keyword, KEYWORDS)
+
+# EOF
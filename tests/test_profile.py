@@ -0,0 +1,90 @@
+"""
+    Unit Test : profiling keywords and lines
+"""
+
+import asyncio
+import itertools
+import unittest
+from parameterized import parameterized
+from daytona import Interpreter, ScriptError
+from daytona.profile import Profiler, Stats
+
+keywords = {
+    'main': ['inner 1', '+ 1 1'],
+    'inner': ['+ $0 1', '+ $0 2'],
+    'countdown': ['if $0', '    countdown ( -- $0 )', 'elif 1', '    + 0 0', 'end'],
+    'fails': ['inner 1', '++ not-a-number'],
+    'waits': ['sleep 0', '+ 1 0'],
+}
+
+
+def make_interpreter(inline_threshold=0):
+    interpreter = Interpreter()
+    interpreter.register_keywords(keywords)
+    interpreter.set_inline_threshold(inline_threshold)
+    return interpreter
+
+
+def ticking():
+    '''A clock that moves on one second each time it is read'''
+    return itertools.count().__next__
+
+
+class TestProfile(unittest.TestCase):
+
+    @parameterized.expand([('interpreted', False), ('jit', True)])
+    def test_times(self, name, jit):
+        '''Each line and call is timed, jit or not'''
+        profiler = Profiler(clock=ticking())
+        self.assertEqual(make_interpreter().execute_script('main', jit=jit, profile=profiler), 2)
+        self.assertEqual(profiler.total, 5)
+        self.assertEqual(profiler.keywords, {'main': Stats(1, 2, 5), 'inner': Stats(1, 2, 2)})
+        self.assertEqual(profiler.lines, {('main', 1): Stats(1, 1, 3), ('main', 2): Stats(1, 1, 1),
+                                          ('inner', 1): Stats(1, 1, 1), ('inner', 2): Stats(1, 1, 1)})
+        self.assertEqual(profiler.collapsed(), 'main@1 1000000\nmain@1;inner@1 1000000\nmain@1;inner@2 1000000\n'
+                                               'main@2 1000000\n')
+        report = profiler.report(limit=1).splitlines()
+        self.assertEqual(report[0], '5000.000 ms profiled, 2 keyword calls, 4 lines run')
+        self.assertEqual(report[3].split(), ['main', '1', '2000.000', '5000.000'])
+        self.assertEqual(len(report), 7)
+
+    def test_recursive(self):
+        '''Recursive calls count their time once, and lines after jumps are named right'''
+        profiler = Profiler(clock=ticking())
+        make_interpreter().execute_script('countdown', 2, profile=profiler)
+        self.assertEqual(profiler.keywords['countdown'].calls, 3)
+        self.assertEqual(profiler.keywords['countdown'].cumulative, profiler.total)
+        self.assertEqual({where: stats.calls for where, stats in profiler.lines.items()},
+                         {('countdown', 1): 3, ('countdown', 2): 2, ('countdown', 3): 1, ('countdown', 4): 1,
+                          ('countdown', 5): 3})
+        self.assertEqual(profiler.lines[('countdown', 2)], Stats(2, 2, 8))  # Not the inner call's 5 again
+        self.assertIn('countdown@2;countdown@2;countdown@4 1000000\n', profiler.collapsed())
+
+    def test_inlined(self):
+        '''Lines of inlined keywords are timed as theirs, under the keyword they are inlined into'''
+        profiler = Profiler(clock=ticking())
+        make_interpreter(inline_threshold=2).execute_script('main', profile=profiler)
+        self.assertEqual(profiler.keywords['inner'], Stats(0, 2, 2))
+        self.assertEqual(profiler.keywords['main'].calls, 1)
+        self.assertIn('main;inner@2 1000000\n', profiler.collapsed())
+
+    def test_error(self):
+        '''A script that fails is profiled up to where it failed'''
+        profiler = Profiler(clock=ticking())
+        self.assertRaises(ScriptError, make_interpreter().execute_script, 'fails', profile=profiler)
+        self.assertEqual(profiler.keywords['fails'].calls, 1)
+        self.assertEqual(profiler.lines[('fails', 1)].calls, 1)
+        self.assertNotIn(('fails', 2), profiler.lines)
+        self.assertEqual(profiler.keywords['fails'].cumulative, profiler.total)
+
+    def test_async(self):
+        '''Waiting for an async primitive is part of the line waiting'''
+        profiler = Profiler()
+        self.assertEqual(make_interpreter().execute_script('waits', profile=profiler), 1)
+        self.assertEqual(profiler.lines[('waits', 1)].calls, 1)
+        self.assertRaises(ScriptError, asyncio.run, self.async_profile())
+
+    async def async_profile(self):
+        make_interpreter().execute_script('waits', profile=Profiler())
+
+# EOF
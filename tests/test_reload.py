@@ -0,0 +1,162 @@
+"""
+    Unit Test : reloading keywords
+"""
+
+import os
+import tempfile
+import threading
+import unittest
+from parameterized import parameterized
+from daytona import Interpreter, ScriptError
+from daytona.reload import Watcher
+
+keywords = {
+    'outer': ['middle', 'leaf', '+ $? 1'],
+    'middle': ['reloader', 'nop', 'nop'],
+    'leaf': ['+ 1 1'],
+    'caller': ['set OUT ( leaf )', 'nop', '+ $OUT 0'],
+    'unrelated': ['nop', 'nop', '+ 5 0'],
+}
+
+changed = {
+    'leaf': ['+ 1 2', '+ $? 10'],
+    'added': ['+ 1 0'],
+}
+
+
+def make_interpreter(reload_midway=False):
+    interpreter = Interpreter()
+
+    @interpreter.primitive('nop')
+    def do_nop(args, context):
+        return context, None
+
+    @interpreter.primitive('reloader')
+    def do_reloader(args, context):
+        if reload_midway:  # 'outer' is linked again while its frame waits for 'middle'
+            interpreter.reload_keywords(dict(keywords, **changed))
+            interpreter.link('outer')
+        return context, None
+
+    interpreter.register_keywords(keywords)
+    return interpreter
+
+
+class TestReload(unittest.TestCase):
+
+    def test_diff(self):
+        '''Only what changed is compiled'''
+        interpreter = make_interpreter()
+        interpreter.link()
+        kept = interpreter.keywords['unrelated']
+        old_leaf = interpreter.keywords['leaf']
+        report = interpreter.reload_keywords({'leaf': changed['leaf'], 'added': changed['added'],
+                                              'unrelated': keywords['unrelated']}, replaces=['caller', 'unrelated'])
+        self.assertEqual(report.changed, ['leaf'])
+        self.assertEqual(report.added, ['added'])
+        self.assertEqual(report.removed, ['caller'])
+        self.assertEqual(report.unchanged, 1)
+        self.assertIs(interpreter.keywords['unrelated'], kept)
+        self.assertIsNot(interpreter.keywords['leaf'], old_leaf)
+        self.assertNotIn('caller', interpreter.keywords)
+        self.assertTrue(str(report).startswith('1 changed, 1 added, 1 removed, 1 unchanged, 1 to relink;'))
+
+    @parameterized.expand([('interpreted', False), ('jit', True)])
+    def test_dependents(self, name, jit):
+        '''Callers and inlined copies of what changed link again, and nothing else does'''
+        interpreter = make_interpreter()
+        self.assertEqual(interpreter.execute_script('outer', jit=jit), 3)
+        self.assertEqual(interpreter.execute_script('caller', jit=jit), 2)
+        self.assertEqual(interpreter.execute_script('unrelated', jit=jit), 5)
+        generation = interpreter.link_generation
+        report = interpreter.reload_keywords(changed)
+        self.assertEqual(report.relinked, 2)  # outer and caller
+        self.assertEqual(interpreter.link_generation, generation)
+        self.assertEqual(interpreter.keywords['unrelated'].generation, generation)
+        self.assertEqual(interpreter.keywords['outer'].generation, -1)
+        self.assertEqual(interpreter.execute_script('outer', jit=jit), 14)
+        self.assertEqual(interpreter.execute_script('caller', jit=jit), 13)
+
+    def test_added_resolves(self):
+        '''Names that did not resolve do once added'''
+        interpreter = make_interpreter()
+        interpreter.register_keywords({'later': ['not-yet 1']})
+        interpreter.link()
+        self.assertEqual(len(interpreter.keywords['later'].unresolved), 1)
+        report = interpreter.reload_keywords({'not-yet': ['++ $0']})
+        self.assertEqual(report.relinked, 1)
+        self.assertEqual(interpreter.execute_script('later'), 2)
+
+    def test_in_flight(self):
+        '''A call in progress finishes with the code it started with'''
+        interpreter = make_interpreter(reload_midway=True)
+        self.assertEqual(interpreter.execute_script('outer'), 3)
+        self.assertEqual(interpreter.execute_script('outer'), 14)
+
+    def test_compile_error(self):
+        '''A reload that does not compile changes nothing'''
+        interpreter = make_interpreter()
+        leaf = interpreter.keywords['leaf']
+        self.assertRaises(ScriptError, interpreter.reload_keywords, {'leaf': ['if 1'], 'added': ['+ 1 0']})
+        self.assertIs(interpreter.keywords['leaf'], leaf)
+        self.assertNotIn('added', interpreter.keywords)
+
+
+class TestWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'script.yml')
+        self.edits = 0
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, text):
+        with open(self.path, 'w') as f:
+            f.write(text)
+        self.edits += 1  # Times can be too coarse to tell edits apart
+        os.utime(self.path, ns=(self.edits * 10**9, self.edits * 10**9))
+
+    def test_check(self):
+        interpreter = Interpreter()
+        watcher = Watcher(interpreter)
+        self.write('main:\n  - other 1\nother:\n  - ++ $0\n')
+        self.assertEqual(watcher.watch(self.path).report.added, ['main', 'other'])
+        self.assertEqual(interpreter.execute_script('main'), 2)
+        self.assertEqual(watcher.check(), [])
+
+        self.write('main:\n  - other 1\nother:\n  - -- $0\n')
+        reloads = watcher.check()
+        self.assertEqual([reload.report.changed for reload in reloads], [['other']])
+        self.assertEqual(interpreter.execute_script('main'), 0)
+
+        self.write('main:\n  - if 1\n')
+        reloads = watcher.check()
+        self.assertEqual(str(reloads[0].error), 'main@1: Keyword ended with unterminated if statement')
+        self.assertEqual(interpreter.execute_script('main'), 0)
+
+        self.write('main: [\n')
+        self.assertIsNotNone(watcher.check()[0].error)
+        self.assertEqual(interpreter.execute_script('main'), 0)
+
+        self.write('main:\n  - + 7 0\n')
+        self.assertEqual(watcher.check()[0].report.removed, ['other'])
+        self.assertNotIn('other', interpreter.keywords)
+        self.assertEqual(interpreter.execute_script('main'), 7)
+
+    def test_thread(self):
+        interpreter = Interpreter()
+        watcher = Watcher(interpreter)
+        self.write('main:\n  - + 1 0\n')
+        watcher.watch(self.path)
+        reloaded = threading.Event()
+        watcher.start(interval=0.01, callback=lambda reload: reloaded.set())
+        try:
+            self.write('main:\n  - + 2 0\n')
+            self.assertTrue(reloaded.wait(10))
+        finally:
+            watcher.stop()
+        self.assertEqual(interpreter.execute_script('main'), 2)
+
+# EOF
@@ -2,10 +2,13 @@
     Unit Test : Base run
 """
 
+import sys
 import yaml
 import unittest
 from parameterized import parameterized
 from daytona import primitive, register_keywords, execute_script, ScriptError, register_variables
+from daytona import KEYWORDS, CompiledBody, WordKind, Op, link, register_primitive
+from daytona import set_inline_threshold, INLINE_THRESHOLD
 
 variables = {
     'var1': 'oneVar',
@@ -25,6 +28,22 @@ calls-print:
 no-keyword:
   - kw something
   - no-such-keyword
+mixed-words:
+  - ''
+  - kw $var1 $0 $?
+two-missing:
+  - kw something
+  - missing-one
+  - calls-missing
+calls-missing:
+  - missing-two
+relinks:
+  - replaceable
+countdown:
+  - if $0
+  -     countdown ( -- $0 )
+  -     kw $?
+  - end
 """
 
 ARGS = []
@@ -65,6 +84,8 @@ class TestExecution(unittest.TestCase):
 
     @parameterized.expand([('no-such-keyword', 'No such keyword "no-such-keyword"'),
                            ('no-keyword', 'no-keyword@2: No such keyword "no-such-keyword"'),
+                           ('two-missing', 'two-missing@2: No such keyword "missing-one" '
+                                           '(also calls-missing@1: No such keyword "missing-two")'),
                            ])
     def test_run_excepts(self, keyword, exception_str):
         excepted = False
@@ -74,9 +95,63 @@ class TestExecution(unittest.TestCase):
             self.assertEqual(str(ex), exception_str)
             excepted = True
         self.assertTrue(excepted)
+        self.assertEqual(ARGS, [])  # Found before running anything
 
     def test_calls_print(self):
         '''Uses the print primitive, just for coverage excellence'''
         execute_script('calls-print')
 
+    def test_compiled_on_register(self):
+        compiled = KEYWORDS['mixed-words']
+        self.assertIsInstance(compiled, CompiledBody)
+        instruction = compiled.instructions[0]
+        self.assertEqual(instruction.line_no, 2)  # Blank line still counts
+        self.assertEqual(instruction.words, ((WordKind.LITERAL, 'kw'),
+                                             (WordKind.VARIABLE, 'var1'),
+                                             (WordKind.ARGUMENT, 0),
+                                             (WordKind.RETVAL, None)))
+
+    def test_linked_targets(self):
+        set_inline_threshold(0)
+        try:
+            self.assertEqual(link('calls-another'), [])
+            self.assertEqual(KEYWORDS['calls-another'].linked[0].code, ((Op.CALL_BODY, (KEYWORDS['one'], 0)),))
+        finally:
+            set_inline_threshold(INLINE_THRESHOLD)
+        self.assertEqual(KEYWORDS['one'].linked[0].code,
+                         ((Op.PUSH, 'one'), (Op.CALL_PRIMITIVE, (do_output.__wrapped__, 1))))
+        self.assertIn('calls-missing@1: No such keyword "missing-two"', [str(error) for error in link()])
+
+    def test_relinks_on_register(self):
+        register_primitive('replaceable', lambda args, context: (context, 'first'))
+        self.assertEqual(execute_script('relinks'), 'first')
+        register_primitive('replaceable', lambda args, context: (context, 'second'))
+        self.assertEqual(execute_script('relinks'), 'second')
+        register_keywords({'replaceable': ['kw third']})
+        execute_script('relinks')
+        self.assertEqual(ARGS, [('third',)])
+
+    def test_deep_calls(self):
+        '''Interpreted keyword calls do not nest Python calls, so go well past the recursion limit'''
+        depth = 5 * sys.getrecursionlimit()
+        execute_script('countdown', depth, jit=False)
+        self.assertEqual(len(ARGS), depth)
+        self.assertEqual(ARGS[0], ('None',))
+
+    def test_max_depth(self):
+        excepted = False
+        try:
+            execute_script('countdown', 1000, max_depth=100)
+        except ScriptError as ex:
+            self.assertEqual(str(ex), 'countdown@2: Calls nested more than 100 deep')
+            excepted = True
+        self.assertTrue(excepted)
+        self.assertEqual(ARGS, [])
+
+    def test_compiles_lazily(self):
+        KEYWORDS['lazy'] = ['kw lazy']
+        execute_script('lazy')
+        self.assertIsInstance(KEYWORDS['lazy'], CompiledBody)
+        self.assertEqual(ARGS, [('lazy',)])
+
 # EOF
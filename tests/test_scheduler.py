@@ -0,0 +1,145 @@
+"""
+    Unit Test : Green thread scheduler
+"""
+
+import yaml
+import unittest
+from parameterized import parameterized
+from daytona import primitive, register_keywords, execute_script, ScriptError, KEYWORDS, Op, link
+from daytona.scheduler import Scheduler
+
+body = """
+sched-lines:
+  - sched $0 1
+  - sched $0 2
+  - sched $0 3
+sched-yields:
+  - sched $0 1
+  - sched $0 2
+  - yield
+  - sched $0 3
+  - yield
+  - sched $0 4
+sched-nested:
+  - sched-yields $0
+  - sched $0 done
+sched-counts:
+  - if $0
+  -     sched-counts ( -- $0 )
+  - end
+  - + $0 0
+sched-fails:
+  - sched $0 1
+  - yield
+  - sched $0 ( ++ nope )
+sched-async:
+  - sched $0 1
+  - async-sched $0 2
+  - sched $0 3
+"""
+
+ARGS = []
+
+
+@primitive('sched')
+def do_sched(args, context):
+    ARGS.append(args)
+    return context, None
+
+
+@primitive('async-sched')
+async def do_async_sched(args, context):
+    ARGS.append(args)
+    return context, None
+
+
+class TestScheduler(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        assert cls
+        register_keywords(yaml.safe_load(body))
+
+    def setUp(self):
+        assert self
+        global ARGS
+        ARGS = []
+
+    @parameterized.expand([('quota-1', 1, ['a1', 'b1', 'a2', 'b2', 'a3', 'b3']),
+                           ('quota-2', 2, ['a1', 'a2', 'b1', 'b2', 'a3', 'b3']),
+                           ('no-quota', 0, ['a1', 'a2', 'a3', 'b1', 'b2', 'b3']),
+                           ])
+    def test_round_robin(self, name, quota, order):
+        scheduler = Scheduler(quota=quota)
+        scheduler.spawn('sched-lines', 'a')
+        scheduler.spawn('sched-lines', 'b')
+        stats = scheduler.run()
+        self.assertEqual([f'{who}{line}' for who, line in ARGS], order)
+        self.assertEqual(stats.lines, 6)
+
+    def test_yield(self):
+        '''Without a quota scripts switch at 'yield', in nested calls too'''
+        scheduler = Scheduler(quota=0)
+        first = scheduler.spawn('sched-nested', 'a')
+        second = scheduler.spawn('sched-yields', 'b')
+        stats = scheduler.run()
+        self.assertEqual([f'{who}{line}' for who, line in ARGS],
+                         ['a1', 'a2', 'b1', 'b2', 'a3', 'b3', 'a4', 'adone', 'b4'])
+        self.assertEqual((stats.yields, stats.preemptions, stats.switches), (4, 0, 4))
+        self.assertEqual((first.slices, second.slices), (3, 3))
+        self.assertTrue(first.done and second.done)
+
+    def test_task_quota(self):
+        scheduler = Scheduler(quota=1)
+        scheduler.spawn('sched-lines', 'a', quota=3)
+        scheduler.spawn('sched-lines', 'b')
+        stats = scheduler.run()
+        self.assertEqual([f'{who}{line}' for who, line in ARGS], ['a1', 'a2', 'a3', 'b1', 'b2', 'b3'])
+        self.assertEqual(stats.preemptions, 4)  # Including just before each returns
+
+    def test_errors(self):
+        '''A failing script stops alone, with its error'''
+        scheduler = Scheduler(quota=0)
+        failing = scheduler.spawn('sched-fails', 'a')
+        other = scheduler.spawn('sched-yields', 'b')
+        scheduler.run()
+        self.assertEqual(str(failing.error), 'sched-fails@3: "++" keyword accepts numbers only')
+        self.assertTrue(other.done)
+        self.assertIsNone(other.error)
+        self.assertEqual(ARGS[-1], ('b', 4))
+
+    def test_async(self):
+        scheduler = Scheduler(quota=1)
+        scheduler.spawn('sched-async', 'a')
+        scheduler.spawn('sched-lines', 'b')
+        stats = scheduler.run()
+        self.assertEqual([f'{who}{line}' for who, line in ARGS], ['a1', 'b1', 'a2', 'b2', 'a3', 'b3'])
+        self.assertEqual(stats.lines, 6)
+
+    def test_thousands(self):
+        scheduler = Scheduler(quota=3)
+        tasks = [scheduler.spawn('sched-counts', n % 20) for n in range(2000)]
+        stats = scheduler.run()
+        self.assertEqual([task.value for task in tasks], [n % 20 for n in range(2000)])
+        self.assertEqual(stats.tasks, 2000)
+        self.assertGreater(stats.switches, 2000)
+        self.assertGreater(stats.total_time, stats.run_time)
+        self.assertIn('switches', str(stats))
+
+    def test_yield_elsewhere(self):
+        '''Outside a scheduler 'yield' does nothing'''
+        execute_script('sched-yields', 'a')
+        self.assertEqual([line for _, line in ARGS], [1, 2, 3, 4])
+        link('sched-yields')
+        self.assertIn(Op.YIELD, [op for op, _ in KEYWORDS['sched-yields'].code])
+
+    def test_spawn_errors(self):
+        excepted = False
+        try:
+            Scheduler().spawn('no-such-keyword')
+        except ScriptError as ex:
+            self.assertEqual(str(ex), 'No such keyword "no-such-keyword"')
+            excepted = True
+        self.assertTrue(excepted)
+
+# EOF
@@ -0,0 +1,105 @@
+"""
+    Unit Test : serving scripts over a Unix socket
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from daytona import Interpreter, ScriptError
+from daytona.server import Server, Client
+
+keywords = {
+    'main': ['set SEEN $0', 'print hello $0', 'add-one $0'],
+    'add-one': ['+ $0 1'],
+    'seen': ['+ $SEEN 0'],
+    'fails': ['no-such-keyword'],
+    'waits': ['wait-here', '+ 1 0'],
+    'raises': ['print before', 'raise-here'],
+}
+
+
+class TestServer(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'daytona.sock')
+        self.waiting = threading.Barrier(3)
+        self.interpreter = Interpreter()
+
+        @self.interpreter.primitive('wait-here')
+        def do_wait(args, context):
+            self.waiting.wait(10)
+            return context, None
+
+        @self.interpreter.primitive('raise-here')
+        def do_raise(args, context):
+            raise ValueError('not a script error')
+
+        self.interpreter.register_keywords(keywords)
+        self.interpreter.register_variables({'SEEN': 0})
+        self.server = Server(self.path, self.interpreter, max_workers=2)
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+        self.directory.cleanup()
+
+    def test_requests(self):
+        '''Values, output and errors come back per request, and requests do not share variables'''
+        with Client(self.path) as client:
+            self.assertEqual(client.request('main', 4), {'id': 1, 'value': 5, 'output': 'hello 4\n'})
+            self.assertEqual(client.execute_script('seen'), 0)
+            response = client.request('fails')
+            self.assertEqual(response['error'], 'fails@1: No such keyword "no-such-keyword"')
+            self.assertRaises(ScriptError, client.execute_script, 'nope')
+            client.file.write(b'["not", "a request"]\n')
+            client.file.flush()
+            self.assertIn('error', client.file.readline().decode())
+            self.assertEqual(client.execute_script('add-one', 1), 2)
+
+    def test_primitive_raises(self):
+        '''Other exceptions from primitives are answered as errors too, leaving the connection open'''
+        with Client(self.path) as client:
+            self.assertEqual(client.request('raises'),
+                             {'id': 1, 'error': 'ValueError: not a script error', 'output': 'before\n'})
+            self.assertEqual(client.execute_script('add-one', 1), 2)
+
+    def test_pool(self):
+        '''Connections are served at once up to max_workers'''
+        results = []
+
+        def run():
+            with Client(self.path, timeout=10) as client:
+                results.append(client.execute_script('waits'))
+
+        threads = [threading.Thread(target=run) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        self.waiting.wait(10)  # Both are in 'wait-here' at once
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [1, 1])
+
+    def test_stop(self):
+        '''Stopping closes connections still open'''
+        client = Client(self.path, timeout=10)
+        self.assertEqual(client.execute_script('add-one', 1), 2)
+        self.server.stop()
+        self.assertFalse(os.path.exists(self.path))
+        self.assertRaises(ConnectionError, client.execute_script, 'add-one', 1)
+        client.close()
+
+    def test_client_script(self):
+        run_client = os.path.join(os.path.dirname(__file__), '..', 'run_client.py')
+        env = dict(os.environ, PYTHONPATH=os.path.join(os.path.dirname(__file__), '..'))
+        done = subprocess.run([sys.executable, run_client, self.path, '7', '--value'],
+                              capture_output=True, text=True, env=env, timeout=30)
+        self.assertEqual((done.returncode, done.stdout), (0, 'hello 7\n8\n'))
+        done = subprocess.run([sys.executable, run_client, self.path, '--main', 'fails'],
+                              capture_output=True, text=True, env=env, timeout=30)
+        self.assertEqual((done.returncode, done.stderr), (1, 'fails@1: No such keyword "no-such-keyword"\n'))
+
+# EOF
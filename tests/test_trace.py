@@ -0,0 +1,86 @@
+"""
+    Unit Test : tracing hooks
+"""
+
+import io
+import unittest
+from parameterized import parameterized
+from daytona import Interpreter, Op
+from daytona.trace import SamplingTracer, Sample, printer
+
+keywords = {
+    'main': ['set X 2', 'helper $X', 'set Y $?', 'if 0', '    + 1 1', 'elif 1', '    $0 $Y', 'end'],
+    'helper': ['+ $0 1'],
+    'looping': ['if $0', '    looping ( -- $0 )', 'end'],
+}
+
+
+def make_interpreter():
+    interpreter = Interpreter()
+    interpreter.register_keywords(keywords)
+    return interpreter
+
+
+class TestTrace(unittest.TestCase):
+
+    @parameterized.expand([('interpreted', False), ('jit', True)])
+    def test_events(self, name, jit):
+        '''Events in order, with where they happened, jit or not'''
+        events = []
+        interpreter = make_interpreter()
+        interpreter.settrace(lambda frame, event, arg: events.append((event, frame.parent_keyword, frame.line_no, arg)))
+        self.assertEqual(interpreter.execute_script('main', '++', jit=jit), 'None')  # As 'end' leaves $?
+        self.assertEqual(events, [
+            ('enter', 'main', 0, ('++',)),
+            ('line', 'main', 1, None),
+            ('line', 'main', 2, None),
+            ('enter', 'helper', 0, (2,)),
+            ('line', 'helper', 1, None),
+            ('primitive', 'helper', 1, ('+', (2, 1))),
+            ('exit', 'helper', 1, 3),
+            ('line', 'main', 3, None),
+            ('line', 'main', 4, None),
+            ('line', 'main', 6, None),
+            ('line', 'main', 7, None),
+            ('primitive', 'main', 7, ('++', (3,))),  # Called by name from a value
+            ('exit', 'main', 8, 'None'),
+        ])
+
+    def test_untraced(self):
+        '''Removing the hook links the same code as before, inlining included'''
+        interpreter = make_interpreter()
+        interpreter.link()
+        before = {keyword: list(interpreter.keywords[keyword].code) for keyword in keywords}
+        self.assertIsNone(interpreter.gettrace())
+        interpreter.settrace(SamplingTracer())
+        interpreter.link()
+        self.assertEqual(interpreter.keywords['helper'].code[0][0], Op.TRACE)
+        self.assertEqual(interpreter.fork().gettrace(), interpreter.gettrace())
+        interpreter.settrace(None)
+        interpreter.link()
+        self.assertEqual({keyword: list(interpreter.keywords[keyword].code) for keyword in keywords}, before)
+
+    def test_sampling(self):
+        '''Every Nth event of those asked for is kept'''
+        interpreter = make_interpreter()
+        tracer = SamplingTracer(every=3, events=['line'])
+        interpreter.settrace(tracer)
+        interpreter.execute_script('looping', 2)  # 'if' three times, the call twice
+        self.assertEqual(tracer.seen, 5)
+        self.assertEqual(list(tracer.samples), [Sample('line', 'looping', 1)])
+        tracer = SamplingTracer(every=1, maxlen=2)
+        interpreter.settrace(tracer)
+        interpreter.execute_script('looping', 1)
+        self.assertEqual(tracer.seen, 8)
+        self.assertEqual(list(tracer.samples), [Sample('exit', 'looping', 3), Sample('exit', 'looping', 3)])
+        self.assertEqual(tracer.report().splitlines(), ['2 samples of 8 events, 1 in 1', '       2 exit       looping@3'])
+
+    def test_printer(self):
+        output = io.StringIO()
+        interpreter = make_interpreter()
+        interpreter.settrace(printer(output))
+        interpreter.execute_script('helper', 1)
+        self.assertEqual(output.getvalue(), 'enter helper@0 (1,)\n  line helper@1\n  primitive helper@1 (\'+\', (1, 1))\n'
+                                            'exit helper@1 2\n')
+
+# EOF
@@ -6,10 +6,13 @@ import yaml
 import unittest
 from parameterized import parameterized
 from daytona import primitive, register_keywords, execute_script, ScriptError, register_variables
+from daytona import VARIABLES, KEYWORDS, Op, link
 
 variables = {
     'var1': 'oneVar',
-    'var2': 2
+    'var2': 2,
+    'empty': '',
+    'zero': 0,
     }
 
 body = """
@@ -31,6 +34,33 @@ no-retval:
 rets-retval:
   - voo
   - var $?
+falsy:
+  - var $empty $zero
+set-computed:
+  - set COMPUTED ( + 1 $0 )
+  - var $COMPUTED
+set-shared:
+  - set SHARED global
+local-hides:
+  - set-shared
+  - local SHARED inner
+  - var $SHARED
+  - local-reader
+local-reader:
+  - var $SHARED
+local-unset:
+  - local NEVER
+  - var $NEVER
+local-recurses:
+  - local DEPTH $0
+  - if $0
+  -     local-recurses ( -- $0 )
+  - end
+  - var $DEPTH
+local-noarg:
+  - local
+set-dynamic:
+  - set ( voo ) dynamic
 """
 
 ARGS = []
@@ -70,6 +100,8 @@ class TestVariables(unittest.TestCase):
                            ('set-works', 'None', [('foobar',)]),
                            ('no-retval', 'None', [('None', )]),
                            ('rets-retval', 'None', [('1', )]),
+                           ('falsy', 'None', [('', 0)]),
+                           ('local-hides', 'None', [('inner',), ('global',)]),
                            ])
     def test_simple_noargs(self, keyword, retval, call_list):
         returned = execute_script(keyword)
@@ -77,6 +109,8 @@ class TestVariables(unittest.TestCase):
         self.assertEqual(ARGS, call_list)
 
     @parameterized.expand([('one-arg', ('three',), [('three',)]),
+                           ('set-computed', (2,), [(3,)]),
+                           ('local-recurses', (2,), [(0,), (1,), (2,)]),
                            ])
     def test_simple_args(self, keyword, args, call_list):
         execute_script(keyword, *args)
@@ -85,6 +119,8 @@ class TestVariables(unittest.TestCase):
     @parameterized.expand([('one-arg', 'one-arg@1: No such arg 0'),
                            ('novariable', 'novariable@1: No variable $nosuch'),
                            ('set-noarg', 'set-noarg@1: "set" keyword requires two arguments'),
+                           ('local-unset', 'local-unset@2: No variable $NEVER'),
+                           ('local-noarg', 'local-noarg@1: "local" keyword requires a variable name and optional value'),
                            ])
     def test_run_excepts(self, keyword, exception_str):
         excepted = False
@@ -106,6 +142,39 @@ class TestVariables(unittest.TestCase):
             excepted = True
         self.assertTrue(excepted)
 
+    def test_set_links_to_store(self):
+        '''A plain 'set' becomes a store into the variable's slot'''
+        link('set-works')
+        self.assertEqual(KEYWORDS['set-works'].code[:3],
+                         [(Op.PUSH, 'foobar'), (Op.STORE_GLOBAL, VARIABLES.slots['FROTZ']), (Op.END_LINE, None)])
+
+    def test_set_dynamic_name(self):
+        '''A computed name still goes through the 'set' primitive'''
+        execute_script('set-dynamic')
+        self.assertEqual(VARIABLES['1'], 'dynamic')
+        del VARIABLES['1']
+
+    def test_variables_view(self):
+        '''VARIABLES still acts as a dict of what is set'''
+        execute_script('set-works')
+        self.assertEqual(VARIABLES['FROTZ'], 'foobar')
+        self.assertIn('FROTZ', VARIABLES)
+        self.assertEqual(VARIABLES.get('zero'), 0)
+        self.assertNotIn('NEVER', VARIABLES)
+        self.assertIsNone(VARIABLES.get('nosuch'))
+        del VARIABLES['FROTZ']
+        self.assertNotIn('FROTZ', VARIABLES)
+        self.assertNotIn('FROTZ', dict(VARIABLES))
+        self.assertEqual(len(VARIABLES), len(list(VARIABLES)))
+
+    def test_variables_assigned(self):
+        '''Assigning through VARIABLES is seen by linked code'''
+        execute_script('variable')
+        VARIABLES['var1'] = 'changed'
+        execute_script('variable')
+        VARIABLES['var1'] = 'oneVar'
+        self.assertEqual(ARGS, [('oneVar',), ('changed',)])
+
     def test_calls_print(self):
         '''Uses the print primitive, just for coverage excellence'''
         execute_script('calls-print')